@@ -0,0 +1,76 @@
+"""
+Reporte del arranque del worker
+Mide cuánto tarda en importarse cada módulo de la aplicación y qué paquetes de terceros
+arrastra. El stack de generación de PDFs (reportlab, pypdf, qrcode, PIL) y boto3 se importan
+recién al primer uso, así que un worker que solo responde consultas JSON no los carga:
+el reporte indica cuáles ya están en memoria.
+"""
+import importlib
+import sys
+import time
+from typing import Dict, List
+
+from app.core.log import get_logger, log_evento
+from app.core.metrics import metrics
+
+log = get_logger(__name__)
+
+# Paquetes pesados que se cargan al primer uso (PDF, QR, imágenes, S3)
+DIFERIDOS = ('reportlab', 'pypdf', 'qrcode', 'PIL', 'boto3')
+
+
+def _paquetes_cargados() -> set:
+    return {nombre.split('.')[0] for nombre in list(sys.modules)}
+
+
+class ReporteArranque:
+    """Tiempos de importación por módulo desde que se creó el reporte hasta el startup"""
+
+    def __init__(self):
+        self._inicio = time.perf_counter()
+        self._modulos: List[Dict] = []
+        self._total_ms = None
+
+    def importar(self, nombre: str):
+        """Importa un módulo midiendo su tiempo y los paquetes de terceros que carga por primera vez"""
+        antes = _paquetes_cargados()
+        inicio = time.perf_counter()
+        modulo = importlib.import_module(nombre)
+        duracion = time.perf_counter() - inicio
+        nuevos = sorted(p for p in _paquetes_cargados() - antes
+                        if p != 'app' and not p.startswith('_') and p not in sys.stdlib_module_names)
+        self._modulos.append({'modulo': nombre, 'ms': round(duracion * 1000, 1), 'paquetes': nuevos})
+        return modulo
+
+    def terminar(self) -> Dict:
+        """Cierra el reporte (al iniciar el worker) y lo escribe en el log"""
+        if self._total_ms is None:
+            self._total_ms = round((time.perf_counter() - self._inicio) * 1000, 1)
+            reporte = self.estado()
+            log_evento.emitir(log, 'arranque', reporte)
+        return self.estado()
+
+    def estado(self) -> Dict:
+        cargados = _paquetes_cargados()
+        return {
+            'total_ms': self._total_ms,
+            'modulos': list(self._modulos),
+            'diferidos': {p: p in cargados for p in DIFERIDOS},
+        }
+
+
+# Instancia global del reporte de arranque
+arranque = ReporteArranque()
+
+startup_modulo = metrics.gauge(
+    'app_startup_import_seconds', 'Duración de la importación de cada módulo al arrancar el worker', ('modulo',))
+startup_diferidos = metrics.gauge(
+    'app_deferred_package_loaded', 'Paquete pesado ya cargado en el worker (1) o todavía diferido (0)', ('paquete',))
+
+
+@metrics.colector
+def _metricas_arranque():
+    for modulo in arranque.estado()['modulos']:
+        startup_modulo.set(modulo['ms'] / 1000, modulo=modulo['modulo'])
+    for paquete, cargado in arranque.estado()['diferidos'].items():
+        startup_diferidos.set(1 if cargado else 0, paquete=paquete)
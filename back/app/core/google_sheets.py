@@ -1,30 +1,122 @@
 import gspread
 from google.oauth2.service_account import Credentials
+from gspread.utils import rowcol_to_a1, numericise_all
 from typing import List, Dict, Optional
 from app.core.config import settings
+from app.core.sheets_writes import WriteBuffer
+from app.core.sheets_gate import GatedHTTPClient, sheets_gate
+from app.core.singleflight import SingleFlight
+from app.core.negative_cache import NegativeCache
+from app.core.sheets_replica import SheetsReplica
+from app.core.log import get_logger, log_evento
+from app.core.metrics import registrar_cache
+from app.core.sheets_schema import (
+    SheetSchema, ALIAS_ACTUALIZACION_CERTIFICADOS_QR, CAMPO_ALTA_POR_HEADER,
+    COLUMNAS_CODIGO_QR, COLUMNAS_CODIGO_PRINCIPAL, HEADERS_BASICOS_CERTIFICADOS_QR,
+    valores_alta_certificado, mapear_certificado_qr, mapear_listado_qr,
+)
 import os
+import re
 import json
-import traceback
+import threading
+import functools
 from datetime import datetime, timedelta
 
+log = get_logger(__name__)
+
 
 class GoogleSheetsService:
     def __init__(self):
-        self.client = None
-        self.sheet = None
+        # La conexión se abre en el primer uso (o en el calentamiento al arrancar el worker):
+        # crear el servicio no llama a Google, así que el worker arranca aunque Google no responda
+        self._client = None
+        self._sheet = None
+        self._lock_conexion = threading.Lock()
+        self._calentamiento = {'listo': False, 'pasos': {}, 'error': None, 'inicio': None, 'fin': None}
         self.spreadsheets = {}  # Cache de spreadsheets abiertos
+        self._worksheets = {}  # Cache de worksheets: (spreadsheet, nombre) -> Worksheet
+        self._schemas = {}  # Cache de headers por worksheet: (spreadsheet, nombre) -> SheetSchema
+        self._lecturas = SingleFlight()  # Descargas completas en curso por worksheet
         # Cache de datos con expiración
         self._cache_menciones = None
         self._cache_menciones_timestamp = None
+        self._cache_menciones_version = None
         self._cache_clientes = None
         self._cache_clientes_timestamp = None
+        self._cache_clientes_version = None
+        # Índice de CERTIFICADOS QR: código normalizado -> {'fila': n, 'record': {...}}
+        self._indice_certificados = None
+        self._indice_certificados_timestamp = None
+        self._indice_certificados_version = None
+        self._registros_certificados = None  # Filas de CERTIFICADOS QR en orden (fila N = posición N - 2)
+        self._lock_certificados = threading.Lock()  # Protege las altas en la lista de filas
+        # Sincronización incremental: última descarga completa de CERTIFICADOS QR
+        self._sync_completa_timestamp = None
+        self._sync_completa_intervalo = timedelta(seconds=settings.SHEETS_FULL_SYNC_SECONDS)
+        # Índice de la hoja principal (fallback por compatibilidad)
+        self._indice_principal = None
+        self._indice_principal_timestamp = None
+        self._indice_principal_version = None
+        # Códigos buscados que no existen: se responden sin volver a buscar durante el TTL.
+        # Un código que no está en el índice solo fuerza una sincronización si la última es
+        # más antigua que el intervalo de detección de cambios (mínimo 5 segundos)
+        self._resincronizacion_min = timedelta(seconds=max(settings.SHEETS_CHANGE_PROBE_SECONDS, 5))
+        self._codigos_inexistentes = NegativeCache(
+            ttl=settings.SHEETS_UNKNOWN_CODE_TTL_SECONDS,
+            max_entradas=settings.SHEETS_UNKNOWN_CODE_MAX_ENTRIES,
+        )
         self._cache_ttl = timedelta(minutes=5)  # Cache válido por 5 minutos
-        self._connect()
+        # Hojas mantenidas por el refresco en segundo plano: sus cachés se sirven aunque
+        # venzan (stale-while-revalidate) hasta _stale_max
+        self._refresco_en_segundo_plano = set()
+        self._stale_max = timedelta(seconds=settings.SHEETS_STALE_MAX_SECONDS)
+        # Detección de cambios: modifiedTime (Drive) de cada spreadsheet, consultado como
+        # máximo cada _sondeo_intervalo; spreadsheet -> (modifiedTime, momento de la consulta)
+        self._sondeo_intervalo = timedelta(seconds=settings.SHEETS_CHANGE_PROBE_SECONDS)
+        self._versiones = {}
+        # Spreadsheets escritos por la app desde la última sincronización: un cambio de versión
+        # sin filas nuevas en CERTIFICADOS QR se atribuye a esas escrituras (ya aplicadas en memoria)
+        self._escrituras_locales = set()
+        # Réplica local SQLite: arranque sin descargas y sincronización compartida entre workers
+        self._replica = SheetsReplica(settings.SHEETS_REPLICA_PATH) if settings.SHEETS_REPLICA_PATH else None
+        # Escrituras agrupadas: un batch_update por hoja y operación lógica
+        self._writes = WriteBuffer(
+            flush_interval=settings.SHEETS_WRITE_FLUSH_SECONDS,
+            max_pending=settings.SHEETS_WRITE_MAX_PENDING,
+        )
+    
+    @property
+    def client(self):
+        """Cliente de gspread autorizado (conecta en el primer uso)"""
+        if self._client is None:
+            with self._lock_conexion:
+                if self._client is None:
+                    self._connect()
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    @property
+    def sheet(self):
+        """Hoja principal: sheet1 del spreadsheet de certificados (se abre en el primer uso)"""
+        if self._sheet is None:
+            self._sheet = self._get_spreadsheet('certificados').sheet1
+        return self._sheet
+    
+    @sheet.setter
+    def sheet(self, sheet):
+        self._sheet = sheet
+    
+    @property
+    def conectado(self) -> bool:
+        return self._client is not None
     
     def _connect(self):
-        """Conecta a Google Sheets usando service account"""
+        """Conecta a Google Sheets usando service account (los spreadsheets se abren al usarlos)"""
         try:
-            print("🔍 [DEBUG] Iniciando conexión a Google Sheets...", flush=True)
+            log.debug("Iniciando conexión a Google Sheets...")
             scopes = [
                 'https://www.googleapis.com/auth/spreadsheets',
                 'https://www.googleapis.com/auth/drive'
@@ -33,19 +125,19 @@ class GoogleSheetsService:
             creds = None
             
             # Log de variables para depuración en Render
-            print(f"🔍 [DEBUG] GOOGLE_SA_FILE env: {os.getenv('GOOGLE_SA_FILE')}", flush=True)
-            print(f"🔍 [DEBUG] settings.SERVICE_ACCOUNT_FILE: {settings.SERVICE_ACCOUNT_FILE}", flush=True)
+            log.debug("GOOGLE_SA_FILE env: %s", os.getenv('GOOGLE_SA_FILE'))
+            log.debug("settings.SERVICE_ACCOUNT_FILE: %s", settings.SERVICE_ACCOUNT_FILE)
             
             # 1. Intentar por archivo (Secret File en Render)
             target_file = settings.SERVICE_ACCOUNT_FILE or '/etc/secrets/GOOGLE_SERVICE_ACCOUNT'
             if os.path.exists(target_file):
                 try:
                     creds = Credentials.from_service_account_file(target_file, scopes=scopes)
-                    print(f"✅ [GOOGLE SHEETS] Conectado usando archivo: {target_file}", flush=True)
+                    log.info("Credenciales de Google Sheets cargadas desde archivo: %s", target_file)
                 except Exception as e:
-                    print(f"⚠️ [GOOGLE SHEETS] Error cargando archivo {target_file}: {e}", flush=True)
+                    log.warning("Error cargando archivo de credenciales %s: %s", target_file, e)
             else:
-                print(f"❌ [DEBUG] El archivo secreto NO existe en: {target_file}", flush=True)
+                log.debug("El archivo secreto no existe en: %s", target_file)
 
             # 2. Intentar por JSON directo (Variable de entorno)
             if not creds:
@@ -56,41 +148,157 @@ class GoogleSheetsService:
                         if 'private_key' in info:
                             info['private_key'] = info['private_key'].replace('\\n', '\n')
                         creds = Credentials.from_service_account_info(info, scopes=scopes)
-                        print("✅ Credenciales cargadas desde JSON directo")
+                        log.info("Credenciales de Google Sheets cargadas desde JSON directo")
                     except Exception as e:
-                        print(f"⚠️ Error cargando JSON directo: {e}")
+                        log.warning("Error cargando JSON directo: %s", e)
 
             if not creds:
-                print("❌ No se pudieron cargar credenciales de Google Sheets")
+                log.error("No se pudieron cargar credenciales de Google Sheets")
                 raise ValueError("Credenciales no disponibles")
 
-            self.client = gspread.authorize(creds)
-            
-            # Inicializar spreadsheets principales
-            for key, config in settings.SHEETS.items():
-                try:
-                    self.spreadsheets[key] = self.client.open_by_key(config['id'])
-                    print(f"✅ Spreadsheet '{key}' abierto correctamente")
-                except Exception as e:
-                    print(f"⚠️ Error abriendo spreadsheet '{key}': {e}")
-            
-            # Set default sheet (certificados)
-            if 'certificados' in self.spreadsheets:
-                self.sheet = self.spreadsheets['certificados'].sheet1
-            
-            print("🚀 Conexión a Google Sheets completada exitosamente")
+            # Todas las requests pasan por el control de cuota (token bucket + reintentos)
+            self._client = gspread.authorize(creds, http_client=GatedHTTPClient)
+            log.info("Conexión a Google Sheets completada")
 
         except Exception as e:
-            print(f"🛑 ERROR CRÍTICO EN CONEXIÓN A GOOGLE SHEETS: {e}")
-            traceback.print_exc()
-            # No levantamos excepción para que la app no muera, pero el servicio no funcionará
-            self.client = None
+            log.exception("Error crítico en la conexión a Google Sheets: %s", e)
+            # El próximo uso vuelve a intentar la conexión
+            self._client = None
             raise Exception(f"Error conectando a Google Sheets: {str(e)}")
     
+    def calentar(self, hojas: List[str]) -> None:
+        """
+        Conecta, abre los spreadsheets y carga las cachés de `hojas` antes del primer request
+        (se llama desde una tarea al arrancar; el progreso se ve en estado_calentamiento)
+        
+        Args:
+            hojas: 'certificados_qr', 'menciones' y/o 'clientes'
+        """
+        estado = self._calentamiento
+        estado.update(inicio=estado['inicio'] or datetime.now().isoformat(), error=None)
+        claves = sorted({self._spreadsheet_key(tipo) for tipo in settings.SHEETS})
+        pasos = [('conexion', lambda: self.client)]
+        pasos += [(f'spreadsheet:{clave}', functools.partial(self._get_spreadsheet, clave)) for clave in claves]
+        pasos.append(('hoja_principal', lambda: self.sheet))
+        cargas = {
+            'certificados_qr': self._cargar_indice_certificados,
+            'menciones': self.get_menciones,
+            'clientes': self.get_all_clientes,
+        }
+        pasos += [(hoja, cargas[hoja]) for hoja in hojas]
+        for paso, _ in pasos:
+            estado['pasos'].setdefault(paso, 'pendiente')
+        for paso, cargar in pasos:
+            if estado['pasos'][paso] == 'ok':
+                continue
+            try:
+                cargar()
+            except Exception as e:
+                estado['pasos'][paso] = 'error'
+                estado['error'] = f"{paso}: {str(e)}"
+                raise
+            estado['pasos'][paso] = 'ok'
+        estado.update(listo=True, fin=datetime.now().isoformat())
+        log.info("Calentamiento de Google Sheets completado: %s", ', '.join(paso for paso, _ in pasos))
+    
+    def estado_calentamiento(self) -> Dict:
+        return {'conectado': self.conectado, **self._calentamiento, 'pasos': dict(self._calentamiento['pasos'])}
+    
+    def batched_writes(self):
+        """
+        Agrupa las escrituras de varias llamadas en un solo batch_update por hoja
+        
+        Uso:
+            with sheets_service.batched_writes():
+                sheets_service.update_certificate_fields(...)
+                sheets_service.update_compra_codigo(...)
+        """
+        return self._writes.operation()
+    
+    def estado(self) -> Dict:
+        """Estado operativo del servicio: consumo de cuota y escrituras pendientes"""
+        return {
+            'cuota': sheets_gate.snapshot(),
+            'escrituras_pendientes': self._writes.pending,
+            'lecturas_coalescidas': self._lecturas.coalescidas,
+            'replica': str(self._replica.path) if self._replica else None,
+            'calentamiento': self.estado_calentamiento(),
+            # Códigos conocidos en memoria (cualquier otro se responde como inexistente sin llamar a Sheets)
+            'codigos_conocidos': {
+                'certificados_qr': len(self._indice_certificados or {}),
+                'principal': len(self._indice_principal or {}),
+            },
+            'codigos_inexistentes': self._codigos_inexistentes.estado(),
+        }
+    
+    def flush_writes(self) -> int:
+        """Envía las escrituras pendientes (modo diferido). Retorna el número de llamadas realizadas"""
+        return self._writes.flush()
+    
+    def _get_spreadsheet(self, key: str = 'certificados'):
+        """Obtiene un spreadsheet abierto (lo abre una sola vez; las claves con el mismo ID comparten el handle)"""
+        spreadsheet = self.spreadsheets.get(key)
+        if not spreadsheet:
+            spreadsheet_id = settings.SHEETS[key]['id']
+            def abrir():
+                abierto = next((s for s in self.spreadsheets.values() if getattr(s, 'id', None) == spreadsheet_id), None)
+                return abierto or self.client.open_by_key(spreadsheet_id)
+            spreadsheet = self._lecturas.do(('spreadsheet', spreadsheet_id), abrir)
+            self.spreadsheets[key] = spreadsheet
+        return spreadsheet
+    
+    @staticmethod
+    def _spreadsheet_key(sheet_type: str) -> str:
+        return 'menciones' if sheet_type == 'menciones' else 'certificados'
+    
+    def _worksheet(self, worksheet_name: str, sheet_type: str = 'certificados'):
+        """Obtiene el handle de una worksheet sin llamadas de metadata repetidas (lanza WorksheetNotFound)"""
+        clave = (self._spreadsheet_key(sheet_type), worksheet_name)
+        worksheet = self._worksheets.get(clave)
+        if worksheet is None:
+            worksheet = self._get_spreadsheet(clave[0]).worksheet(worksheet_name)
+            self._worksheets[clave] = worksheet
+        return worksheet
+    
+    def _schema(self, worksheet, worksheet_name: str, sheet_type: str = 'certificados', refresh: bool = False) -> SheetSchema:
+        """Headers de una worksheet; solo se vuelven a leer si se fuerza o si no están en caché"""
+        clave = (self._spreadsheet_key(sheet_type), worksheet_name)
+        schema = self._schemas.get(clave)
+        if schema is None or refresh:
+            schema = SheetSchema(worksheet.row_values(1))
+            self._schemas[clave] = schema
+        return schema
+    
+    def _leer_registros(self, worksheet, worksheet_name: str, sheet_type: str = 'certificados') -> List[Dict]:
+        """
+        Descarga completa de una worksheet (get_all_records).
+        Las llamadas concurrentes sobre la misma hoja comparten una sola descarga.
+        """
+        def descargar():
+            records = worksheet.get_all_records()
+            log_evento.contar('sheets_filas_leidas', len(records))
+            self._observar_headers(records, worksheet_name, sheet_type)
+            return records
+        return self._lecturas.do((self._spreadsheet_key(sheet_type), worksheet_name), descargar)
+    
+    def _observar_headers(self, records: List[Dict], worksheet_name: str, sheet_type: str = 'certificados'):
+        """Actualiza los headers en caché si una descarga completa muestra que cambiaron"""
+        if not records:
+            return
+        headers = list(records[0].keys())
+        clave = (self._spreadsheet_key(sheet_type), worksheet_name)
+        schema = self._schemas.get(clave)
+        if schema is None or not schema.matches(headers):
+            self._schemas[clave] = SheetSchema(headers)
+    
+    def _schema_principal(self, refresh: bool = False) -> SheetSchema:
+        """Headers de la hoja principal (sheet1 del spreadsheet de certificados)"""
+        return self._schema(self.sheet, '__principal__', refresh=refresh)
+    
     def get_all_certificates(self) -> List[Dict]:
         """Obtiene todos los certificados desde la hoja principal"""
         try:
-            records = self.sheet.get_all_records()
+            records = self._leer_registros(self.sheet, '__principal__')
             return records
         except Exception as e:
             raise Exception(f"Error obteniendo certificados: {str(e)}")
@@ -98,147 +306,469 @@ class GoogleSheetsService:
     def get_all_certificates_qr(self) -> List[Dict]:
         """Obtiene todos los certificados desde la hoja CERTIFICADOS QR"""
         try:
-            # Obtener el spreadsheet de certificados
-            spreadsheet = self.spreadsheets.get('certificados')
-            if not spreadsheet:
-                sheet_id = settings.SHEETS['certificados']['id']
-                spreadsheet = self.client.open_by_key(sheet_id)
-                self.spreadsheets['certificados'] = spreadsheet
-            
-            # Obtener la hoja CERTIFICADOS QR
-            worksheet_qr = spreadsheet.worksheet('CERTIFICADOS QR')
-            records = worksheet_qr.get_all_records()
+            # Filas de CERTIFICADOS QR desde la caché del índice (se descargan solo si venció)
+            self._cargar_indice_certificados()
+            records = self._registros_certificados or []
             
             # Mapear los campos de CERTIFICADOS QR al formato esperado por el frontend
-            certificados_mapeados = []
-            for record in records:
-                # Separar nombre completo en nombres y apellidos
-                nombre_completo = record.get('NOMBRE COMPLETO DEL CLIENTE', '') or record.get('NOMBRE COMPLETO', '') or ''
-                nombres = ''
-                apellidos = ''
-                if nombre_completo:
-                    partes = nombre_completo.split(' ', 1)
-                    if len(partes) >= 2:
-                        nombres = partes[0]
-                        apellidos = ' '.join(partes[1:])
-                    else:
-                        nombres = nombre_completo
-                
-                certificado_mapeado = {
-                    'codigo': record.get('CODIGO', '') or record.get('codigo', ''),
-                    'nombres': nombres,
-                    'apellidos': apellidos,
-                    'dni': record.get('DNI DEL CLIENTE', '') or record.get('DNI', '') or record.get('dni', ''),
-                    'curso': record.get('CURSO', '') or record.get('curso', ''),
-                    'fecha_emision': record.get('FECHA EMISION', '') or record.get('FECHA EMISIÓN', '') or record.get('fecha_emision', ''),
-                    'horas': record.get('HORAS', '') or record.get('horas', ''),
-                    'estado': record.get('ESTADO', 'VALIDO') or record.get('estado', 'VALIDO'),
-                    'pdf_url': record.get('PDF_URL', '') or record.get('pdf_url', ''),
-                    # Campos adicionales de CERTIFICADOS QR
-                    'nombre_completo': nombre_completo,
-                    'celular': record.get('CELULAR DEL CLIENTE', '') or record.get('celular', ''),
-                    'correo': record.get('CORREO DEL CLIENTE', '') or record.get('correo', ''),
-                    'nro': record.get('NRO', '') or record.get('nro', ''),
-                    'especialidad': record.get('ESPECIALIDAD', '') or record.get('especialidad', ''),
-                    'p_certificado': record.get('P. CERTIFICADO', '') or record.get('p_certificado', ''),
-                    'mencion': record.get('MENCIÓN', '') or record.get('mencion', ''),
-                    'f_inicio': record.get('F. INICIO', '') or record.get('f_inicio', ''),
-                    'f_termino': record.get('F. TÉRMINO', '') or record.get('f_termino', ''),
-                }
-                certificados_mapeados.append(certificado_mapeado)
-            
-            return certificados_mapeados
+            return [mapear_listado_qr(record) for record in records]
         except Exception as e:
             raise Exception(f"Error obteniendo certificados desde CERTIFICADOS QR: {str(e)}")
     
-    def get_certificate_by_code(self, codigo: str) -> Optional[Dict]:
-        """Busca un certificado por código en CERTIFICADOS QR"""
+    @staticmethod
+    def _normalizar_codigo(codigo) -> str:
+        """Normaliza un código para usarlo como clave del índice"""
+        return str(codigo).strip().lower() if codigo else ""
+    
+    @staticmethod
+    def _codigo_de_registro(record: Dict) -> str:
+        """Obtiene el código de un registro (puede estar en diferentes columnas)"""
+        return (
+            record.get("CODIGO", "") or 
+            record.get("CÓDIGO", "") or 
+            record.get("codigo", "")
+        )
+    
+    @staticmethod
+    def _fila_de_append(response) -> Optional[int]:
+        """Extrae el número de fila escrita a partir de la respuesta de append_row"""
         try:
-            print(f"DEBUG get_certificate_by_code: Buscando codigo={codigo}")
-            # Buscar primero en CERTIFICADOS QR (donde se guardan los certificados ahora)
-            spreadsheet = self.spreadsheets.get('certificados')
-            if not spreadsheet:
-                sheet_id = settings.SHEETS['certificados']['id']
-                spreadsheet = self.client.open_by_key(sheet_id)
-                self.spreadsheets['certificados'] = spreadsheet
-            
+            updated_range = response['updates']['updatedRange']
+            match = re.search(r'!\$?[A-Z]+\$?(\d+)', updated_range)
+            return int(match.group(1)) if match else None
+        except Exception:
+            return None
+    
+    def _indice_vigente(self, timestamp) -> bool:
+        """Indica si un índice construido en `timestamp` sigue dentro del TTL del caché"""
+        return timestamp is not None and (datetime.now() - timestamp) < self._cache_ttl
+    
+    # Hoja con caché -> (worksheet, sheet_type del spreadsheet que la contiene)
+    _HOJAS_CACHE = {
+        'certificados_qr': ('CERTIFICADOS QR', 'certificados'),
+        'menciones': ('MENCIONES', 'menciones'),
+        'clientes': (settings.SHEETS['clientes']['worksheets']['clientes'], 'clientes'),
+        'compras': ('compras', 'certificados'),
+    }
+    
+    def _version_hoja(self, hoja: str) -> Optional[str]:
+        """
+        modifiedTime del spreadsheet que contiene `hoja` (None si la detección está
+        desactivada o la consulta falla). Varias hojas del mismo spreadsheet comparten la consulta.
+        """
+        if self._sondeo_intervalo.total_seconds() <= 0:
+            return None
+        key = self._spreadsheet_key(self._HOJAS_CACHE[hoja][1])
+        ahora = datetime.now()
+        version = self._versiones.get(key)
+        if version and ahora - version[1] < self._sondeo_intervalo:
+            return version[0]
+        try:
+            modificado = self._get_spreadsheet(key).get_lastUpdateTime()
+        except Exception as e:
+            log.warning("No se pudo consultar la versión del spreadsheet '%s': %s", key, e)
+            return None
+        self._versiones[key] = (modificado, ahora)
+        return modificado
+    
+    def _sin_cambios(self, hoja: str, version: Optional[str]) -> Optional[bool]:
+        """True/False si la hoja (no) cambió desde que se cargó con `version`; None si no se sabe"""
+        if version is None:
+            return None
+        actual = self._version_hoja(hoja)
+        return None if actual is None else actual == version
+    
+    def _cache_utilizable(self, timestamp, hoja: str, version: Optional[str] = None) -> bool:
+        """
+        Indica si la caché de `hoja` cargada en `timestamp` (con `version`) se puede servir sin descargar.
+        - Si el refresco en segundo plano mantiene la hoja, se sirve (aunque esté vencida)
+          hasta SHEETS_STALE_MAX_SECONDS: el refresco se encarga de recargarla.
+        - Si no, se sirve mientras el spreadsheet no haya cambiado; solo si no se puede
+          saber (detección desactivada o fallida) se usa el TTL fijo.
+        """
+        if timestamp is None:
+            return False
+        edad = datetime.now() - timestamp
+        if hoja in self._refresco_en_segundo_plano:
+            return edad < self._stale_max
+        sin_cambios = self._sin_cambios(hoja, version)
+        if sin_cambios is not None:
+            return sin_cambios
+        return edad < self._cache_ttl
+    
+    def _leer_replica(self, hoja: str, version: Optional[str], version_en_memoria: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Filas de `hoja` desde la réplica local si están al día con `version` y son más nuevas que
+        la copia en memoria (`version_en_memoria`). None si hay que leer de Google Sheets.
+        Sin versión (detección desactivada) solo se usa al arrancar y dentro del TTL.
+        """
+        if self._replica is None:
+            return None
+        try:
+            meta = self._replica.meta(hoja)
+            if not meta or meta['sincronizado'] is None:
+                return None
+            if version is not None:
+                vigente = meta['version'] == version and meta['version'] != version_en_memoria
+            else:
+                vigente = version_en_memoria is None and datetime.now() - meta['sincronizado'] < self._cache_ttl
+            if not vigente:
+                return None
+            records = self._replica.registros(hoja)
+        except Exception as e:
+            log.warning("No se pudo leer la réplica local (%s): %s", hoja, e)
+            return None
+        if meta['headers']:
+            worksheet_name, sheet_type = self._HOJAS_CACHE[hoja]
+            self._schemas[(self._spreadsheet_key(sheet_type), worksheet_name)] = SheetSchema(meta['headers'])
+        log.debug("%s cargada desde la réplica local (%d filas)", hoja, len(records))
+        log_evento.contar('replica_filas_leidas', len(records))
+        return records
+    
+    def _guardar_replica(self, hoja: str, records: List[Dict], version: Optional[str]) -> None:
+        """Copia a la réplica local una descarga completa (los errores no afectan al request)"""
+        if self._replica is None:
+            return
+        worksheet_name, sheet_type = self._HOJAS_CACHE[hoja]
+        schema = self._schemas.get((self._spreadsheet_key(sheet_type), worksheet_name))
+        try:
+            self._replica.reemplazar(hoja, schema.headers if schema else [], records, version)
+        except Exception as e:
+            log.warning("No se pudo actualizar la réplica local (%s): %s", hoja, e)
+    
+    def _guardar_filas_replica(self, hoja: str, filas: Dict[int, Dict], version: Optional[str] = None) -> None:
+        """
+        Copia a la réplica local filas agregadas o editadas (fila del Sheet -> registro).
+        Con `version` (y aunque no haya filas) marca la hoja como sincronizada con esa versión
+        """
+        if self._replica is None or not (filas or version):
+            return
+        self._escribir_replica(hoja, self._replica.guardar_filas, hoja, filas, version)
+    
+    def _escribir_replica(self, hoja: str, escritura, *args) -> None:
+        """
+        Aplica una escritura a la réplica local. Si falla se descarta la versión sincronizada de
+        la hoja: la réplica no debe servir filas que no reflejan lo escrito en el Sheet
+        """
+        try:
+            escritura(*args)
+        except Exception as e:
+            log.warning("No se pudo actualizar la réplica local (%s): %s", hoja, e)
             try:
-                worksheet_qr = spreadsheet.worksheet('CERTIFICADOS QR')
-                print(f"DEBUG get_certificate_by_code: Hoja CERTIFICADOS QR obtenida")
-                records = worksheet_qr.get_all_records()
-                print(f"DEBUG get_certificate_by_code: Total de registros en CERTIFICADOS QR: {len(records)}")
-                
-                for record in records:
-                    # Buscar por código (puede estar en diferentes columnas)
-                    codigo_record = (
-                        record.get("CODIGO", "") or 
-                        record.get("CÓDIGO", "") or 
-                        record.get("codigo", "")
-                    )
-                    codigo_clean = str(codigo_record).strip() if codigo_record else ""
-                    codigo_buscar = codigo.strip()
-                    
-                    print(f"DEBUG get_certificate_by_code: Comparando '{codigo_clean}' con '{codigo_buscar}'")
-                    
-                    if codigo_clean and codigo_clean.lower() == codigo_buscar.lower():
-                        print(f"DEBUG get_certificate_by_code: Certificado encontrado!")
-                        # Separar nombre completo en nombres y apellidos
-                        nombre_completo = record.get('NOMBRE COMPLETO DEL CLIENTE', '') or record.get('NOMBRE COMPLETO', '') or ''
-                        nombres = ''
-                        apellidos = ''
-                        if nombre_completo:
-                            partes = nombre_completo.split(' ', 1)
-                            if len(partes) >= 2:
-                                nombres = partes[0]
-                                apellidos = ' '.join(partes[1:])
-                            else:
-                                nombres = nombre_completo
-                        
-                        # Mapear a formato esperado (incluyendo todos los campos de la mención)
-                        # Asegurar que horas sea string o None
-                        horas_value = record.get('HORAS', '') or record.get('horas', '')
-                        if horas_value:
-                            horas_value = str(horas_value) if not isinstance(horas_value, str) else horas_value
-                        else:
-                            horas_value = None
-                        
-                        return {
-                            'codigo': codigo_clean or '',
-                            'nombres': nombres or '',
-                            'apellidos': apellidos or '',
-                            'nombre_completo': nombre_completo or '',
-                            'dni': record.get('DNI DEL CLIENTE', '') or record.get('DNI', '') or record.get('dni', '') or '',
-                            'curso': record.get('CURSO', '') or record.get('P. CERTIFICADO', '') or record.get('curso', '') or '',
-                            'fecha_emision': record.get('FECHA EMISION', '') or record.get('FECHA EMISIÓN', '') or record.get('F. EMISIÓN', '') or record.get('fecha_emision', '') or '',
-                            'horas': horas_value,
-                            'estado': record.get('ESTADO', 'VALIDO') or record.get('estado', 'VALIDO') or 'VALIDO',
-                            'pdf_url': record.get('PDF_URL', '') or record.get('PDF URL', '') or record.get('pdf_url', '') or None,
-                            # Campos adicionales para el PDF con plantilla
-                            'mencion': record.get('MENCIÓN', '') or record.get('mencion', '') or '',
-                            'f_inicio': record.get('F. INICIO', '') or record.get('f_inicio', '') or '',
-                            'f_termino': record.get('F. TÉRMINO', '') or record.get('F. TERMINO', '') or record.get('f_termino', '') or '',
-                            'p_certificado': record.get('P. CERTIFICADO', '') or record.get('p_certificado', '') or '',
-                        }
-                
-                print(f"DEBUG get_certificate_by_code: Certificado no encontrado en CERTIFICADOS QR")
-            except gspread.exceptions.WorksheetNotFound:
-                print(f"DEBUG get_certificate_by_code: Hoja CERTIFICADOS QR no encontrada")
+                self._replica.descartar(hoja)
+            except Exception:
                 pass
+    
+    def _escritura_local(self, sheet_type: str) -> None:
+        """
+        Registra una escritura de la app en el spreadsheet de `sheet_type`: su versión se vuelve
+        a consultar en la próxima lectura en lugar de esperar SHEETS_CHANGE_PROBE_SECONDS
+        """
+        key = self._spreadsheet_key(sheet_type)
+        self._versiones.pop(key, None)
+        self._escrituras_locales.add(key)
+    
+    def activar_refresco(self, hojas: List[str]) -> None:
+        """Marca las hojas cuyas cachés recarga el refresco en segundo plano"""
+        self._refresco_en_segundo_plano = set(hojas)
+    
+    def refrescar_cache(self, hoja: str) -> None:
+        """
+        Recarga la caché de una hoja desde Google Sheets si el spreadsheet cambió
+        
+        Args:
+            hoja: 'certificados_qr', 'menciones' o 'clientes'
+        """
+        if hoja == 'certificados_qr':
+            if self._sin_cambios(hoja, self._indice_certificados_version):
+                self._indice_certificados_timestamp = datetime.now()
+            else:
+                registrar_cache('certificados', 'refresh')
+                self._cargar_indice_certificados(force_refresh=True)
+        elif hoja == 'menciones':
+            if self._sin_cambios(hoja, self._cache_menciones_version):
+                self._cache_menciones_timestamp = datetime.now()
+            else:
+                registrar_cache('menciones', 'refresh')
+                self.get_menciones(force_refresh=True)
+        elif hoja == 'clientes':
+            if self._sin_cambios(hoja, self._cache_clientes_version):
+                self._cache_clientes_timestamp = datetime.now()
+            else:
+                registrar_cache('clientes', 'refresh')
+                self.get_all_clientes(force_refresh=True)
+        else:
+            raise ValueError(f"Hoja sin caché: {hoja}")
+    
+    def _cargar_indice_certificados(self, force_refresh: bool = False, completa: bool = False) -> Dict[str, Dict]:
+        """
+        Construye el índice código -> fila de CERTIFICADOS QR
+        
+        Args:
+            force_refresh: Si es True, vuelve a sincronizar aunque el índice esté vigente
+            completa: Si es True, descarga la hoja completa en lugar de solo las filas nuevas
+        """
+        if not force_refresh and self._indice_certificados is not None and self._cache_utilizable(self._indice_certificados_timestamp, 'certificados_qr', self._indice_certificados_version):
+            registrar_cache('certificados', 'hit')
+            return self._indice_certificados
+        if not force_refresh:
+            registrar_cache('certificados', 'miss')
+        
+        def sincronizar():
+            # La versión se consulta antes de leer: un cambio durante la lectura se detecta en la próxima consulta
+            version = self._version_hoja('certificados_qr')
+            en_memoria = self._indice_certificados_version if self._registros_certificados is not None else None
+            records = None if completa else self._leer_replica('certificados_qr', version, en_memoria)
+            if records is not None:
+                # Otro worker (o un arranque anterior) ya sincronizó esta versión
+                self._indexar_certificados(records)
+                meta = self._replica.meta('certificados_qr')
+                self._sync_completa_timestamp = meta['completa'] if meta else None
+                version = meta['version'] if meta else version
+            else:
+                nuevas = None if completa else self._sincronizar_cola_certificados()
+                if nuevas == {} and version is not None and version != self._indice_certificados_version:
+                    key = self._spreadsheet_key('certificados')
+                    if key in self._escrituras_locales:
+                        # El cambio lo explican escrituras de este worker, ya aplicadas al índice
+                        self._escrituras_locales.discard(key)
+                    else:
+                        # El spreadsheet cambió sin filas nuevas: se editaron filas ya sincronizadas
+                        # (p.ej. ANULADO o una corrección de nombre), que solo se ven en una descarga completa
+                        log.debug("CERTIFICADOS QR cambió sin filas nuevas: descarga completa")
+                        nuevas = None
+                if nuevas is not None:
+                    self._guardar_filas_replica('certificados_qr', nuevas, version)
+                else:
+                    try:
+                        worksheet_qr = self._worksheet('CERTIFICADOS QR')
+                        records = self._leer_registros(worksheet_qr, 'CERTIFICADOS QR')
+                    except gspread.exceptions.WorksheetNotFound:
+                        log.debug("Hoja CERTIFICADOS QR no encontrada, índice vacío")
+                        records = []
+                    self._indexar_certificados(records)
+                    self._sync_completa_timestamp = datetime.now()
+                    self._escrituras_locales.discard(self._spreadsheet_key('certificados'))
+                    self._guardar_replica('certificados_qr', records, version)
+            self._indice_certificados_version = version
+            return self._indice_certificados
+        
+        # Una sola sincronización a la vez (la incremental agrega filas a la lista en caché)
+        return self._lecturas.do(('indice', 'certificados_qr', completa), sincronizar)
+    
+    def _sincronizar_cola_certificados(self) -> Optional[Dict[int, Dict]]:
+        """
+        Sincronización incremental de CERTIFICADOS QR (la hoja solo crece con append_row):
+        lee los headers y las filas desde la última sincronizada (ancla) hasta el final en una
+        sola llamada y agrega las nuevas al índice.
+        
+        Retorna las filas nuevas (fila del Sheet -> registro), o None si hace falta una
+        descarga completa: no hay caché previa, cambiaron los
+        headers, la fila ancla ya no tiene el mismo código (se eliminaron o insertaron filas)
+        o pasó SHEETS_FULL_SYNC_SECONDS desde la última descarga completa (las ediciones de
+        filas anteriores solo se ven en una descarga completa).
+        """
+        registros = self._registros_certificados
+        schema = self._schemas.get(('certificados', 'CERTIFICADOS QR'))
+        if registros is None or not schema or self._sync_completa_timestamp is None:
+            return None
+        if datetime.now() - self._sync_completa_timestamp >= self._sync_completa_intervalo:
+            return None
+        
+        headers = schema.headers
+        ultima_columna = re.sub(r'\d', '', rowcol_to_a1(1, len(headers)))
+        sincronizadas = len(registros)
+        fila_ancla = sincronizadas + 1  # Última fila ya sincronizada (la fila 1 son los headers)
+        try:
+            worksheet_qr = self._worksheet('CERTIFICADOS QR')
+            rango_headers, cola = worksheet_qr.batch_get(['1:1', f'A{max(fila_ancla, 2)}:{ultima_columna}'])
+        except gspread.exceptions.WorksheetNotFound:
+            return None
+        
+        headers_actuales = list(rango_headers[0]) if rango_headers else []
+        while headers_actuales and headers_actuales[-1] == '':
+            headers_actuales.pop()
+        headers_cache = list(headers)
+        while headers_cache and headers_cache[-1] == '':
+            headers_cache.pop()
+        if headers_actuales != headers_cache:
+            return None
+        
+        filas = [list(fila) + [''] * (len(headers) - len(fila)) for fila in cola]
+        if sincronizadas:
+            if not filas:
+                return None  # La última fila sincronizada quedó vacía: se eliminaron filas
+            ancla = dict(zip(headers, filas[0]))
+            if self._normalizar_codigo(self._codigo_de_registro(ancla)) != self._normalizar_codigo(self._codigo_de_registro(registros[-1])):
+                return None
+            filas = filas[1:]
+        
+        nuevas = {}
+        with self._lock_certificados:
+            indice = self._indice_certificados
+            for fila, valores in enumerate(filas, start=fila_ancla + 1 if sincronizadas else 2):
+                if fila < len(registros) + 2:
+                    continue  # Ya agregada por create_certificate mientras se leía la cola
+                if fila > len(registros) + 2:
+                    return None
+                record = dict(zip(headers, numericise_all(valores, default_blank="")))
+                registros.append(record)
+                nuevas[fila] = record
+                clave = self._normalizar_codigo(self._codigo_de_registro(record))
+                if clave and clave not in indice:
+                    indice[clave] = {'fila': fila, 'record': record}
+        
+        self._indice_certificados_timestamp = datetime.now()
+        if nuevas:
+            self._codigos_inexistentes.limpiar()
+        log.debug("Sincronización incremental de CERTIFICADOS QR: %d filas nuevas", len(nuevas))
+        log_evento.contar('certificados_filas_nuevas', len(nuevas))
+        return nuevas
+    
+    def _indexar_certificados(self, records: List[Dict]) -> Dict[str, Dict]:
+        """Reemplaza el índice de CERTIFICADOS QR a partir de los registros descargados"""
+        indice = {}
+        for fila, record in enumerate(records, start=2):  # start=2 porque row 1 es header
+            clave = self._normalizar_codigo(self._codigo_de_registro(record))
+            if clave and clave not in indice:
+                indice[clave] = {'fila': fila, 'record': record}
+        log.debug("Índice de CERTIFICADOS QR construido con %d códigos", len(indice))
+        
+        self._indice_certificados = indice
+        self._registros_certificados = records
+        self._indice_certificados_timestamp = datetime.now()
+        self._codigos_inexistentes.limpiar()
+        return indice
+    
+    def _cargar_indice_principal(self, force_refresh: bool = False) -> Dict[str, Dict]:
+        """Construye el índice código -> fila de la hoja principal (solo se usa como fallback)"""
+        if not force_refresh and self._indice_principal is not None:
+            # Está en el mismo spreadsheet que CERTIFICADOS QR: se recarga solo si este cambió
+            sin_cambios = self._sin_cambios('certificados_qr', self._indice_principal_version)
+            if sin_cambios or (sin_cambios is None and self._indice_vigente(self._indice_principal_timestamp)):
+                return self._indice_principal
+        
+        version = self._version_hoja('certificados_qr')
+        indice = {}
+        records = self._leer_registros(self.sheet, '__principal__')
+        for fila, record in enumerate(records, start=2):
+            clave = self._normalizar_codigo(record.get("codigo", ""))
+            if clave and clave not in indice:
+                indice[clave] = {'fila': fila, 'record': record}
+        
+        self._indice_principal = indice
+        self._indice_principal_timestamp = datetime.now()
+        self._indice_principal_version = version
+        self._codigos_inexistentes.limpiar()
+        return indice
+    
+    def _buscar_entrada_qr(self, codigo: str) -> Optional[Dict]:
+        """
+        Busca la entrada de un código en el índice de CERTIFICADOS QR.
+        Si no está, sincroniza el índice una vez por si la fila se agregó directamente en el Sheet,
+        salvo que se haya sincronizado hace menos de _resincronizacion_min: así una ráfaga de
+        códigos inexistentes no genera una llamada a Google Sheets por código.
+        """
+        clave = self._normalizar_codigo(codigo)
+        if not clave:
+            return None
+        recien_cargado = self._indice_certificados is None or not self._cache_utilizable(self._indice_certificados_timestamp, 'certificados_qr', self._indice_certificados_version)
+        entrada = self._cargar_indice_certificados().get(clave)
+        if entrada is None and not recien_cargado:
+            sincronizado = self._indice_certificados_timestamp
+            if sincronizado is None or datetime.now() - sincronizado >= self._resincronizacion_min:
+                entrada = self._cargar_indice_certificados(force_refresh=True).get(clave)
+        return entrada
+    
+    def _agregar_al_indice(self, indice: Optional[Dict[str, Dict]], codigo: str, response, headers: List[str], row: List[str]):
+        """Agrega al índice una fila recién escrita con append_row (sin volver a descargar la hoja)"""
+        if indice is None:
+            return
+        clave = self._normalizar_codigo(codigo)
+        fila = self._fila_de_append(response)
+        if not clave:
+            return
+        self._codigos_inexistentes.descartar(clave)
+        if fila is None:
+            # No se pudo determinar la fila: forzar reconstrucción en la próxima búsqueda
+            indice.clear()
+            return
+        entrada = {'fila': fila, 'record': dict(zip(headers, row))}
+        indice[clave] = entrada
+        return entrada
+    
+    def _agregar_registro_qr(self, entrada: Optional[Dict]):
+        """Mantiene la lista de filas de CERTIFICADOS QR alineada con una fila recién agregada"""
+        registros = self._registros_certificados
+        if registros is None:
+            return
+        with self._lock_certificados:
+            if entrada and entrada['fila'] < len(registros) + 2:
+                # Ya agregada por una sincronización incremental: compartir el mismo registro que el índice
+                registros[entrada['fila'] - 2] = entrada['record']
+                return
+            if entrada and entrada['fila'] == len(registros) + 2:
+                registros.append(entrada['record'])
+                self._guardar_filas_replica('certificados_qr', {entrada['fila']: entrada['record']})
+                return
+        # La hoja tiene filas que no conocemos (agregadas directamente): sincronizar en la próxima lectura
+        self._indice_certificados_timestamp = None
+    
+    def _verificar_fila(self, worksheet, schema: SheetSchema, entrada: Optional[Dict], codigo: str, columnas_codigo: List[str]) -> bool:
+        """Comprueba con una sola celda que la fila del índice siga correspondiendo al código"""
+        if not entrada:
+            return False
+        col_codigo = next((schema.col(h) for h in columnas_codigo if schema.col(h)), None)
+        if col_codigo is None:
+            return True
+        valor = worksheet.cell(entrada['fila'], col_codigo).value
+        return self._normalizar_codigo(valor) == self._normalizar_codigo(codigo)
+    
+    def _localizar_fila_qr(self, worksheet_qr, schema: SheetSchema, codigo: str) -> Optional[Dict]:
+        """Obtiene la entrada del índice de CERTIFICADOS QR lista para escribir en su fila"""
+        entrada = self._buscar_entrada_qr(codigo)
+        if entrada and not self._verificar_fila(worksheet_qr, schema, entrada, codigo, COLUMNAS_CODIGO_QR):
+            # Las filas se desplazaron (p.ej. se eliminó una fila directamente en el Sheet)
+            entrada = self._cargar_indice_certificados(force_refresh=True, completa=True).get(self._normalizar_codigo(codigo))
+        return entrada
+    
+    def _localizar_fila_principal(self, schema: SheetSchema, codigo: str) -> Optional[Dict]:
+        """Obtiene la entrada del índice de la hoja principal lista para escribir en su fila"""
+        clave = self._normalizar_codigo(codigo)
+        entrada = self._cargar_indice_principal().get(clave)
+        if not self._verificar_fila(self.sheet, schema, entrada, codigo, COLUMNAS_CODIGO_PRINCIPAL):
+            entrada = self._cargar_indice_principal(force_refresh=True).get(clave)
+        return entrada
+    
+    def _mapear_certificado_qr(self, record: Dict) -> Dict:
+        """Mapea un registro de CERTIFICADOS QR al formato esperado (incluyendo los campos de la mención)"""
+        return mapear_certificado_qr(record)
+    
+    def get_certificate_by_code(self, codigo: str) -> Optional[Dict]:
+        """Busca un certificado por código en CERTIFICADOS QR (usando el índice en memoria)"""
+        try:
+            clave = self._normalizar_codigo(codigo)
+            if not clave:
+                return None
+            # Código buscado hace poco y que no existía: responder sin tocar los índices
+            if self._codigos_inexistentes.contiene(clave):
+                registrar_cache('codigos_inexistentes', 'hit')
+                return None
+            
+            # Buscar primero en CERTIFICADOS QR (donde se guardan los certificados ahora)
+            entrada = self._buscar_entrada_qr(codigo)
+            if entrada:
+                return self._mapear_certificado_qr(entrada['record'])
             
             # Fallback: buscar en la hoja principal (por compatibilidad)
-            print(f"DEBUG get_certificate_by_code: Buscando en hoja principal como fallback")
-            records = self.sheet.get_all_records()
-            for record in records:
-                if record.get("codigo", "").strip().lower() == codigo.strip().lower():
-                    print(f"DEBUG get_certificate_by_code: Certificado encontrado en hoja principal")
-                    return record
+            entrada = self._cargar_indice_principal().get(clave)
+            if entrada:
+                return entrada['record']
             
-            print(f"DEBUG get_certificate_by_code: Certificado no encontrado en ninguna hoja")
+            self._codigos_inexistentes.agregar(clave)
             return None
         except Exception as e:
-            print(f"DEBUG get_certificate_by_code: Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error buscando certificado %s: %s", codigo, e)
             raise Exception(f"Error buscando certificado: {str(e)}")
     
     def create_certificate(self, data: Dict, mencion_data: Optional[Dict] = None) -> Dict:
@@ -255,7 +785,10 @@ class GoogleSheetsService:
             
             # 1. Guardar en la hoja original (certificados)
             try:
-                headers = self.sheet.row_values(1)
+                schema = self._schema_principal()
+                if not schema.headers:
+                    schema = self._schema_principal(refresh=True)
+                headers = schema.headers
                 if not headers:
                     raise Exception("La hoja de certificados no tiene headers definidos")
                 
@@ -264,155 +797,55 @@ class GoogleSheetsService:
                     value = data.get(header, "")
                     row.append(str(value) if value else "")
                 
-                print(f"DEBUG: Guardando en hoja certificados - Headers: {headers}")
-                print(f"DEBUG: Datos a guardar: {data}")
-                print(f"DEBUG: Fila preparada: {row}")
+                log.debug("Guardando en hoja certificados - Headers: %s, fila: %s", headers, row)
                 
-                self.sheet.append_row(row)
-                print(f"DEBUG: Certificado guardado exitosamente en hoja principal")
+                response = self.sheet.append_row(row)
+                self._escritura_local('certificados')
+                self._agregar_al_indice(self._indice_principal, data.get("codigo"), response, headers, row)
+                log.debug("Certificado %s guardado en hoja principal", data.get("codigo"))
             except Exception as e_main:
-                print(f"ERROR guardando en hoja principal: {str(e_main)}")
-                import traceback
-                traceback.print_exc()
+                log.exception("Error guardando en hoja principal: %s", e_main)
                 raise Exception(f"Error guardando en hoja de certificados: {str(e_main)}")
             
             # 2. Guardar también en CERTIFICADOS QR con datos del cliente
             try:
-                print(f"DEBUG: Intentando obtener hoja 'CERTIFICADOS QR' del spreadsheet de certificados")
-                print(f"DEBUG: Spreadsheet ID: {settings.SHEETS['certificados']['id']}")
-                
-                # Obtener el spreadsheet de certificados
-                spreadsheet = self.spreadsheets.get('certificados')
-                if not spreadsheet:
-                    sheet_id = settings.SHEETS['certificados']['id']
-                    spreadsheet = self.client.open_by_key(sheet_id)
-                    self.spreadsheets['certificados'] = spreadsheet
-                
-                # Listar todas las hojas disponibles para debug
-                available_sheets = [ws.title for ws in spreadsheet.worksheets()]
-                print(f"DEBUG: Hojas disponibles en el spreadsheet: {available_sheets}")
-                
-                # Obtener la hoja CERTIFICADOS QR
-                worksheet_qr = spreadsheet.worksheet('CERTIFICADOS QR')
-                print(f"DEBUG: OK - Hoja 'CERTIFICADOS QR' obtenida exitosamente")
-                
-                # Obtener headers de la fila 1
-                # Verificar si la hoja tiene datos
-                all_values = worksheet_qr.get_all_values()
-                print(f"DEBUG: Total de filas en la hoja: {len(all_values)}")
-                
-                # Obtener headers de la fila 1
-                headers_qr = worksheet_qr.row_values(1) if len(all_values) > 0 else []
-                print(f"DEBUG: Headers de CERTIFICADOS QR (fila 1): {headers_qr}")
+                # Obtener la hoja CERTIFICADOS QR y sus headers (en caché)
+                worksheet_qr = self._worksheet('CERTIFICADOS QR')
+                schema_qr = self._schema(worksheet_qr, 'CERTIFICADOS QR')
+                if not schema_qr:
+                    # Los headers en caché pueden ser anteriores a una corrección manual
+                    schema_qr = self._schema(worksheet_qr, 'CERTIFICADOS QR', refresh=True)
+                headers_qr = schema_qr.headers
+                log.debug("Headers de CERTIFICADOS QR (fila 1): %s", headers_qr)
                 
                 # Si no hay headers o la hoja está vacía, crear headers básicos en la fila 1
                 if not headers_qr or all(not h.strip() for h in headers_qr if h):
-                    print(f"DEBUG: La hoja no tiene headers validos, creando headers basicos en fila 1...")
-                    headers_basicos = [
-                        'CODIGO', 
-                        'DNI DEL CLIENTE', 
-                        'NOMBRE COMPLETO DEL CLIENTE', 
-                        'CELULAR DEL CLIENTE',
-                        'CORREO DEL CLIENTE',
-                        'CURSO', 
-                        'FECHA EMISION', 
-                        'HORAS', 
-                        'ESTADO', 
-                        'PDF_URL',
-                        'NRO',
-                        'ESPECIALIDAD',
-                        'P. CERTIFICADO',
-                        'MENCIÓN',
-                        'F. INICIO',
-                        'F. TÉRMINO'
-                    ]
+                    log.info("CERTIFICADOS QR no tiene headers válidos, creando headers básicos en fila 1")
+                    headers_basicos = list(HEADERS_BASICOS_CERTIFICADOS_QR.values())
                     
                     # Si la hoja está completamente vacía, usar append_row
                     # Si tiene algo pero no headers válidos, actualizar la fila 1
+                    all_values = worksheet_qr.get_all_values()
                     if len(all_values) == 0:
                         worksheet_qr.append_row(headers_basicos)
-                        print(f"DEBUG: Headers creados con append_row (hoja vacia)")
                     else:
-                        # Actualizar la fila 1 con los headers
-                        for col_idx, header in enumerate(headers_basicos, start=1):
-                            worksheet_qr.update_cell(1, col_idx, header)
-                        print(f"DEBUG: Headers actualizados en fila 1")
+                        # Actualizar la fila 1 con los headers (una sola escritura de rango)
+                        rango_headers = f"A1:{rowcol_to_a1(1, len(headers_basicos))}"
+                        self._writes.add_range(worksheet_qr, rango_headers, [headers_basicos])
                     
                     headers_qr = headers_basicos
-                    print(f"DEBUG: Headers finales: {headers_qr}")
+                    self._schemas[('certificados', 'CERTIFICADOS QR')] = SheetSchema(headers_basicos)
                 
-                # Obtener nombre completo: primero intentar desde 'nombre_completo' o 'NOMBRE COMPLETO DEL CLIENTE'
-                # Si no está, combinar nombres + apellidos del formulario
-                nombre_completo = (
-                    data.get('nombre_completo', '') or 
-                    data.get('NOMBRE COMPLETO DEL CLIENTE', '') or
-                    data.get('nombreCompleto', '')
-                )
-                
-                # Si no hay nombre completo directo, combinar nombres + apellidos
-                if not nombre_completo:
-                    nombres = data.get('nombres', '') or data.get('NOMBRES', '')
-                    apellidos = data.get('apellidos', '') or data.get('APELLIDOS', '')
-                    nombre_completo = f"{nombres} {apellidos}".strip()
+                # Valores por campo lógico; cada header se resuelve a su campo con un dict precompilado
+                valores_por_campo = valores_alta_certificado(data, mencion_data)
+                nombre_completo = valores_por_campo['nombre_completo']
                 
                 # Mapear los datos del certificado a los headers de CERTIFICADOS QR
                 row_qr = []
                 for header in headers_qr:
-                    header_upper = header.upper().strip()
-                    
-                    # Mapear campos comunes
-                    if header_upper in ['CODIGO', 'CÓDIGO', 'CODIGO CERTIFICADO']:
-                        value = data.get('codigo', '') or data.get('CODIGO', '')
-                    elif header_upper in ['DNI', 'DNI DEL CLIENTE', 'DNI CLIENTE']:
-                        # Solo guardar DNI si está disponible
-                        value = data.get('dni', '') or data.get('DNI', '') or ''
-                    elif header_upper in ['NOMBRE COMPLETO', 'NOMBRE COMPLETO DEL CLIENTE', 'NOMBRE', 'CLIENTE', 'NOMBRES', 'APELLIDOS']:
-                        # Para cualquier campo de nombre, usar nombre completo (un solo campo)
-                        value = nombre_completo
-                    elif header_upper in ['CELULAR DEL CLIENTE', 'CELULAR', 'TELEFONO', 'TELÉFONO', 'PHONE']:
-                        value = (
-                            data.get('CELULAR DEL CLIENTE', '')
-                            or data.get('telefono', '')
-                            or data.get('TELEFONO', '')
-                            or data.get('CELULAR', '')
-                        )
-                    elif header_upper in ['CORREO DEL CLIENTE', 'CORREO', 'EMAIL', 'E-MAIL']:
-                        value = (
-                            data.get('CORREO DEL CLIENTE', '')
-                            or data.get('email', '')
-                            or data.get('EMAIL', '')
-                            or data.get('CORREO', '')
-                        )
-                    elif header_upper in ['CURSO', 'NOMBRE DEL CURSO']:
-                        value = data.get('curso', '') or data.get('CURSO', '')
-                    elif header_upper in ['FECHA EMISION', 'FECHA DE EMISIÓN', 'FECHA EMISIÓN', 'FECHA']:
-                        value = data.get('fecha_emision', '') or data.get('FECHA_EMISION', '') or data.get('FECHA EMISION', '')
-                    elif header_upper in ['HORAS', 'HORAS TOTALES', 'TOTAL HORAS']:
-                        # Priorizar horas de la mención si está disponible
-                        value = data.get('mencion_horas', '') or data.get('horas', '') or data.get('HORAS', '') or (mencion_data.get('HORAS', '') if mencion_data else '')
-                    elif header_upper in ['ESTADO', 'ESTADO CERTIFICADO']:
-                        value = data.get('estado', 'VALIDO') or data.get('ESTADO', 'VALIDO')
-                    elif header_upper in ['PDF_URL', 'PDF URL', 'URL PDF', 'URL']:
-                        value = data.get('pdf_url', '') or data.get('PDF_URL', '')
-                    elif header_upper in ['NRO', 'NRO MENCION', 'NUMERO MENCION', 'MENCIÓN NRO']:
-                        # Número de la mención
-                        value = data.get('mencion_nro', '') or (mencion_data.get('NRO', '') if mencion_data else '')
-                    elif header_upper in ['ESPECIALIDAD', 'ESPECIALIDAD MENCION']:
-                        # Especialidad de la mención
-                        value = data.get('mencion_especialidad', '') or (mencion_data.get('ESPECIALIDAD', '') if mencion_data else '')
-                    elif header_upper in ['P. CERTIFICADO', 'P CERTIFICADO', 'PROGRAMA CERTIFICADO', 'PROGRAMA']:
-                        # Programa/Certificado de la mención
-                        value = data.get('mencion_p_certificado', '') or (mencion_data.get('P. CERTIFICADO', '') if mencion_data else '')
-                    elif header_upper in ['MENCIÓN', 'MENCION', 'TEXTO MENCION']:
-                        # Texto completo de la mención
-                        value = data.get('mencion_texto', '') or (mencion_data.get('MENCIÓN', '') if mencion_data else '')
-                    elif header_upper in ['F. INICIO', 'FECHA INICIO', 'FECHA DE INICIO', 'F INICIO']:
-                        # Fecha de inicio
-                        value = data.get('fecha_inicio', '') or (mencion_data.get('F. INICIO', '') if mencion_data else '')
-                    elif header_upper in ['F. TÉRMINO', 'F. TERMINO', 'FECHA TERMINO', 'FECHA DE TERMINO', 'F TERMINO']:
-                        # Fecha de término
-                        value = data.get('fecha_termino', '') or (mencion_data.get('F. TÉRMINO', '') if mencion_data else '')
-                    # Nota: Se eliminó el campo "F. EMISIÓN" de la mención en CERTIFICADOS QR para evitar duplicidad con "FECHA EMISION".
+                    campo = CAMPO_ALTA_POR_HEADER.get(header.upper().strip())
+                    if campo:
+                        value = valores_por_campo[campo]
                     else:
                         # Intentar buscar el valor directamente
                         value = data.get(header, '') or data.get(header.upper(), '') or data.get(header.lower(), '')
@@ -420,15 +853,14 @@ class GoogleSheetsService:
                     row_qr.append(str(value) if value else "")
                 
                 # Agregar fila a CERTIFICADOS QR
-                print(f"DEBUG: Preparando fila para CERTIFICADOS QR: {row_qr}")
-                worksheet_qr.append_row(row_qr)
-                print(f"DEBUG: OK - Certificado guardado exitosamente en CERTIFICADOS QR: codigo={data.get('codigo')}, nombre={nombre_completo}")
+                log.debug("Fila para CERTIFICADOS QR: %s", row_qr)
+                response_qr = worksheet_qr.append_row(row_qr)
+                entrada_qr = self._agregar_al_indice(self._indice_certificados, data.get("codigo"), response_qr, headers_qr, row_qr)
+                self._agregar_registro_qr(entrada_qr)
+                log.debug("Certificado guardado en CERTIFICADOS QR: codigo=%s, nombre=%s", data.get('codigo'), nombre_completo)
             except Exception as e_qr:
                 # Si falla guardar en CERTIFICADOS QR, mostrar error detallado
-                import traceback
-                error_trace = traceback.format_exc()
-                print(f"ERROR: No se pudo guardar en CERTIFICADOS QR: {str(e_qr)}")
-                print(f"Traceback completo: {error_trace}")
+                log.exception("No se pudo guardar en CERTIFICADOS QR: %s", e_qr)
                 # NO fallar la creación del certificado principal, pero mostrar el error claramente
                 # El certificado ya se guardó en la hoja principal, así que continuamos
             
@@ -437,39 +869,38 @@ class GoogleSheetsService:
                 certificado_creado = self.get_certificate_by_code(data["codigo"])
                 if not certificado_creado:
                     # Si no se encuentra, retornar los datos que se enviaron
-                    print(f"ADVERTENCIA: No se pudo recuperar el certificado recién creado, retornando datos enviados")
+                    log.warning("No se pudo recuperar el certificado recién creado, retornando datos enviados")
                     return data
                 return certificado_creado
             except Exception as e_retrieve:
-                print(f"ADVERTENCIA: Error recuperando certificado creado: {str(e_retrieve)}")
+                log.warning("Error recuperando certificado creado: %s", e_retrieve)
                 # Retornar los datos que se enviaron como fallback
                 return data
         except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
             # Limpiar caracteres Unicode problemáticos del mensaje de error
             error_msg = str(e).encode('ascii', 'ignore').decode('ascii')
-            print(f"ERROR completo en create_certificate: {error_msg}")
-            print(f"Traceback completo: {error_trace.encode('ascii', 'ignore').decode('ascii')}")
+            log.exception("Error en create_certificate: %s", error_msg)
             raise Exception(f"Error creando certificado: {error_msg}")
     
     def update_certificate(self, codigo: str, data: Dict) -> Dict:
         """Actualiza un certificado existente"""
         try:
-            records = self.sheet.get_all_records()
-            headers = self.sheet.row_values(1)
+            schema = self._schema_principal()
             
-            # Encontrar la fila
-            for idx, record in enumerate(records, start=2):  # start=2 porque row 1 es header
-                if record.get("codigo", "").strip().lower() == codigo.strip().lower():
-                    # Actualizar valores
-                    for header in headers:
-                        if header in data:
-                            col_idx = headers.index(header) + 1
-                            self.sheet.update_cell(idx, col_idx, str(data[header]))
-                    return self.get_certificate_by_code(codigo)
-            
-            raise ValueError(f"Certificado con código {codigo} no encontrado")
+            # Encontrar la fila usando el índice
+            entrada = self._localizar_fila_principal(schema, codigo)
+            if not entrada:
+                raise ValueError(f"Certificado con código {codigo} no encontrado")
+            
+            # Actualizar valores (un solo batch_update)
+            with self._writes.operation():
+                for header in schema.headers:
+                    if header in data:
+                        col_idx = schema.col(header)
+                        self._writes.add_cell(self.sheet, entrada['fila'], col_idx, str(data[header]))
+                        entrada['record'][header] = str(data[header])
+            self._escritura_local('certificados')
+            return self.get_certificate_by_code(codigo)
         except Exception as e:
             raise Exception(f"Error actualizando certificado: {str(e)}")
     
@@ -483,156 +914,81 @@ class GoogleSheetsService:
     def update_certificate_pdf_url(self, codigo: str, pdf_url: str) -> bool:
         """Actualiza la URL del PDF en CERTIFICADOS QR"""
         try:
-            # Obtener el spreadsheet de certificados
-            spreadsheet = self.spreadsheets.get('certificados')
-            if not spreadsheet:
-                sheet_id = settings.SHEETS['certificados']['id']
-                spreadsheet = self.client.open_by_key(sheet_id)
-                self.spreadsheets['certificados'] = spreadsheet
-            
-            # Obtener la hoja CERTIFICADOS QR
-            worksheet_qr = spreadsheet.worksheet('CERTIFICADOS QR')
-            records = worksheet_qr.get_all_records()
-            headers = worksheet_qr.row_values(1)
-            
-            # Buscar el índice de la columna PDF_URL
-            pdf_url_col_idx = None
-            for idx, header in enumerate(headers):
-                if header.upper().strip() in ['PDF_URL', 'PDF URL', 'URL PDF', 'URL']:
-                    pdf_url_col_idx = idx + 1  # gspread usa índices base 1
-                    break
+            # Hoja CERTIFICADOS QR y columna PDF_URL desde la caché de headers
+            worksheet_qr = self._worksheet('CERTIFICADOS QR')
+            schema = self._schema(worksheet_qr, 'CERTIFICADOS QR')
+            pdf_url_col_idx = schema.col_alias(['PDF_URL', 'PDF URL', 'URL PDF', 'URL'])
+            if not pdf_url_col_idx:
+                # La columna pudo agregarse después de cachear los headers
+                schema = self._schema(worksheet_qr, 'CERTIFICADOS QR', refresh=True)
+                pdf_url_col_idx = schema.col_alias(['PDF_URL', 'PDF URL', 'URL PDF', 'URL'])
             
             if not pdf_url_col_idx:
-                print(f"ADVERTENCIA: No se encontró columna PDF_URL en CERTIFICADOS QR")
+                log.warning("No se encontró columna PDF_URL en CERTIFICADOS QR")
                 return False
             
-            # Buscar la fila con el código
-            for row_idx, record in enumerate(records, start=2):  # start=2 porque row 1 es header
-                codigo_record = (
-                    record.get("CODIGO", "") or 
-                    record.get("CÓDIGO", "") or 
-                    record.get("codigo", "")
-                )
-                codigo_clean = str(codigo_record).strip() if codigo_record else ""
-                
-                if codigo_clean and codigo_clean.lower() == codigo.strip().lower():
-                    # Actualizar la celda PDF_URL
-                    worksheet_qr.update_cell(row_idx, pdf_url_col_idx, pdf_url)
-                    print(f"DEBUG: PDF_URL actualizado para codigo={codigo}: {pdf_url}")
-                    return True
+            # Buscar la fila con el código usando el índice
+            entrada = self._localizar_fila_qr(worksheet_qr, schema, codigo)
+            if entrada:
+                # Actualizar la celda PDF_URL
+                self._writes.add_cell(worksheet_qr, entrada['fila'], pdf_url_col_idx, pdf_url)
+                entrada['record'][schema.headers[pdf_url_col_idx - 1]] = pdf_url
+                self._guardar_filas_replica('certificados_qr', {entrada['fila']: entrada['record']})
+                self._escritura_local('certificados')
+                log.debug("PDF_URL actualizado para codigo=%s: %s", codigo, pdf_url)
+                return True
             
-            print(f"ADVERTENCIA: Certificado con codigo={codigo} no encontrado en CERTIFICADOS QR")
+            log.warning("Certificado con codigo=%s no encontrado en CERTIFICADOS QR", codigo)
             return False
         except Exception as e:
-            print(f"ERROR actualizando PDF_URL: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error actualizando PDF_URL de %s: %s", codigo, e)
             return False
     
     def update_certificate_fields(self, codigo: str, fields: Dict) -> bool:
         """Actualiza múltiples campos de un certificado en CERTIFICADOS QR"""
         try:
-            # Obtener el spreadsheet de certificados
-            spreadsheet = self.spreadsheets.get('certificados')
-            if not spreadsheet:
-                sheet_id = settings.SHEETS['certificados']['id']
-                spreadsheet = self.client.open_by_key(sheet_id)
-                self.spreadsheets['certificados'] = spreadsheet
-            
-            # Obtener la hoja CERTIFICADOS QR
-            worksheet_qr = spreadsheet.worksheet('CERTIFICADOS QR')
-            records = worksheet_qr.get_all_records()
-            headers = worksheet_qr.row_values(1)
+            # Hoja CERTIFICADOS QR y headers desde la caché
+            worksheet_qr = self._worksheet('CERTIFICADOS QR')
+            schema = self._schema(worksheet_qr, 'CERTIFICADOS QR')
             
             # Asegurar que las columnas existan, si no, crearlas
-            headers_upper = [h.upper().strip() for h in headers]
             new_headers = []
-            
-            # Mapeo de nombres de campos a posibles nombres de columnas en el Sheet
-            field_to_column_map = {
-                'CODIGO CERTIFICADO': ['CODIGO CERTIFICADO', 'CODIGO_CERTIFICADO', 'CÓDIGO CERTIFICADO'],
-                'FECHA_GENERACION': ['FECHA GENERACION', 'FECHA_GENERACION', 'FECHA DE GENERACION', 'FECHA GENERACIÓN'],
-                'PDF_URL': ['PDF_URL', 'PDF URL', 'URL PDF', 'URL']
-            }
-            
             for field_name in fields.keys():
-                field_upper = field_name.upper().strip()
-                # Buscar variaciones del nombre de la columna
-                found = False
-                possible_names = field_to_column_map.get(field_name, [field_name])
-                
-                for possible_name in possible_names:
-                    for idx, header_upper in enumerate(headers_upper):
-                        if possible_name.upper().strip() == header_upper or field_upper in header_upper or header_upper in field_upper:
-                            found = True
-                            break
-                    if found:
-                        break
-                
-                if not found:
-                    # Agregar nueva columna solo si no es un campo mapeado
-                    if field_name not in field_to_column_map:
-                        new_headers.append(field_name)
-                    else:
-                        # Usar el primer nombre del mapeo como nombre de columna
-                        new_headers.append(possible_names[0])
-            
-            # Agregar nuevas columnas si es necesario
-            if new_headers:
-                last_col = len(headers)
-                for new_header in new_headers:
-                    worksheet_qr.update_cell(1, last_col + 1, new_header)
-                    headers.append(new_header)
-                    headers_upper.append(new_header.upper().strip())
-                    last_col += 1
-                print(f"DEBUG: Nuevas columnas agregadas: {new_headers}")
-            
-            # Buscar la fila con el código (usando CODIGO, no CODIGO CERTIFICADO)
-            for row_idx, record in enumerate(records, start=2):  # start=2 porque row 1 es header
-                codigo_record = (
-                    record.get("CODIGO", "") or 
-                    record.get("CÓDIGO", "") or 
-                    record.get("codigo", "")
-                )
-                codigo_clean = str(codigo_record).strip() if codigo_record else ""
+                if not schema.col_campo(field_name, ALIAS_ACTUALIZACION_CERTIFICADOS_QR.get(field_name)):
+                    # Para campos mapeados se usa el primer nombre del mapeo como nombre de columna
+                    new_headers.append(ALIAS_ACTUALIZACION_CERTIFICADOS_QR.get(field_name, [field_name])[0])
+            
+            with self._writes.operation():
+                # Agregar nuevas columnas si es necesario
+                if new_headers:
+                    for new_header in new_headers:
+                        self._writes.add_cell(worksheet_qr, 1, len(schema.headers) + 1, new_header)
+                        schema = schema.with_header(new_header)
+                    self._schemas[('certificados', 'CERTIFICADOS QR')] = schema
+                    log.info("Nuevas columnas agregadas a CERTIFICADOS QR: %s", new_headers)
                 
-                if codigo_clean and codigo_clean.lower() == codigo.strip().lower():
+                # Buscar la fila con el código usando el índice (por CODIGO, no CODIGO CERTIFICADO)
+                entrada = self._localizar_fila_qr(worksheet_qr, schema, codigo)
+                if entrada:
+                    row_idx = entrada['fila']
                     # Actualizar cada campo
                     for field_name, field_value in fields.items():
-                        field_upper = field_name.upper().strip()
-                        col_idx = None
-                        
-                        # Buscar la columna usando el mapeo
-                        possible_names = field_to_column_map.get(field_name, [field_name])
-                        for possible_name in possible_names:
-                            for idx, header_upper in enumerate(headers_upper):
-                                if possible_name.upper().strip() == header_upper:
-                                    col_idx = idx + 1  # gspread usa índices base 1
-                                    break
-                            if col_idx:
-                                break
-                        
-                        # Si no se encontró con el mapeo exacto, buscar por similitud
-                        if not col_idx:
-                            for idx, header_upper in enumerate(headers_upper):
-                                if field_upper in header_upper or header_upper in field_upper:
-                                    col_idx = idx + 1
-                                    break
-                        
+                        col_idx = schema.col_campo(field_name, ALIAS_ACTUALIZACION_CERTIFICADOS_QR.get(field_name))
                         if col_idx:
-                            worksheet_qr.update_cell(row_idx, col_idx, str(field_value))
-                            print(f"DEBUG: Campo {field_name} actualizado para codigo={codigo}: {field_value}")
+                            self._writes.add_cell(worksheet_qr, row_idx, col_idx, str(field_value))
+                            entrada['record'][schema.headers[col_idx - 1]] = str(field_value)
+                            log.debug("Campo %s actualizado para codigo=%s: %s", field_name, codigo, field_value)
                         else:
-                            print(f"ADVERTENCIA: No se encontró columna para {field_name}")
+                            log.warning("No se encontró columna para %s", field_name)
                     
+                    self._guardar_filas_replica('certificados_qr', {row_idx: entrada['record']})
+                    self._escritura_local('certificados')
                     return True
             
-            print(f"ADVERTENCIA: Certificado con codigo={codigo} no encontrado en CERTIFICADOS QR")
+            log.warning("Certificado con codigo=%s no encontrado en CERTIFICADOS QR", codigo)
             return False
         except Exception as e:
-            print(f"ERROR actualizando campos del certificado: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error actualizando campos del certificado %s: %s", codigo, e)
             return False
     
     def get_worksheet(self, worksheet_name: str, sheet_type: str = 'certificados'):
@@ -644,28 +1000,25 @@ class GoogleSheetsService:
             sheet_type: Tipo de sheet ('certificados' o 'menciones')
         """
         try:
-            if sheet_type == 'menciones':
-                spreadsheet = self.spreadsheets.get('menciones')
-                if not spreadsheet:
-                    menciones_sheet_id = settings.SHEETS['menciones']['id']
-                    spreadsheet = self.client.open_by_key(menciones_sheet_id)
-                    self.spreadsheets['menciones'] = spreadsheet
-            else:
-                spreadsheet = self.spreadsheets.get('certificados')
-                if not spreadsheet:
-                    sheet_id = settings.SHEETS['certificados']['id']
-                    spreadsheet = self.client.open_by_key(sheet_id)
-                    self.spreadsheets['certificados'] = spreadsheet
-            
-            return spreadsheet.worksheet(worksheet_name)
+            return self._worksheet(worksheet_name, sheet_type)
         except Exception as e:
             raise Exception(f"Error obteniendo worksheet {worksheet_name} de {sheet_type}: {str(e)}")
     
+    def get_all_compras(self) -> List[Dict]:
+        """Obtiene todas las filas de la hoja compras (la fila N del Sheet es records[N - 2])"""
+        # Los índices de fila deben ser exactos: la réplica solo se usa si tiene la versión actual
+        version = self._version_hoja('compras')
+        records = self._leer_replica('compras', version) if version is not None else None
+        if records is None:
+            worksheet = self.get_worksheet('compras', sheet_type='certificados')
+            records = self._leer_registros(worksheet, 'compras')
+            self._guardar_replica('compras', records, version)
+        return records
+    
     def get_compras_pendientes(self) -> List[Dict]:
         """Obtiene compras pendientes de procesar (sin código generado)"""
         try:
-            worksheet = self.get_worksheet('compras', sheet_type='certificados')
-            records = worksheet.get_all_records()
+            records = self.get_all_compras()
             
             # Filtrar compras sin código o con código vacío
             pendientes = []
@@ -688,25 +1041,29 @@ class GoogleSheetsService:
         """
         try:
             worksheet = self.get_worksheet('compras', sheet_type='certificados')
-            headers = worksheet.row_values(1)
+            schema = self._schema(worksheet, 'compras')
             
             # Encontrar índices de columnas
             updates = {}
             
-            if 'codigo' in headers:
-                codigo_col = headers.index('codigo') + 1
-                updates[codigo_col] = codigo
+            if schema.col('codigo'):
+                updates[schema.col('codigo')] = codigo
             
             # Actualizar otros campos si se proporcionan
             for key, value in kwargs.items():
-                if key in headers:
-                    col_idx = headers.index(key) + 1
-                    updates[col_idx] = str(value)
+                if schema.col(key):
+                    updates[schema.col(key)] = str(value)
             
-            # Actualizar todas las celdas de una vez (más eficiente)
+            # Actualizar todas las celdas de una vez (un solo batch_update)
             if updates:
-                for col_idx, value in updates.items():
-                    worksheet.update_cell(row_index, col_idx, value)
+                with self._writes.operation():
+                    for col_idx, value in updates.items():
+                        self._writes.add_cell(worksheet, row_index, col_idx, value)
+                # La réplica se edita igual que el Sheet: get_compras_pendientes no vuelve a listar la compra
+                campos = {schema.headers[col_idx - 1]: value for col_idx, value in updates.items()}
+                if self._replica is not None:
+                    self._escribir_replica('compras', self._replica.actualizar, 'compras', row_index, campos)
+                self._escritura_local('certificados')
             
             return True
         except Exception as e:
@@ -721,18 +1078,26 @@ class GoogleSheetsService:
         """
         # Verificar si hay caché válido
         if not force_refresh and self._cache_menciones is not None:
-            if self._cache_menciones_timestamp and (datetime.now() - self._cache_menciones_timestamp) < self._cache_ttl:
-                print("DEBUG: Retornando menciones desde caché")
+            if self._cache_utilizable(self._cache_menciones_timestamp, 'menciones', self._cache_menciones_version):
+                registrar_cache('menciones', 'hit')
                 return self._cache_menciones
         
+        if not force_refresh:
+            registrar_cache('menciones', 'miss')
         try:
-            print("DEBUG: Obteniendo menciones desde Google Sheets (sin caché o caché expirado)")
-            worksheet = self.get_worksheet('MENCIONES', sheet_type='menciones')
-            records = worksheet.get_all_records()
+            log.debug("Obteniendo menciones desde Google Sheets (sin caché o caché expirado)")
+            version = self._version_hoja('menciones')
+            en_memoria = self._cache_menciones_version if self._cache_menciones is not None else None
+            records = self._leer_replica('menciones', version, en_memoria)
+            if records is None:
+                worksheet = self.get_worksheet('MENCIONES', sheet_type='menciones')
+                records = self._leer_registros(worksheet, 'MENCIONES', sheet_type='menciones')
+                self._guardar_replica('menciones', records, version)
             
             # Actualizar caché
             self._cache_menciones = records
             self._cache_menciones_timestamp = datetime.now()
+            self._cache_menciones_version = version
             
             return records
         except Exception as e:
@@ -774,24 +1139,32 @@ class GoogleSheetsService:
         """
         # Verificar si hay caché válido
         if not force_refresh and self._cache_clientes is not None:
-            if self._cache_clientes_timestamp and (datetime.now() - self._cache_clientes_timestamp) < self._cache_ttl:
-                print("DEBUG: Retornando clientes desde caché")
+            if self._cache_utilizable(self._cache_clientes_timestamp, 'clientes', self._cache_clientes_version):
+                registrar_cache('clientes', 'hit')
                 return self._cache_clientes
         
+        if not force_refresh:
+            registrar_cache('clientes', 'miss')
         try:
-            print("DEBUG: Obteniendo clientes desde Google Sheets (sin caché o caché expirado)")
+            log.debug("Obteniendo clientes desde Google Sheets (sin caché o caché expirado)")
             # Obtener la hoja CLIENTES del spreadsheet de clientes
-            worksheet = self.get_worksheet(settings.SHEETS['clientes']['worksheets']['clientes'], sheet_type='clientes')
-            records = worksheet.get_all_records()
+            version = self._version_hoja('clientes')
+            en_memoria = self._cache_clientes_version if self._cache_clientes is not None else None
+            records = self._leer_replica('clientes', version, en_memoria)
+            if records is None:
+                worksheet = self.get_worksheet(settings.SHEETS['clientes']['worksheets']['clientes'], sheet_type='clientes')
+                records = self._leer_registros(worksheet, settings.SHEETS['clientes']['worksheets']['clientes'], sheet_type='clientes')
+                self._guardar_replica('clientes', records, version)
             
             # Actualizar caché
             self._cache_clientes = records
             self._cache_clientes_timestamp = datetime.now()
+            self._cache_clientes_version = version
             
             return records
         except gspread.exceptions.WorksheetNotFound:
             # Si no encuentra la hoja, listar las hojas disponibles para debug
-            spreadsheet = self.spreadsheets.get('clientes')
+            spreadsheet = self.spreadsheets.get(self._spreadsheet_key('clientes'))
             if spreadsheet:
                 available_sheets = [ws.title for ws in spreadsheet.worksheets()]
                 raise Exception(f"Hoja 'CLIENTES' no encontrada. Hojas disponibles: {', '.join(available_sheets)}")
@@ -830,8 +1203,8 @@ class GoogleSheetsService:
                 if existing:
                     raise ValueError(f"El cliente con DNI {dni} ya existe")
             
-            # Obtener headers
-            headers = worksheet.row_values(1)
+            # Obtener headers (caché)
+            headers = self._schema(worksheet, settings.SHEETS['clientes']['worksheets']['clientes'], sheet_type='clientes').headers
             
             # Mapear datos a los headers del Sheet
             # Si viene 'nombres' y 'apellidos' separados, combinarlos en 'NOMBRE COMPLETO DEL CLIENTE'
@@ -865,7 +1238,14 @@ class GoogleSheetsService:
                 row.append(str(value) if value else "")
             
             # Agregar fila
-            worksheet.append_row(row)
+            response = worksheet.append_row(row)
+            fila = self._fila_de_append(response)
+            if fila is not None:
+                self._guardar_filas_replica('clientes', {fila: dict(zip(headers, row))})
+            elif self._replica is not None:
+                # Sin la fila escrita no se puede replicar el alta: la próxima lectura va al Sheet
+                self._escribir_replica('clientes', self._replica.descartar, 'clientes')
+            self._escritura_local('clientes')
             
             # Invalidar caché de clientes
             self._cache_clientes = None
@@ -882,14 +1262,15 @@ class GoogleSheetsService:
         """Actualiza un cliente existente"""
         try:
             worksheet = self.get_worksheet(settings.SHEETS['clientes']['worksheets']['clientes'], sheet_type='clientes')
+            # Lectura propia (sin coalescer): los índices de fila deben reflejar altas y eliminaciones recientes
             records = worksheet.get_all_records()
-            headers = worksheet.row_values(1)
+            schema = self._schema(worksheet, settings.SHEETS['clientes']['worksheets']['clientes'], sheet_type='clientes')
+            headers = schema.headers
             
             dni_clean = dni.replace('-', '').replace('.', '').replace(' ', '').strip()
             
             # Mapear datos a los headers del Sheet
-            print(f"DEBUG google_sheets.update_cliente: data recibido: {data}")  # Debug
-            print(f"DEBUG google_sheets.update_cliente: headers del sheet: {headers}")  # Debug
+            log.debug("update_cliente: data recibido: %s, headers del sheet: %s", data, headers)
             mapped_data = {}
             for header in headers:
                 if header == 'NOMBRE COMPLETO DEL CLIENTE':
@@ -897,21 +1278,18 @@ class GoogleSheetsService:
                     nombre_completo = data.get('NOMBRE COMPLETO DEL CLIENTE') or data.get('nombreCompleto') or data.get('NOMBRE_COMPLETO')
                     if nombre_completo:
                         mapped_data[header] = str(nombre_completo).strip()
-                        print(f"DEBUG: Mapeado NOMBRE COMPLETO DEL CLIENTE: {mapped_data[header]}")  # Debug
                 elif header == 'CELULAR DEL CLIENTE':
                     telefono = data.get('CELULAR DEL CLIENTE') or data.get('telefono') or data.get('TELEFONO') or data.get('CELULAR')
                     if telefono:
                         mapped_data[header] = str(telefono).strip()
-                        print(f"DEBUG: Mapeado CELULAR DEL CLIENTE: {mapped_data[header]}")  # Debug
                 elif header == 'CORREO DEL CLIENTE':
                     email = data.get('CORREO DEL CLIENTE') or data.get('email') or data.get('EMAIL') or data.get('CORREO')
                     if email:
                         mapped_data[header] = str(email).strip()
-                        print(f"DEBUG: Mapeado CORREO DEL CLIENTE: {mapped_data[header]}")  # Debug
                 elif header in data and data[header]:
                     mapped_data[header] = str(data[header]).strip()
             
-            print(f"DEBUG google_sheets.update_cliente: mapped_data final: {mapped_data}")  # Debug
+            log.debug("update_cliente: mapped_data final: %s", mapped_data)
             
             # Encontrar la fila
             for idx, record in enumerate(records, start=2):  # start=2 porque row 1 es header
@@ -921,19 +1299,22 @@ class GoogleSheetsService:
                     record.get('dni', '')
                 ).replace('-', '').replace('.', '').replace(' ', '').strip()
                 if record_dni.lower() == dni_clean.lower():
-                    # Actualizar valores
-                    print(f"DEBUG: Cliente encontrado en fila {idx}, actualizando...")  # Debug
-                    for header, value in mapped_data.items():
-                        if header in headers:
-                            col_idx = headers.index(header) + 1
-                            print(f"DEBUG: Actualizando celda [{idx}, {col_idx}] ({header}) = '{value}'")  # Debug
-                            worksheet.update_cell(idx, col_idx, str(value))
+                    # Actualizar valores (un solo batch_update)
+                    actualizado = dict(record)
+                    with self._writes.operation():
+                        for header, value in mapped_data.items():
+                            if schema.col(header):
+                                col_idx = schema.col(header)
+                                self._writes.add_cell(worksheet, idx, col_idx, str(value))
+                                actualizado[header] = str(value)
+                    self._guardar_filas_replica('clientes', {idx: actualizado})
+                    self._escritura_local('clientes')
                     
                     # Invalidar caché de clientes
                     self._cache_clientes = None
                     self._cache_clientes_timestamp = None
                     
-                    print(f"DEBUG: Actualización completada, obteniendo cliente actualizado...")  # Debug
+                    log.debug("Cliente %s actualizado en fila %d", dni, idx)
                     return self.get_cliente_by_dni(dni)
             
             raise ValueError(f"Cliente con DNI {dni} no encontrado")
@@ -944,6 +1325,7 @@ class GoogleSheetsService:
         """Elimina un cliente (marca como eliminado o elimina la fila)"""
         try:
             worksheet = self.get_worksheet(settings.SHEETS['clientes']['worksheets']['clientes'], sheet_type='clientes')
+            # Lectura propia (sin coalescer): los índices de fila deben reflejar eliminaciones recientes
             records = worksheet.get_all_records()
             
             dni_clean = dni.replace('-', '').replace('.', '').replace(' ', '').strip()
@@ -958,6 +1340,9 @@ class GoogleSheetsService:
                 if record_dni.lower() == dni_clean.lower():
                     # Eliminar fila
                     worksheet.delete_rows(idx)
+                    if self._replica is not None:
+                        self._escribir_replica('clientes', self._replica.quitar_fila, 'clientes', idx)
+                    self._escritura_local('clientes')
                     
                     # Invalidar caché de clientes
                     self._cache_clientes = None
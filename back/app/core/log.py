@@ -0,0 +1,98 @@
+"""
+Logging de la aplicación
+Niveles (LOG_LEVEL: DEBUG, INFO, WARNING, ERROR) sobre el módulo logging estándar: un mensaje
+por debajo del nivel configurado no se formatea ni se escribe, así que los log.debug de los
+caminos calientes no cuestan nada en producción.
+
+Además cada request acumula un evento estructurado (tiempos, llamadas a Sheets, filas,
+aciertos de caché) que el middleware escribe en una sola línea JSON al terminar y, los
+tiempos (campos *_ms), en el header Server-Timing:
+    log_evento.contar('cache_clientes_hit')
+    log_evento.anotar(filas_certificados=len(records))
+    with log_evento.medir('qr'):  # suma la duración del bloque en 'qr_ms'
+        ...
+"""
+import contextvars
+import json
+import logging
+import sys
+import time
+from contextlib import ContextDecorator
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+
+def get_logger(nombre: str) -> logging.Logger:
+    """Logger de un módulo (usar con __name__: 'app.core.google_sheets')"""
+    return logging.getLogger(nombre)
+
+
+def configurar(nivel: str) -> None:
+    """Un handler a stdout para los loggers 'app.*' (independiente de la configuración de uvicorn)"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    raiz = logging.getLogger('app')
+    raiz.handlers[:] = [handler]
+    valor = logging.getLevelName(nivel.upper())
+    raiz.setLevel(valor if isinstance(valor, int) else logging.INFO)
+    raiz.propagate = False
+
+
+class _Tramo(ContextDecorator):
+    """Bloque (o función, como decorador) cuya duración se suma al evento del request"""
+
+    def __init__(self, evento: 'EventoRequest', campo: str):
+        self._evento = evento
+        self._campo = campo
+
+    def _recreate_cm(self):
+        # Como decorador, cada llamada (y cada hilo) mide con su propia instancia
+        return _Tramo(self._evento, self._campo)
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._evento.contar(self._campo, (time.perf_counter() - self._inicio) * 1000)
+        return False
+
+
+class EventoRequest:
+    """Evento estructurado del request en curso (visible también en los hilos del pool de Sheets)"""
+
+    _actual: contextvars.ContextVar = contextvars.ContextVar('evento_request', default=None)
+
+    def iniciar(self, **campos) -> contextvars.Token:
+        return self._actual.set(dict(campos))
+
+    def terminar(self, token: contextvars.Token) -> Optional[Dict]:
+        evento = self._actual.get()
+        self._actual.reset(token)
+        return evento
+
+    def anotar(self, **campos) -> None:
+        evento = self._actual.get()
+        if evento is not None:
+            evento.update(campos)
+
+    def contar(self, campo: str, cantidad: float = 1) -> None:
+        evento = self._actual.get()
+        if evento is not None:
+            evento[campo] = evento.get(campo, 0) + cantidad
+
+    def medir(self, nombre: str) -> _Tramo:
+        """Mide un tramo del request (se acumula en '<nombre>_ms')"""
+        return _Tramo(self, f'{nombre}_ms')
+
+    @staticmethod
+    def emitir(logger: logging.Logger, nombre: str, campos: Dict, nivel: int = logging.INFO) -> None:
+        """Escribe un evento como una línea JSON (solo si el nivel está habilitado)"""
+        if logger.isEnabledFor(nivel):
+            logger.log(nivel, '%s %s', nombre, json.dumps(campos, ensure_ascii=False, default=str))
+
+
+# Configuración global del logging y evento del request en curso
+configurar(settings.LOG_LEVEL)
+log_evento = EventoRequest()
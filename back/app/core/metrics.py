@@ -0,0 +1,242 @@
+"""
+Métricas en formato de texto de Prometheus (GET /metrics)
+Contadores e histogramas en memoria, sin dependencias: llamadas y latencia de Google Sheets
+por operación y hoja, aciertos de las cachés, tiempo de generación de PDFs, de almacenamiento
+y latencia por ruta. Cada worker de uvicorn tiene sus propios valores (el scrape los ve por
+separado: usar la etiqueta de instancia o un solo worker por target).
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import ContextDecorator
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+from app.core.log import log_evento
+
+
+# Límites (segundos) de los histogramas de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres: Sequence[str], valores: Tuple, extra: str = '') -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) and not valor.is_integer() else str(int(valor))
+
+
+class _Metrica(ABC):
+    tipo = ''
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, valores: Dict) -> Tuple:
+        return tuple(str(valores.get(n, '')) for n in self.etiquetas)
+
+    @abstractmethod
+    def _muestras(self) -> List[str]:
+        """Líneas de muestras en formato Prometheus"""
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}', *self._muestras()]
+
+
+class Counter(_Metrica):
+    """Valor que solo crece (llamadas, aciertos, errores)"""
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, cantidad: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def set(self, valor: float, **etiquetas) -> None:
+        """Copia un contador que se lleva en otro lado (p.ej. el control de cuota)"""
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = valor
+
+    def _muestras(self) -> List[str]:
+        with self._lock:
+            return [f'{self.nombre}{_etiquetas(self.etiquetas, k)} {_numero(v)}' for k, v in sorted(self._valores.items())]
+
+
+class Gauge(Counter):
+    """Valor que sube y baja (cuota restante, entradas en caché)"""
+    tipo = 'gauge'
+
+
+class _Cronometro(ContextDecorator):
+    def __init__(self, histograma: 'Histogram', etiquetas: Dict):
+        self._histograma = histograma
+        self._etiquetas = etiquetas
+
+    def _recreate_cm(self):
+        # Como decorador, cada llamada (y cada hilo) mide con su propia instancia
+        return _Cronometro(self._histograma, self._etiquetas)
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histograma.observe(time.perf_counter() - self._inicio, **self._etiquetas)
+        return False
+
+
+class Histogram(_Metrica):
+    """
+    Distribución de duraciones (segundos)
+    Si se indica `evento`, cada observación también se suma en milisegundos al evento del request
+    """
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_LATENCIA, evento: Optional[str] = None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self.evento = evento
+        self._series: Dict[Tuple, List] = {}  # etiquetas -> [conteos por bucket, suma, total]
+
+    def observe(self, segundos: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if segundos <= limite:
+                    serie[0][i] += 1
+            serie[1] += segundos
+            serie[2] += 1
+        if self.evento:
+            log_evento.contar(self.evento, round(segundos * 1000, 1))
+
+    def time(self, **etiquetas) -> _Cronometro:
+        """Mide un bloque (`with`) o una función (decorador)"""
+        return _Cronometro(self, etiquetas)
+
+    def _muestras(self) -> List[str]:
+        lineas = []
+        with self._lock:
+            for clave, (conteos, suma, total) in sorted(self._series.items()):
+                for limite, conteo in zip(self.buckets, conteos):
+                    le = 'le="%s"' % _numero(limite)
+                    lineas.append(f'{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {conteo}')
+                le = 'le="+Inf"'
+                lineas.append(f'{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {total}')
+                lineas.append(f'{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(round(suma, 6))}')
+                lineas.append(f'{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}')
+        return lineas
+
+
+class MetricsRegistry:
+    """Métricas registradas y funciones que actualizan valores calculados al momento del scrape"""
+
+    def __init__(self):
+        self._metricas: List[_Metrica] = []
+        self._colectores: List[Callable[[], None]] = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def counter(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Counter:
+        return self._registrar(Counter(nombre, ayuda, etiquetas))
+
+    def gauge(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Gauge:
+        return self._registrar(Gauge(nombre, ayuda, etiquetas))
+
+    def histogram(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), **kwargs) -> Histogram:
+        return self._registrar(Histogram(nombre, ayuda, etiquetas, **kwargs))
+
+    def colector(self, funcion: Callable[[], None]) -> Callable[[], None]:
+        """Registra una función que se ejecuta antes de cada scrape (p.ej. para copiar gauges)"""
+        self._colectores.append(funcion)
+        return funcion
+
+    def render(self) -> str:
+        for funcion in self._colectores:
+            try:
+                funcion()
+            except Exception:
+                pass  # Un colector roto no debe dejar sin métricas al resto
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.render())
+        return '\n'.join(lineas) + '\n'
+
+
+def operacion_sheets(method: str, endpoint: str, params: Optional[Dict] = None, json: Optional[Dict] = None) -> Tuple[str, str]:
+    """
+    (operación, hoja) de una request de gspread a partir del endpoint de la API:
+    get_all_records -> values_get, append_row -> values_append, update_cell/batch_update -> values_update/values_batch_update
+    """
+    def hoja(rango) -> str:
+        rango = unquote(str(rango or ''))
+        return rango.split('!')[0].strip("'") if rango else ''
+
+    if 'drive/v3/files' in endpoint:
+        return 'drive_metadata', ''
+    if '/values:batchUpdate' in endpoint:
+        rangos = [d.get('range') for d in (json or {}).get('data', [])]
+        hojas = {hoja(r) for r in rangos}
+        return 'values_batch_update', hojas.pop() if len(hojas) == 1 else ''
+    if '/values:batchGet' in endpoint:
+        rangos = (params or {}).get('ranges') or []
+        hojas = {hoja(r) for r in ([rangos] if isinstance(rangos, str) else rangos)}
+        return 'values_batch_get', hojas.pop() if len(hojas) == 1 else ''
+    if '/values/' in endpoint:
+        rango = endpoint.split('/values/', 1)[1]
+        if rango.endswith(':append'):
+            return 'values_append', hoja(rango[:-len(':append')])
+        if rango.endswith(':clear'):
+            return 'values_clear', hoja(rango[:-len(':clear')])
+        return ('values_get' if method.upper() == 'GET' else 'values_update'), hoja(rango)
+    if endpoint.endswith(':batchUpdate'):
+        return 'batch_update', ''
+    return ('metadata' if method.upper() == 'GET' else method.lower()), ''
+
+
+# Instancia global de las métricas de la aplicación
+metrics = MetricsRegistry()
+
+sheets_llamadas = metrics.counter(
+    'sheets_requests_total', 'Requests a la API de Google Sheets', ('operacion', 'hoja', 'resultado'))
+sheets_latencia = metrics.histogram(
+    'sheets_request_seconds', 'Duración de las requests a Google Sheets (incluye espera de cuota y reintentos)',
+    ('operacion', 'hoja'), evento='sheets_ms')
+cache_eventos = metrics.counter(
+    'cache_events_total', 'Consultas a las cachés en memoria (hit, miss) y recargas del refresco (refresh)',
+    ('cache', 'resultado'))
+pdf_render = metrics.histogram(
+    'pdf_render_seconds', 'Duración de generate_certificate_pdf', evento='pdf_ms')
+storage_latencia = metrics.histogram(
+    'storage_seconds', 'Duración de las operaciones de almacenamiento de PDFs', ('operacion', 'backend'),
+    evento='storage_ms')
+http_latencia = metrics.histogram(
+    'http_request_seconds', 'Duración de los requests HTTP por ruta', ('metodo', 'ruta', 'status'))
+
+
+def registrar_cache(cache: str, resultado: str) -> None:
+    """Cuenta un hit/miss/refresh de una caché en la métrica y en el evento del request"""
+    cache_eventos.inc(cache=cache, resultado=resultado)
+    log_evento.contar(f'cache_{cache}_{resultado}')
@@ -0,0 +1,66 @@
+"""
+Caché negativa: claves que se buscaron y no existían
+Una búsqueda repetida de un código inexistente (mal tipeado, inventado o de un scraper)
+se responde desde memoria durante `ttl` segundos en lugar de volver a buscarlo
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable
+
+
+class NegativeCache:
+    """Conjunto de claves inexistentes con vencimiento y tamaño acotado (se descartan las más antiguas)"""
+
+    def __init__(self, ttl: float = 60, max_entradas: int = 10000):
+        self.ttl = ttl
+        self.max_entradas = max(1, max_entradas)
+        self._lock = threading.Lock()
+        self._vencimientos: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self.consultas = 0
+        self.aciertos = 0
+
+    def contiene(self, clave: Hashable) -> bool:
+        """Indica si la clave se buscó hace menos de `ttl` segundos y no existía"""
+        if self.ttl <= 0:
+            return False
+        with self._lock:
+            self.consultas += 1
+            vence = self._vencimientos.get(clave)
+            if vence is None:
+                return False
+            if vence <= time.monotonic():
+                del self._vencimientos[clave]
+                return False
+            self.aciertos += 1
+            return True
+
+    def agregar(self, clave: Hashable) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._vencimientos[clave] = time.monotonic() + self.ttl
+            self._vencimientos.move_to_end(clave)
+            while len(self._vencimientos) > self.max_entradas:
+                self._vencimientos.popitem(last=False)
+
+    def descartar(self, clave: Hashable) -> None:
+        """Olvida una clave (p.ej. porque se acaba de crear)"""
+        with self._lock:
+            self._vencimientos.pop(clave, None)
+
+    def limpiar(self) -> None:
+        """Olvida todas las claves (los datos cambiaron)"""
+        with self._lock:
+            self._vencimientos.clear()
+
+    def estado(self) -> Dict:
+        with self._lock:
+            return {
+                'entradas': len(self._vencimientos),
+                'max_entradas': self.max_entradas,
+                'ttl': self.ttl,
+                'consultas': self.consultas,
+                'aciertos': self.aciertos,
+                'tasa_aciertos': round(self.aciertos / self.consultas, 4) if self.consultas else None,
+            }
@@ -0,0 +1,118 @@
+"""
+Datos de entrada de los PDFs de certificados
+Sin reportlab: el worker HTTP los usa para calcular la huella de un PDF (y buscarlo ya
+generado) sin cargar el stack de generación.
+
+La huella resume todo lo que determina el PDF: los textos que se dibujan, la plantilla
+(hash de plantilla.png) y la versión del diseño. Si cambia cualquiera de ellos cambia la
+huella, así que un PDF guardado con su huella nunca queda desactualizado.
+"""
+import hashlib
+import json
+import threading
+from typing import Dict
+
+from app.core.config import settings, ROOT
+
+# ROOT ya apunta a back/, así que solo necesitamos plantillas/plantilla.png
+PLANTILLA_PATH = ROOT / "plantillas" / "plantilla.png"
+
+# Subir al cambiar posiciones, fuentes o colores en pdf_generator (invalida los PDFs guardados)
+VERSION_DISENO = 2
+
+
+def datos_certificado(certificado: Dict) -> Dict:
+    """Textos que se dibujan en el PDF a partir de una fila de certificado"""
+    # Preparar datos para el PDF
+    mencion = certificado.get('mencion', '') or certificado.get('MENCIÓN', '') or ''
+    horas = certificado.get('horas', '') or certificado.get('HORAS', '') or ''
+    f_inicio = certificado.get('f_inicio', '') or certificado.get('F. INICIO', '') or ''
+    f_termino = certificado.get('f_termino', '') or certificado.get('F. TÉRMINO', '') or certificado.get('F. TERMINO', '') or ''
+    codigo = certificado.get('codigo', '') or certificado.get('CODIGO', '') or ''
+    
+    # Construir duración
+    duracion = f"{horas} HORAS PEDAGÓGICAS" if horas else "HORAS PEDAGÓGICAS"
+    
+    # Construir período (formato: "FEBRERO - MARZO 2025")
+    periodo = ""
+    if f_inicio and f_termino:
+        # Intentar extraer mes y año de las fechas
+        # Formato esperado: "24 de marzo" o "08 de julio del 2025"
+        try:
+            # Si las fechas ya están en formato legible, usarlas directamente
+            if "del" in f_termino or "de" in f_termino:
+                # Extraer mes y año de f_termino
+                partes_termino = f_termino.split()
+                if len(partes_termino) >= 3:
+                    mes_termino = partes_termino[2].upper()  # mes
+                    año = partes_termino[-1] if len(partes_termino) > 3 else "2025"
+                    # Extraer mes de inicio
+                    partes_inicio = f_inicio.split()
+                    mes_inicio = partes_inicio[2].upper() if len(partes_inicio) >= 3 else ""
+                    
+                    if mes_inicio and mes_termino:
+                        periodo = f"{mes_inicio} - {mes_termino} {año}"
+                    elif mes_termino:
+                        periodo = f"{mes_termino} {año}"
+        except:
+            pass
+    
+    if not periodo:
+        # Fallback: usar las fechas tal cual
+        if f_inicio and f_termino:
+            periodo = f"{f_inicio} - {f_termino}"
+        elif f_termino:
+            periodo = f_termino
+    
+    # Modalidad (por defecto VIRTUAL, pero podría venir del certificado)
+    modalidad = certificado.get('modalidad', 'VIRTUAL') or 'VIRTUAL'
+    
+    # URL de verificación
+    base_url = settings.BASE_URL
+    url_verificacion = f"{base_url}/consulta/{codigo}"
+    
+    # Preparar datos para el generador
+    datos_pdf = {
+        "titulo": mencion,
+        "duracion": duracion,
+        "modalidad": modalidad,
+        "periodo": periodo,
+        "url": url_verificacion,
+        "codigo": codigo,
+    }
+    return datos_pdf
+
+
+class HuellaPlantilla:
+    """Hash del contenido de plantilla.png (se recalcula solo si cambia el mtime o el tamaño)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._clave = None
+        self._hash = None
+
+    def __call__(self) -> str:
+        stat = self.path.stat()
+        clave = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._clave != clave:
+                self._hash = hashlib.sha256(self.path.read_bytes()).hexdigest()
+                self._clave = clave
+            return self._hash
+
+
+def huella_pdf(certificado: Dict) -> str:
+    """Huella (sha256) del PDF que generaría generate_certificate_pdf para este certificado"""
+    datos = datos_certificado(certificado)
+    # PDF_RENDER_MODE no entra en la huella: overlay y canvas dibujan la misma página
+    entrada = {
+        'datos': datos,
+        'plantilla': huella_plantilla(),
+        'diseno': VERSION_DISENO,
+    }
+    return hashlib.sha256(json.dumps(entrada, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+# Instancia global de la huella de la plantilla
+huella_plantilla = HuellaPlantilla(PLANTILLA_PATH)
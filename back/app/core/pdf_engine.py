@@ -0,0 +1,137 @@
+"""
+Generación de PDFs fuera del event loop
+generate_certificate_pdf es trabajo de CPU (reportlab): ejecutarlo dentro de un handler async
+detiene todo el worker mientras dura. El motor lo ejecuta en un pool acotado de procesos (uno
+por CPU) y los routers solo esperan el resultado:
+    pdf_content = await pdf_engine.render(certificado)
+Si ya hay PDF_MAX_PENDING trabajos en curso o en cola, responde 503 con Retry-After en lugar
+de acumular requests que de todas formas no terminarían a tiempo.
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.log import get_logger, log_evento
+from app.core.metrics import metrics, pdf_render
+
+log = get_logger(__name__)
+
+
+class PdfEngineOcupado(HTTPException):
+    """El motor tiene la cola llena (los routers la propagan como cualquier HTTPException)"""
+
+    def __init__(self, reintentar: int = 5):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Generación de PDFs saturada, intente nuevamente en unos segundos",
+            headers={"Retry-After": str(reintentar)},
+        )
+
+
+def _renderizar(certificado: Dict) -> bytes:
+    """Trabajo que corre en el proceso del pool (reportlab se importa ahí, no en el worker HTTP)"""
+    from app.core.pdf_generator import generate_certificate_pdf
+    return generate_certificate_pdf(certificado).getvalue()
+
+
+class PdfEngine:
+    """Pool de procesos para generar PDFs, con límite de trabajos pendientes"""
+
+    def __init__(self, max_workers: int, max_pendientes: int):
+        self.max_workers = max_workers
+        self.max_pendientes = max(1, max_pendientes)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self.rechazados = 0
+
+    def _pool(self) -> Executor:
+        # El pool se crea al primer PDF: los workers que solo responden JSON no levantan procesos
+        with self._lock:
+            if self._executor is None:
+                if self.max_workers > 0:
+                    # spawn: el worker HTTP tiene hilos (pool de Sheets), fork podría heredar locks tomados
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+                    log.info("Motor de PDFs: %d procesos", self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf')
+                    log.info("Motor de PDFs: sin procesos (un hilo del worker)")
+            return self._executor
+
+    async def render(self, certificado: Dict) -> bytes:
+        """PDF del certificado (bytes); PdfEngineOcupado si la cola está llena"""
+        with self._lock:
+            if self._pendientes >= self.max_pendientes:
+                self.rechazados += 1
+                log.warning("Motor de PDFs saturado (%d pendientes)", self._pendientes)
+                raise PdfEngineOcupado()
+            self._pendientes += 1
+        try:
+            try:
+                return await self._ejecutar(dict(certificado))
+            except BrokenProcessPool:
+                # Un proceso murió (p.ej. por memoria): se descarta el pool y se reintenta una vez
+                log.error("Pool de PDFs roto, se recrea")
+                self._descartar_pool()
+                return await self._ejecutar(dict(certificado))
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+            log_evento.anotar(pdf_pendientes=self._pendientes)
+
+    async def _ejecutar(self, certificado: Dict) -> bytes:
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        if self.max_workers > 0:
+            # Lo medido en el proceso hijo no llega a este worker: pdf_ms incluye la espera en cola
+            with pdf_render.time():
+                return await loop.run_in_executor(pool, _renderizar, certificado)
+        # En un hilo, generate_certificate_pdf se mide solo (con el evento del request)
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(pool, functools.partial(ctx.run, _renderizar, certificado))
+
+    def _descartar_pool(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def estado(self) -> Dict:
+        return {
+            'procesos': self.max_workers,
+            'activo': self._executor is not None,
+            'pendientes': self._pendientes,
+            'max_pendientes': self.max_pendientes,
+            'rechazados': self.rechazados,
+        }
+
+    def shutdown(self) -> None:
+        """Termina los procesos del pool (al apagar el worker)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Instancia global del motor de PDFs
+pdf_engine = PdfEngine(max_workers=settings.PDF_WORKERS, max_pendientes=settings.PDF_MAX_PENDING)
+
+pdf_pendientes = metrics.gauge('pdf_engine_pending', 'PDFs en generación o en cola en el motor')
+pdf_rechazados = metrics.counter('pdf_engine_rejected_total', 'PDFs rechazados con 503 por cola llena')
+
+
+@metrics.colector
+def _metricas_motor():
+    pdf_pendientes.set(pdf_engine._pendientes)
+    pdf_rechazados.set(pdf_engine.rechazados)
@@ -1,40 +1,164 @@
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.utils import ImageReader
 from reportlab.pdfbase import pdfmetrics
 from reportlab.lib import colors
 import qrcode
+import functools
+import math
+import threading
+from contextlib import contextmanager
 from io import BytesIO
 from typing import Dict, Optional
 from pathlib import Path
-from app.core.config import settings, ROOT
+from app.core.config import settings
+from app.core.log import get_logger, log_evento
+from app.core.pdf_datos import PLANTILLA_PATH, datos_certificado
+from app.core.metrics import cache_eventos, metrics, pdf_render
 
+log = get_logger(__name__)
 
-def wrap_text_by_width(text, font_name, font_size, max_width):
-    """Envuelve el texto para que quepa en un ancho máximo"""
-    words = text.replace("\n", " ").split()
-    lines, current = [], ""
-    for w in words:
-        test = (current + " " + w).strip()
-        if pdfmetrics.stringWidth(test, font_name, font_size) <= max_width:
-            current = test
+
+@contextmanager
+def _streams_binarios():
+    """
+    Streams sin ASCII85 mientras se arma la página de la plantilla: ese stream de imagen se
+    copia en todos los certificados y en ASCII85 pesa un 25% más. useA85 es una opción global
+    de reportlab; se restaura al salir (solo se usa bajo el lock de pagina_pdf) y un PDF que
+    otro hilo arme mientras tanto solo puede salir con streams binarios, igual de válidos
+    """
+    anterior = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        yield
+    finally:
+        rl_config.useA85 = anterior
+
+
+class PlantillaFondo:
+    """
+    Imagen de fondo de los certificados, decodificada una sola vez por proceso.
+
+    c.drawImage(ruta) vuelve a abrir y decodificar el PNG de página completa en cada PDF;
+    acá se guarda un ImageReader con los píxeles ya decodificados. En modo overlay la imagen
+    se comprime una sola vez, en la página de pagina_pdf(), y cada certificado copia ese
+    stream; en modo canvas cada PDF la vuelve a comprimir. Si cambia el mtime del archivo se
+    vuelve a cargar.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._imagen = None
+        self._pagina = None  # (mtime, bytes del PDF de una página con el fondo)
+        self._lock_pagina = threading.Lock()
+
+    def version(self) -> int:
+        """mtime (ns) del archivo de la plantilla"""
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Plantilla no encontrada en: {self.path.resolve()}")
+
+    def imagen(self) -> ImageReader:
+        """ImageReader de la plantilla (se comparte entre PDFs; solo se lee)"""
+        mtime = self.version()
+        with self._lock:
+            if self._imagen is None or self._mtime != mtime:
+                log.debug("Cargando plantilla: %s", self.path)
+                imagen = ImageReader(str(self.path))
+                imagen.getRGBData()  # decodificar ahora y no en el primer PDF
+                self._imagen, self._mtime = imagen, mtime
+            return self._imagen
+
+    def pagina_pdf(self) -> bytes:
+        """
+        La plantilla convertida una vez en un PDF de una página (modo overlay): todos los
+        certificados copian el mismo stream de imagen ya comprimido, sin volver a codificarlo
+        """
+        mtime = self.version()
+        pagina = self._pagina
+        if pagina is None or pagina[0] != mtime:
+            with self._lock_pagina:
+                pagina = self._pagina
+                if pagina is None or pagina[0] != mtime:
+                    buffer = BytesIO()
+                    W, H = landscape(A4)
+                    with _streams_binarios():
+                        c = canvas.Canvas(buffer, pagesize=(W, H))
+                        self.dibujar(c, 0, 0, W, H)
+                        c.showPage()
+                        c.save()
+                    pagina = self._pagina = (mtime, buffer.getvalue())
+        return pagina[1]
+
+    def dibujar(self, c, x: float, y: float, width: float, height: float) -> None:
+        """c.drawImage de la plantilla; con canal alfa se respeta la transparencia"""
+        c.drawImage(self.imagen(), x, y, width=width, height=height, mask='auto')
+
+
+def _anchos_unitarios(words, font_name):
+    """Ancho de cada palabra y del espacio a tamaño 1 (el ancho escala linealmente con el tamaño)"""
+    return [pdfmetrics.stringWidth(w, font_name, 1) for w in words], pdfmetrics.stringWidth(" ", font_name, 1)
+
+
+def _envolver(words, anchos, ancho_espacio, font_size, max_width):
+    """Envoltura greedy sumando los anchos de las palabras (sin volver a medir cada prefijo)"""
+    lines, current, current_width = [], [], 0.0
+    for w, ancho in zip(words, anchos):
+        ancho *= font_size
+        if not current:
+            current, current_width = [w], ancho
+        elif current_width + ancho_espacio * font_size + ancho <= max_width:
+            current.append(w)
+            current_width += ancho_espacio * font_size + ancho
         else:
-            if current:
-                lines.append(current)
-            current = w
+            lines.append(" ".join(current))
+            current, current_width = [w], ancho
     if current:
-        lines.append(current)
+        lines.append(" ".join(current))
     return lines
 
 
+def wrap_text_by_width(text, font_name, font_size, max_width):
+    """Envuelve el texto para que quepa en un ancho máximo"""
+    words = text.replace("\n", " ").split()
+    anchos, ancho_espacio = _anchos_unitarios(words, font_name)
+    return _envolver(words, anchos, ancho_espacio, font_size, max_width)
+
+
+@functools.lru_cache(maxsize=512)
 def fit_font_size_for_max_lines(text, font_name, start_size, min_size, max_width, max_lines):
-    """Ajusta el tamaño de fuente para que el texto quepa en un máximo de líneas"""
-    size = start_size
-    lines = wrap_text_by_width(text, font_name, size, max_width)
-    while len(lines) > max_lines and size > min_size:
-        size -= 0.5
-        lines = wrap_text_by_width(text, font_name, size, max_width)
-    return size, lines
+    """
+    Ajusta el tamaño de fuente para que el texto quepa en un máximo de líneas
+    Prueba tamaños de start_size hacia abajo en pasos de 0.5 (búsqueda binaria: con menos
+    tamaño nunca hacen falta más líneas). Los títulos de una misma mención se repiten en
+    cada certificado, así que el resultado se memoiza: devuelve (tamaño, tupla de líneas)
+    """
+    words = text.replace("\n", " ").split()
+    anchos, ancho_espacio = _anchos_unitarios(words, font_name)
+
+    def lineas(paso):
+        return _envolver(words, anchos, ancho_espacio, start_size - 0.5 * paso, max_width)
+
+    ultimo = max(0, math.ceil((start_size - min_size) / 0.5))
+    bajo, alto = 0, ultimo
+    while bajo < alto:
+        medio = (bajo + alto) // 2
+        if len(lineas(medio)) <= max_lines:
+            alto = medio
+        else:
+            bajo = medio + 1
+    return start_size - 0.5 * bajo, tuple(lineas(bajo))
+
+
+@metrics.colector
+def _metricas_layout():
+    info = fit_font_size_for_max_lines.cache_info()
+    cache_eventos.set(info.hits, cache='layout_titulo', resultado='hit')
+    cache_eventos.set(info.misses, cache='layout_titulo', resultado='miss')
 
 
 def draw_centered_in_box(c, text, x_left, x_right, y, font_name, font_size, text_color=None):
@@ -47,6 +171,7 @@ def draw_centered_in_box(c, text, x_left, x_right, y, font_name, font_size, text
     c.drawCentredString((x_left + x_right) / 2, y, text)
 
 
+@pdf_render.time()
 def generate_certificate_pdf(certificado: Dict) -> BytesIO:
     """
     Genera un PDF del certificado usando la plantilla PNG
@@ -61,89 +186,99 @@ def generate_certificate_pdf(certificado: Dict) -> BytesIO:
             - f_termino: Fecha de término
             - curso o p_certificado: Programa del certificado
     """
-    # Ruta a la plantilla
-    # ROOT ya apunta a back/, así que solo necesitamos plantillas/plantilla.png
-    plantilla_path = ROOT / "plantillas" / "plantilla.png"
-    
-    print(f"DEBUG pdf_generator: Buscando plantilla en: {plantilla_path.resolve()}")
-    
-    if not plantilla_path.exists():
-        raise FileNotFoundError(f"Plantilla no encontrada en: {plantilla_path.resolve()}")
-    
-    # Preparar datos para el PDF
-    mencion = certificado.get('mencion', '') or certificado.get('MENCIÓN', '') or ''
-    horas = certificado.get('horas', '') or certificado.get('HORAS', '') or ''
-    f_inicio = certificado.get('f_inicio', '') or certificado.get('F. INICIO', '') or ''
-    f_termino = certificado.get('f_termino', '') or certificado.get('F. TÉRMINO', '') or certificado.get('F. TERMINO', '') or ''
-    codigo = certificado.get('codigo', '') or certificado.get('CODIGO', '') or ''
-    
-    # Construir duración
-    duracion = f"{horas} HORAS PEDAGÓGICAS" if horas else "HORAS PEDAGÓGICAS"
-    
-    # Construir período (formato: "FEBRERO - MARZO 2025")
-    periodo = ""
-    if f_inicio and f_termino:
-        # Intentar extraer mes y año de las fechas
-        # Formato esperado: "24 de marzo" o "08 de julio del 2025"
-        try:
-            # Si las fechas ya están en formato legible, usarlas directamente
-            if "del" in f_termino or "de" in f_termino:
-                # Extraer mes y año de f_termino
-                partes_termino = f_termino.split()
-                if len(partes_termino) >= 3:
-                    mes_termino = partes_termino[2].upper()  # mes
-                    año = partes_termino[-1] if len(partes_termino) > 3 else "2025"
-                    # Extraer mes de inicio
-                    partes_inicio = f_inicio.split()
-                    mes_inicio = partes_inicio[2].upper() if len(partes_inicio) >= 3 else ""
-                    
-                    if mes_inicio and mes_termino:
-                        periodo = f"{mes_inicio} - {mes_termino} {año}"
-                    elif mes_termino:
-                        periodo = f"{mes_termino} {año}"
-        except:
-            pass
-    
-    if not periodo:
-        # Fallback: usar las fechas tal cual
-        if f_inicio and f_termino:
-            periodo = f"{f_inicio} - {f_termino}"
-        elif f_termino:
-            periodo = f_termino
-    
-    # Modalidad (por defecto VIRTUAL, pero podría venir del certificado)
-    modalidad = certificado.get('modalidad', 'VIRTUAL') or 'VIRTUAL'
-    
-    # URL de verificación
-    base_url = settings.BASE_URL
-    url_verificacion = f"{base_url}/consulta/{codigo}"
-    
-    # Preparar datos para el generador
-    datos_pdf = {
-        "titulo": mencion,
-        "duracion": duracion,
-        "modalidad": modalidad,
-        "periodo": periodo,
-        "url": url_verificacion,
-        "codigo": codigo,
-    }
-    
-    # Generar PDF
-    buffer = BytesIO()
+    # Verificar la plantilla antes de armar el PDF
+    plantilla.version()
+    
+    datos_pdf = datos_certificado(certificado)
+    
+    if settings.PDF_RENDER_MODE == 'canvas':
+        return _pdf_canvas(datos_pdf)
+    return _pdf_overlay(datos_pdf)
+
+
+def _nuevo_canvas(buffer: BytesIO, codigo: str):
+    """Canvas A4 horizontal con los metadatos del certificado"""
     W, H = landscape(A4)
     c = canvas.Canvas(buffer, pagesize=(W, H))
-    
-    # Metadatos del PDF
     c.setTitle(codigo)
     c.setAuthor("Centro Profesional Docente")
     c.setSubject(f"Certificado {codigo}")
-    
-    # Dibujar plantilla de fondo
+    return c, W, H
+
+
+def _dibujar_fondo(c, W, H):
+    """Imagen de la plantilla a página completa"""
     try:
-        c.drawImage(str(plantilla_path), 0, 0, width=W, height=H)
+        plantilla.dibujar(c, 0, 0, W, H)
+    except FileNotFoundError:
+        raise
     except Exception as e:
         raise Exception(f"Error cargando plantilla: {str(e)}")
-    
+
+
+def _pdf_canvas(datos_pdf: Dict) -> BytesIO:
+    """Modo 'canvas': fondo y datos en un solo PDF de reportlab"""
+    buffer = BytesIO()
+    c, W, H = _nuevo_canvas(buffer, datos_pdf["codigo"])
+    _dibujar_fondo(c, W, H)
+    _dibujar_datos(c, datos_pdf, W, H)
+    c.showPage()
+    c.save()
+    buffer.seek(0)
+    return buffer
+
+
+def _pdf_overlay(datos_pdf: Dict) -> BytesIO:
+    """
+    Modo 'overlay': por certificado solo se dibuja una capa vectorial con los datos que se
+    fusiona sobre la página de la plantilla ya armada.
+    La capa va dentro de un form XObject: merge_page solo interpreta el contenido de la
+    página (una llamada Do) y no las operaciones del QR, que eran la mayor parte del merge
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    try:
+        base = plantilla.pagina_pdf()
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        raise Exception(f"Error cargando plantilla: {str(e)}")
+    # La mención se dibuja en cada capa: una página base por mención ahorraría ~0.5 ms de
+    # ~13 ms por PDF a cambio de ~145 KB de memoria por mención (los textos ya están memoizados)
+    capa = BytesIO()
+    c, W, H = _nuevo_canvas(capa, datos_pdf["codigo"])
+    c.beginForm('datos')
+    _dibujar_datos(c, datos_pdf, W, H)
+    c.endForm()
+    c.doForm('datos')
+    c.showPage()
+    c.save()
+    capa.seek(0)
+
+    with log_evento.medir('pdf_merge'):
+        writer = PdfWriter()
+        pagina = writer.add_page(PdfReader(BytesIO(base)).pages[0])
+        pagina.merge_page(PdfReader(capa).pages[0])
+        codigo = datos_pdf["codigo"]
+        writer.add_metadata({
+            "/Title": codigo,
+            "/Author": "Centro Profesional Docente",
+            "/Subject": f"Certificado {codigo}",
+        })
+        buffer = BytesIO()
+        writer.write(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _dibujar_datos(c, datos_pdf: Dict, W: float, H: float):
+    """Título, duración, modalidad, periodo, QR y código del certificado"""
+    _dibujar_mencion(c, datos_pdf, W, H)
+    _dibujar_qr_codigo(c, datos_pdf, W, H)
+
+
+def _dibujar_mencion(c, datos_pdf: Dict, W: float, H: float):
+    """Título, duración, modalidad y periodo (iguales en todos los certificados de una mención)"""
     # ================= POSICIONES (calibraciones) =================
     TITLE_SHIFT_LEFT = 45
     INFO_SHIFT_LEFT_DM = 52.5
@@ -172,9 +307,6 @@ def generate_certificate_pdf(certificado: Dict) -> BytesIO:
     y_modalidad = (H - 305) + 4
     y_periodo = H - 285
     
-    # QR (no tocar)
-    qr_x, qr_y, qr_w, qr_h = W - 220, (H - 350) + 60, 125, 125
-    
     # ================= TITULO (baja si es 1 o 2 líneas) =================
     titulo = (datos_pdf.get("titulo") or "").strip()
     title_font = "Times-Bold"
@@ -214,16 +346,67 @@ def generate_certificate_pdf(certificado: Dict) -> BytesIO:
     
     # ================= PERIODO =================
     draw_centered_in_box(c, datos_pdf["periodo"], periodo_box_l, periodo_box_r, y_periodo, "Times-Roman", 9, colors.HexColor('#2c2c2c'))
+
+
+@functools.lru_cache(maxsize=256)
+def _tramos_qr(url: str):
+    """
+    Módulos oscuros del QR agrupados en tramos horizontales (fila, columna, largo)
+    Mismos parámetros que qrcode.make (corrección M, margen de 4 módulos), sin pasar por PIL.
+    Devuelve (módulos por lado incluido el margen, tupla de tramos)
+    """
+    qr = qrcode.QRCode(border=4)
+    qr.add_data(url)
+    qr.make(fit=True)
+    matriz = qr.get_matrix()
+    tramos = []
+    for fila, modulos in enumerate(matriz):
+        columna = 0
+        while columna < len(modulos):
+            if not modulos[columna]:
+                columna += 1
+                continue
+            inicio = columna
+            while columna < len(modulos) and modulos[columna]:
+                columna += 1
+            tramos.append((fila, inicio, columna - inicio))
+    return len(matriz), tuple(tramos)
+
+
+@metrics.colector
+def _metricas_qr():
+    info = _tramos_qr.cache_info()
+    cache_eventos.set(info.hits, cache='qr', resultado='hit')
+    cache_eventos.set(info.misses, cache='qr', resultado='miss')
+
+
+def dibujar_qr(c, url: str, x: float, y: float, lado: float):
+    """Dibuja el QR como vectores (un solo path relleno) en el cuadrado de lado `lado` con esquina en (x, y)"""
+    modulos, tramos = _tramos_qr(url)
+    paso = lado / modulos
+    c.saveState()
+    # Fondo blanco del margen, como el PNG que se usaba antes
+    c.setFillColor(colors.white)
+    c.rect(x, y, lado, lado, stroke=0, fill=1)
+    c.setFillColor(colors.black)
+    path = c.beginPath()
+    for fila, columna, largo in tramos:
+        path.rect(x + columna * paso, y + lado - (fila + 1) * paso, largo * paso, paso)
+    c.drawPath(path, stroke=0, fill=1)
+    c.restoreState()
+
+
+def _dibujar_qr_codigo(c, datos_pdf: Dict, W: float, H: float):
+    """QR de verificación y código (lo único propio de cada certificado)"""
+    # QR (no tocar)
+    qr_x, qr_y, qr_w, qr_h = W - 220, (H - 350) + 60, 125, 125
     
     # ================= QR =================
     try:
-        qr_img = qrcode.make(datos_pdf["url"])
-        qr_buffer = BytesIO()
-        qr_img.save(qr_buffer, format="PNG")
-        qr_buffer.seek(0)
-        c.drawImage(ImageReader(qr_buffer), qr_x, qr_y, width=qr_w, height=qr_h)
+        with log_evento.medir('qr'):
+            dibujar_qr(c, datos_pdf["url"], qr_x, qr_y, qr_w)
     except Exception as e:
-        print(f"ADVERTENCIA: Error generando QR: {str(e)}")
+        log.warning("Error generando QR: %s", e)
         # Continuar sin QR si hay error
     
     # ================= CODIGO (debajo del QR) =================
@@ -237,8 +420,7 @@ def generate_certificate_pdf(certificado: Dict) -> BytesIO:
         # Color distintivo para el código (azul oscuro)
         c.setFillColor(colors.HexColor('#1e3a5f'))
         c.drawCentredString(codigo_x, codigo_y, codigo)
-    
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    return buffer
+
+
+# Instancia global de la plantilla de fondo
+plantilla = PlantillaFondo(PLANTILLA_PATH)
@@ -3,8 +3,10 @@ import os
 from io import BytesIO
 from PIL import Image
 from app.core.config import settings
+from app.core.log import log_evento
 
 
+@log_evento.medir('qr')
 def generate_qr_code(codigo: str, size: int = 512) -> BytesIO:
     """Genera un código QR para un certificado"""
     # Usar la misma URL de verificación que se guarda en PDF_URL
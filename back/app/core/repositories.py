@@ -0,0 +1,144 @@
+"""
+Repositorios de certificados y clientes
+Los routers leen y escriben a través de estas interfaces; la implementación se elige con
+DATA_BACKEND: 'sheets' (Google Sheets, como siempre) o 'sql' (base de datos SQLAlchemy, con
+Google Sheets como copia que el exportador actualiza en segundo plano)
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.google_sheets import sheets_service, GoogleSheetsService
+from app.core.sheets_async import async_sheets
+
+log = get_logger(__name__)
+
+
+class CertificateRepository(ABC):
+    """Certificados en el formato de CERTIFICADOS QR (ver mapear_certificado_qr)"""
+
+    @abstractmethod
+    def get_by_code(self, codigo: str) -> Optional[Dict]:
+        """Certificado por código, o None si no existe"""
+
+    @abstractmethod
+    def list_all(self) -> List[Dict]:
+        """Todos los certificados en el formato del listado (ver mapear_listado_qr)"""
+
+    @abstractmethod
+    def create(self, data: Dict, mencion_data: Optional[Dict] = None) -> Dict:
+        """Crea un certificado. ValueError si el código ya existe"""
+
+    @abstractmethod
+    def update(self, codigo: str, data: Dict) -> Dict:
+        """Actualiza campos de un certificado. ValueError si no existe"""
+
+    def anular(self, codigo: str, motivo: Optional[str] = None) -> Dict:
+        """Anula un certificado cambiando su estado"""
+        update_data = {"estado": "ANULADO"}
+        if motivo:
+            update_data["motivo_anulacion"] = motivo
+        return self.update(codigo, update_data)
+
+    @abstractmethod
+    def update_pdf_url(self, codigo: str, pdf_url: str) -> bool:
+        """Actualiza la URL del PDF. False si el certificado no existe"""
+
+    @abstractmethod
+    def update_fields(self, codigo: str, fields: Dict) -> bool:
+        """Actualiza columnas de CERTIFICADOS QR (PDF_URL, CODIGO CERTIFICADO...). False si no existe"""
+
+
+class ClienteRepository(ABC):
+    """Clientes en el formato de la hoja CLIENTES ('DNI DEL CLIENTE', 'NOMBRE COMPLETO DEL CLIENTE'...)"""
+
+    @abstractmethod
+    def list_all(self) -> List[Dict]:
+        """Todos los clientes"""
+
+    @abstractmethod
+    def get_by_dni(self, dni: str) -> Optional[Dict]:
+        """Cliente por DNI (sin distinguir guiones, puntos ni espacios), o None"""
+
+    @abstractmethod
+    def create(self, data: Dict) -> Dict:
+        """Crea un cliente. ValueError si el DNI ya existe"""
+
+    @abstractmethod
+    def update(self, dni: str, data: Dict) -> Dict:
+        """Actualiza un cliente. ValueError si no existe"""
+
+    @abstractmethod
+    def delete(self, dni: str) -> bool:
+        """Elimina un cliente. False si no existe"""
+
+
+class SheetsCertificateRepository(CertificateRepository):
+    """Certificados en Google Sheets (CERTIFICADOS QR y hoja principal)"""
+
+    def __init__(self, sheets: GoogleSheetsService):
+        self._sheets = sheets
+
+    def get_by_code(self, codigo: str) -> Optional[Dict]:
+        return self._sheets.get_certificate_by_code(codigo)
+
+    def list_all(self) -> List[Dict]:
+        return self._sheets.get_all_certificates_qr()
+
+    def create(self, data: Dict, mencion_data: Optional[Dict] = None) -> Dict:
+        return self._sheets.create_certificate(data, mencion_data=mencion_data)
+
+    def update(self, codigo: str, data: Dict) -> Dict:
+        return self._sheets.update_certificate(codigo, data)
+
+    def update_pdf_url(self, codigo: str, pdf_url: str) -> bool:
+        return self._sheets.update_certificate_pdf_url(codigo, pdf_url)
+
+    def update_fields(self, codigo: str, fields: Dict) -> bool:
+        return self._sheets.update_certificate_fields(codigo, fields)
+
+
+class SheetsClienteRepository(ClienteRepository):
+    """Clientes en la hoja CLIENTES de Google Sheets"""
+
+    def __init__(self, sheets: GoogleSheetsService):
+        self._sheets = sheets
+
+    def list_all(self) -> List[Dict]:
+        return self._sheets.get_all_clientes()
+
+    def get_by_dni(self, dni: str) -> Optional[Dict]:
+        return self._sheets.get_cliente_by_dni(dni)
+
+    def create(self, data: Dict) -> Dict:
+        return self._sheets.create_cliente(data)
+
+    def update(self, dni: str, data: Dict) -> Dict:
+        return self._sheets.update_cliente(dni, data)
+
+    def delete(self, dni: str) -> bool:
+        return self._sheets.delete_cliente(dni)
+
+
+def crear_repositorios(backend: str) -> Tuple[str, CertificateRepository, ClienteRepository]:
+    """Repositorios del backend pedido; si 'sql' no está disponible se usa Google Sheets"""
+    if backend == 'sql':
+        try:
+            from app.database.repositories import SQLCertificateRepository, SQLClienteRepository
+            return 'sql', SQLCertificateRepository(), SQLClienteRepository()
+        except ImportError as e:
+            log.warning("DATA_BACKEND=sql pero SQLAlchemy no está disponible (%s); se usa Google Sheets", e)
+        except Exception as e:
+            log.error("Error iniciando la base de datos: %s; se usa Google Sheets", e)
+    elif backend != 'sheets':
+        log.warning("DATA_BACKEND desconocido '%s'; se usa Google Sheets", backend)
+    return 'sheets', SheetsCertificateRepository(sheets_service), SheetsClienteRepository(sheets_service)
+
+
+# Instancia global de los repositorios (backend efectivo: 'sql' o 'sheets')
+backend, certificados_repo, clientes_repo = crear_repositorios(settings.DATA_BACKEND)
+
+# Fachadas async para los routers (mismo pool de hilos que async_sheets)
+async_certificados = async_sheets.facade(certificados_repo)
+async_clientes = async_sheets.facade(clientes_repo)
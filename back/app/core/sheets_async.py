@@ -0,0 +1,68 @@
+"""
+Acceso no bloqueante a Google Sheets para los routers async
+gspread es síncrono: cada llamada se ejecuta en un pool de hilos acotado para que
+una lectura lenta no detenga el event loop de uvicorn
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.core.google_sheets import sheets_service, GoogleSheetsService
+from app.core.log import log_evento
+
+
+class AsyncSheetsService:
+    """
+    Fachada async de GoogleSheetsService.
+
+    Expone los mismos métodos que el servicio síncrono, pero como corrutinas:
+        certificado = await async_sheets.get_certificate_by_code(codigo)
+    """
+
+    def __init__(self, service: GoogleSheetsService, max_workers: int = 8, executor: Optional[ThreadPoolExecutor] = None):
+        self._service = service
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix='sheets',
+        )
+
+    @property
+    def service(self) -> GoogleSheetsService:
+        """Servicio síncrono subyacente (para métodos que no hacen I/O)"""
+        return self._service
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Ejecuta una función síncrona (p.ej. un método de gspread) en el pool de Sheets"""
+        loop = asyncio.get_running_loop()
+        # Copiar el contexto para que las variables de contexto del request sigan visibles en el hilo
+        ctx = contextvars.copy_context()
+        llamada = functools.partial(ctx.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, llamada)
+
+    def __getattr__(self, name: str):
+        atributo = getattr(self._service, name)
+        if not callable(atributo):
+            return atributo
+
+        @functools.wraps(atributo)
+        async def metodo(*args, **kwargs):
+            # Tramo del request por método (get_by_code_ms, update_pdf_url_ms...), incluida la espera del pool
+            with log_evento.medir(name):
+                return await self.run(atributo, *args, **kwargs)
+
+        return metodo
+
+    def facade(self, objeto: Any) -> 'AsyncSheetsService':
+        """Fachada async de otro objeto síncrono (p.ej. un repositorio) que comparte este pool"""
+        return AsyncSheetsService(objeto, executor=self._executor)
+
+    def shutdown(self) -> None:
+        """Libera los hilos del pool (al apagar el worker)"""
+        self._executor.shutdown(wait=True)
+
+
+# Instancia global del servicio async
+async_sheets = AsyncSheetsService(sheets_service, max_workers=settings.SHEETS_THREAD_POOL_SIZE)
@@ -0,0 +1,140 @@
+"""
+Exportación en segundo plano de la base de datos a Google Sheets
+Con DATA_BACKEND=sql los requests solo tocan la base de datos; esta tarea copia cada
+cambio (outbox `exportaciones_sheets`) a CERTIFICADOS QR y CLIENTES, en el orden en que
+se hizo, para quienes siguen trabajando en la planilla
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.google_sheets import GoogleSheetsService
+from app.core.log import get_logger
+from app.core.sheets_async import AsyncSheetsService, async_sheets
+from app.core import repositories
+
+log = get_logger(__name__)
+
+
+# Intentos antes de descartar un cambio que Google Sheets rechaza siempre
+MAX_INTENTOS = 10
+# Un cambio tomado por un worker que no terminó en este tiempo se puede volver a tomar
+VENCIMIENTO_RECLAMO = timedelta(minutes=5)
+
+
+class SheetsExporter:
+    """Copia a Google Sheets los cambios pendientes de la base de datos"""
+
+    def __init__(self, sheets: AsyncSheetsService, intervalo: float):
+        self._sheets = sheets
+        self.intervalo = intervalo
+        self._tarea: Optional[asyncio.Task] = None
+        self._estado: Dict = {'ultima_exportacion': None, 'exportados': 0, 'descartados': 0, 'error': None}
+
+    def _aplicar(self, entidad: str, clave: str, operacion: str, datos: Optional[Dict]) -> None:
+        """Repite el cambio en Google Sheets con el mismo método que usaba el router"""
+        service: GoogleSheetsService = self._sheets.service
+        datos = datos or {}
+        if entidad == 'certificado':
+            if operacion == 'crear':
+                # Idempotente: si un intento anterior llegó a escribir la fila, no se duplica
+                if not service.get_certificate_by_code(clave):
+                    service.create_certificate(datos['data'], mencion_data=datos.get('mencion_data'))
+            elif operacion == 'actualizar':
+                service.update_certificate(clave, datos['data'])
+            elif operacion == 'pdf_url':
+                if not service.update_certificate_pdf_url(clave, datos['pdf_url']):
+                    raise Exception(f"No se pudo actualizar PDF_URL de {clave} en CERTIFICADOS QR")
+            elif operacion == 'campos':
+                if not service.update_certificate_fields(clave, datos['fields']):
+                    raise Exception(f"No se pudieron actualizar los campos de {clave} en CERTIFICADOS QR")
+            else:
+                raise ValueError(f"Operación desconocida: {operacion}")
+        elif entidad == 'cliente':
+            if operacion == 'crear':
+                if not clave or not service.get_cliente_by_dni(clave):
+                    service.create_cliente(datos['data'])
+            elif operacion == 'actualizar':
+                service.update_cliente(clave, datos['data'])
+            elif operacion == 'eliminar':
+                service.delete_cliente(clave)
+            else:
+                raise ValueError(f"Operación desconocida: {operacion}")
+        else:
+            raise ValueError(f"Entidad desconocida: {entidad}")
+
+    def exportar_pendientes(self) -> int:
+        """Exporta los cambios pendientes en orden; se detiene en el primero que falla. Retorna los exportados"""
+        from app.database import crud
+        from app.database.database import session_scope
+
+        exportados = 0
+        with session_scope() as db:
+            for exportacion in crud.exportaciones_pendientes(db):
+                if not crud.reclamar_exportacion(db, exportacion.id, VENCIMIENTO_RECLAMO):
+                    break  # Otro worker la está exportando: respetar el orden
+                try:
+                    self._aplicar(exportacion.entidad, exportacion.clave, exportacion.operacion, exportacion.datos)
+                    # Con escrituras diferidas: el cambio debe quedar en Sheets antes de borrarlo de la cola
+                    self._sheets.service.flush_writes()
+                except Exception as e:
+                    exportacion.intentos += 1
+                    exportacion.error = str(e)[:500]
+                    exportacion.reclamada_en = None
+                    self._estado['error'] = exportacion.error
+                    if exportacion.intentos >= MAX_INTENTOS:
+                        log.error("Se descarta la exportación a Sheets #%s (%s %s, %s) tras %s intentos: %s",
+                                  exportacion.id, exportacion.entidad, exportacion.clave, exportacion.operacion, exportacion.intentos, e)
+                        db.delete(exportacion)
+                        db.commit()
+                        self._estado['descartados'] += 1
+                        continue
+                    log.warning("Falló la exportación a Sheets #%s (intento %s/%s): %s", exportacion.id, exportacion.intentos, MAX_INTENTOS, e)
+                    db.commit()
+                    break
+                db.delete(exportacion)
+                db.commit()
+                exportados += 1
+        if exportados:
+            self._estado.update(ultima_exportacion=datetime.now().isoformat(), error=None)
+            self._estado['exportados'] += exportados
+        return exportados
+
+    async def _ciclo(self) -> None:
+        while True:
+            try:
+                await self._sheets.run(self.exportar_pendientes)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("Error exportando cambios a Google Sheets: %s", e)
+                self._estado['error'] = str(e)
+            await asyncio.sleep(self.intervalo)
+
+    def start(self) -> None:
+        """Inicia la exportación (solo con la base de datos como origen)"""
+        if self._tarea or repositories.backend != 'sql' or self.intervalo <= 0:
+            return
+        self._tarea = asyncio.create_task(self._ciclo(), name='exportacion-sheets')
+
+    async def stop(self) -> None:
+        tarea, self._tarea = self._tarea, None
+        if tarea:
+            tarea.cancel()
+            await asyncio.gather(tarea, return_exceptions=True)
+
+    def estado(self) -> Dict:
+        """Cambios exportados, descartados y pendientes"""
+        if repositories.backend != 'sql':
+            return {'activa': False}
+        from app.database import crud
+        from app.database.database import session_scope
+
+        with session_scope() as db:
+            pendientes = crud.contar_exportaciones_pendientes(db)
+        return {'activa': self._tarea is not None, 'intervalo': self.intervalo, 'pendientes': pendientes, **self._estado}
+
+
+# Instancia global de la exportación
+sheets_exporter = SheetsExporter(async_sheets, settings.SHEETS_EXPORT_SECONDS)
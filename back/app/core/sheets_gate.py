@@ -0,0 +1,272 @@
+"""
+Control de cuota para las llamadas a la API de Google Sheets
+Todas las requests HTTP de gspread pasan por aquí: un token bucket por tipo de
+cuota (lectura/escritura), reintentos con backoff exponencial y jitter para los
+errores transitorios (429, 5xx, cortes de conexión) y un resumen del consumo
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+from app.core.config import settings
+from app.core.log import get_logger, log_evento
+from app.core.metrics import metrics, operacion_sheets, sheets_latencia, sheets_llamadas
+
+log = get_logger(__name__)
+
+
+# Códigos HTTP que indican un problema transitorio (cuota o servidor)
+CODIGOS_REINTENTABLES = {408, 429, 500, 502, 503, 504}
+# Motivos con los que la API responde 403 cuando en realidad es un límite de uso
+MOTIVOS_LIMITE_USO = {'rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded'}
+
+
+class SheetsQuotaExceeded(Exception):
+    """No hubo cuota disponible dentro del tiempo máximo de espera"""
+    pass
+
+
+def es_reintentable(error: Exception, idempotente: bool = True) -> bool:
+    """
+    Indica si un error de la API de Sheets es transitorio y vale la pena reintentar.
+    Una llamada no idempotente (append de filas) solo se reintenta si la request fue
+    rechazada antes de procesarse, para no duplicar filas.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return idempotente
+    if not isinstance(error, APIError):
+        return False
+    if error.code == 429:
+        return True
+    if error.code in CODIGOS_REINTENTABLES:
+        return idempotente
+    if error.code == 403:
+        # La API de Drive responde 403 (no 429) al alcanzar límites de uso
+        detalles = error.error.get('errors') or [{}]
+        return (
+            detalles[0].get('domain') == 'usageLimits'
+            or detalles[0].get('reason') in MOTIVOS_LIMITE_USO
+        )
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Segundos sugeridos por el header Retry-After, si la respuesta lo trae"""
+    response = getattr(error, 'response', None)
+    valor = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(valor) if valor else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `per_minute` tokens por minuto con ráfagas de hasta `burst`"""
+
+    def __init__(self, per_minute: float, burst: int):
+        self.per_minute = per_minute
+        self.capacity = max(1, burst)
+        self._rate = per_minute / 60.0
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        if self._rate <= 0:
+            return float('inf')
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def acquire(self, max_wait: float) -> float:
+        """Consume un token esperando lo necesario. Retorna los segundos esperados"""
+        if self._rate <= 0:
+            return 0.0  # Sin límite configurado
+        inicio = time.monotonic()
+        esperando = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - inicio if esperando else 0.0
+                espera = (1 - self._tokens) / self._rate
+            if espera > max_wait - (time.monotonic() - inicio):
+                raise SheetsQuotaExceeded(
+                    f"Cuota de Google Sheets agotada ({self.per_minute:g}/min): no hay capacidad en los próximos {max_wait:g}s"
+                )
+            esperando = True
+            time.sleep(espera)
+
+    def drain(self) -> None:
+        """Vacía el bucket (tras un 429 todas las llamadas deben frenar, no solo la que falló)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class SheetsCallGate:
+    """Punto único por el que pasan las llamadas a Google Sheets"""
+
+    def __init__(
+        self,
+        read_per_minute: float = 60,
+        write_per_minute: float = 60,
+        burst: int = 10,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 32.0,
+        max_wait: float = 30.0,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self._buckets = {
+            'read': TokenBucket(read_per_minute, burst),
+            'write': TokenBucket(write_per_minute, burst),
+        }
+        self._lock = threading.Lock()
+        # Momento de cada llamada del último minuto (para estimar la cuota restante)
+        self._recientes = {tipo: deque() for tipo in self._buckets}
+        self._stats = {
+            tipo: {'llamadas': 0, 'reintentos': 0, 'errores': 0, 'esperas': 0, 'segundos_esperados': 0.0}
+            for tipo in self._buckets
+        }
+        self._ultimo_error = None
+
+    def _backoff(self, intento: int, error: Exception) -> float:
+        # "Full jitter": espera aleatoria entre 0 y el tope exponencial
+        espera = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** intento)))
+        sugerido = _retry_after(error)
+        return max(espera, sugerido) if sugerido else espera
+
+    def _podar(self, tipo: str, now: float) -> None:
+        recientes = self._recientes[tipo]
+        while recientes and now - recientes[0] > 60:
+            recientes.popleft()
+
+    def _registrar(self, tipo: str, esperado: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._recientes[tipo].append(now)
+            self._podar(tipo, now)
+            stats = self._stats[tipo]
+            stats['llamadas'] += 1
+            if esperado > 0:
+                stats['esperas'] += 1
+                stats['segundos_esperados'] += esperado
+
+    def call(self, tipo: str, func: Callable, *args, idempotente: bool = True, **kwargs) -> Any:
+        """Ejecuta `func` respetando la cuota de `tipo` ('read' o 'write') y reintentando errores transitorios"""
+        bucket = self._buckets[tipo]
+        intento = 0
+        while True:
+            self._registrar(tipo, bucket.acquire(self.max_wait))
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                reintentable = es_reintentable(e, idempotente)
+                with self._lock:
+                    self._ultimo_error = {'tipo': tipo, 'error': str(e)[:200], 'momento': time.time()}
+                    if not reintentable or intento >= self.max_retries:
+                        self._stats[tipo]['errores'] += 1
+                    else:
+                        self._stats[tipo]['reintentos'] += 1
+                if not reintentable or intento >= self.max_retries:
+                    raise
+                if isinstance(e, APIError) and e.code == 429:
+                    bucket.drain()
+                espera = self._backoff(intento, e)
+                log.warning("Google Sheets respondió '%s', reintento %s/%s en %.1fs", e, intento + 1, self.max_retries, espera)
+                intento += 1
+                time.sleep(espera)
+
+    def snapshot(self) -> Dict:
+        """Resumen del consumo de cuota: llamadas del último minuto, restante estimado y reintentos"""
+        with self._lock:
+            now = time.monotonic()
+            resumen = {}
+            for tipo, bucket in self._buckets.items():
+                self._podar(tipo, now)
+                ultimo_minuto = len(self._recientes[tipo])
+                resumen[tipo] = {
+                    'cuota_por_minuto': bucket.per_minute,
+                    'llamadas_ultimo_minuto': ultimo_minuto,
+                    'restante_estimado': max(0, bucket.per_minute - ultimo_minuto) if bucket.per_minute > 0 else None,
+                    'tokens_disponibles': round(bucket.available, 2) if bucket.per_minute > 0 else None,
+                    **self._stats[tipo],
+                }
+                resumen[tipo]['segundos_esperados'] = round(resumen[tipo]['segundos_esperados'], 2)
+            resumen['ultimo_error'] = self._ultimo_error
+            return resumen
+
+
+class GatedHTTPClient(HTTPClient):
+    """HTTPClient de gspread que pasa cada request por el SheetsCallGate global"""
+
+    def request(self, method: str, endpoint: str, *args, **kwargs):
+        tipo = 'read' if method.upper() == 'GET' else 'write'
+        idempotente = ':append' not in endpoint
+        operacion, hoja = operacion_sheets(method, endpoint, kwargs.get('params'), kwargs.get('json'))
+        inicio = time.perf_counter()
+        resultado = 'error'
+        try:
+            respuesta = sheets_gate.call(tipo, super().request, method, endpoint, *args, idempotente=idempotente, **kwargs)
+            resultado = 'ok'
+            return respuesta
+        finally:
+            segundos = time.perf_counter() - inicio
+            sheets_llamadas.inc(operacion=operacion, hoja=hoja, resultado=resultado)
+            sheets_latencia.observe(segundos, operacion=operacion, hoja=hoja)
+            log_evento.contar('sheets_llamadas')
+            log.debug("Google Sheets %s %s (%.0f ms)", operacion, hoja, segundos * 1000)
+
+
+# Instancia global del control de cuota
+sheets_gate = SheetsCallGate(
+    read_per_minute=settings.SHEETS_READ_PER_MINUTE,
+    write_per_minute=settings.SHEETS_WRITE_PER_MINUTE,
+    burst=settings.SHEETS_BURST,
+    max_retries=settings.SHEETS_MAX_RETRIES,
+    backoff_base=settings.SHEETS_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.SHEETS_BACKOFF_MAX_SECONDS,
+    max_wait=settings.SHEETS_QUOTA_MAX_WAIT_SECONDS,
+)
+
+
+cuota_llamadas = metrics.gauge(
+    'sheets_quota_calls_last_minute', 'Llamadas a Google Sheets del último minuto por tipo de cuota', ('tipo',))
+cuota_restante = metrics.gauge(
+    'sheets_quota_remaining', 'Cuota estimada restante del minuto por tipo (-1 = sin límite)', ('tipo',))
+cuota_eventos = metrics.counter(
+    'sheets_quota_events_total', 'Reintentos, errores y esperas por cuota de Google Sheets', ('tipo', 'evento'))
+cuota_espera = metrics.counter(
+    'sheets_quota_wait_seconds_total', 'Segundos esperados por el token bucket de cuota', ('tipo',))
+
+
+@metrics.colector
+def _metricas_cuota() -> None:
+    resumen = sheets_gate.snapshot()
+    for tipo in ('read', 'write'):
+        datos = resumen[tipo]
+        cuota_llamadas.set(datos['llamadas_ultimo_minuto'], tipo=tipo)
+        restante = datos['restante_estimado']
+        cuota_restante.set(-1 if restante is None else restante, tipo=tipo)
+        for evento in ('reintentos', 'errores', 'esperas'):
+            cuota_eventos.set(datos[evento], tipo=tipo, evento=evento)
+        cuota_espera.set(datos['segundos_esperados'], tipo=tipo)
@@ -0,0 +1,72 @@
+"""
+Refresco en segundo plano de las cachés de Google Sheets
+Una tarea asyncio por hoja recarga su caché cada N segundos, antes de que venza,
+para que ningún request tenga que esperar una descarga completa
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.sheets_async import AsyncSheetsService, async_sheets
+
+log = get_logger(__name__)
+
+
+class SheetsRefresher:
+    """Mantiene al día las cachés de menciones, clientes y CERTIFICADOS QR"""
+
+    def __init__(self, sheets: AsyncSheetsService, intervalos: Dict[str, float]):
+        self._sheets = sheets
+        self.intervalos = {hoja: segundos for hoja, segundos in intervalos.items() if segundos > 0}
+        self._tareas: Dict[str, asyncio.Task] = {}
+        self._estado: Dict[str, Dict] = {}
+
+    async def _ciclo(self, hoja: str, intervalo: float) -> None:
+        while True:
+            try:
+                await self._sheets.refrescar_cache(hoja)
+                self._estado[hoja] = {'ultimo_refresco': datetime.now().isoformat(), 'error': None}
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Se sigue sirviendo la copia anterior; se reintenta en el próximo ciclo
+                log.error("Error refrescando caché de %s: %s", hoja, e)
+                self._estado.setdefault(hoja, {'ultimo_refresco': None})['error'] = str(e)
+            await asyncio.sleep(intervalo)
+
+    def start(self) -> None:
+        """Inicia una tarea por hoja (la primera recarga es inmediata)"""
+        if self._tareas:
+            return
+        self._sheets.service.activar_refresco(list(self.intervalos))
+        for hoja, intervalo in self.intervalos.items():
+            self._tareas[hoja] = asyncio.create_task(self._ciclo(hoja, intervalo), name=f"refresco-{hoja}")
+
+    async def stop(self) -> None:
+        """Detiene las tareas; las cachés vuelven a expirar con su TTL normal"""
+        self._sheets.service.activar_refresco([])
+        tareas, self._tareas = list(self._tareas.values()), {}
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    def estado(self) -> Dict[str, Optional[Dict]]:
+        """Último refresco (y error, si lo hubo) de cada hoja"""
+        return {
+            hoja: {'intervalo': intervalo, **self._estado.get(hoja, {'ultimo_refresco': None, 'error': None})}
+            for hoja, intervalo in self.intervalos.items()
+        }
+
+
+def _intervalos() -> Dict[str, float]:
+    """Con la base de datos como origen, certificados y clientes no se leen de Sheets en los requests"""
+    from app.core.repositories import backend
+    if backend == 'sql':
+        return {hoja: s for hoja, s in settings.SHEETS_REFRESH_SECONDS.items() if hoja not in ('certificados_qr', 'clientes')}
+    return settings.SHEETS_REFRESH_SECONDS
+
+
+# Instancia global del refresco
+sheets_refresher = SheetsRefresher(async_sheets, _intervalos())
@@ -0,0 +1,154 @@
+"""
+Réplica local (SQLite) de las hojas de Google Sheets
+Guarda las filas sincronizadas de CERTIFICADOS QR, CLIENTES, MENCIONES y compras en un
+archivo compartido por todos los workers de la máquina: un reinicio o un worker nuevo
+arranca leyendo el archivo en lugar de descargar cada hoja
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Las búsquedas por código y DNI se hacen sobre los índices en memoria del servicio:
+# la réplica solo guarda filas completas por hoja. Al cambiar el esquema se sube la versión
+# y los archivos anteriores se descartan (es una caché, se vuelve a sincronizar)
+_VERSION_ESQUEMA = 2
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS filas (
+    hoja TEXT NOT NULL,
+    fila INTEGER NOT NULL,
+    datos TEXT NOT NULL,
+    PRIMARY KEY (hoja, fila)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    hoja TEXT PRIMARY KEY,
+    version TEXT,
+    headers TEXT,
+    sincronizado TEXT,
+    completa TEXT
+);
+"""
+
+
+class SheetsReplica:
+    """Espejo SQLite de las filas de cada hoja y de su versión (modifiedTime) sincronizada"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _conexion(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            # WAL: lectores de otros workers no se bloquean mientras uno escribe
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _VERSION_ESQUEMA:
+                conn.executescript("DROP TABLE IF EXISTS filas; DROP TABLE IF EXISTS meta;")
+                conn.execute(f"PRAGMA user_version = {_VERSION_ESQUEMA}")
+            conn.executescript(_ESQUEMA)
+            self._conn = conn
+        return self._conn
+
+    def meta(self, hoja: str) -> Optional[Dict]:
+        """Versión, headers y momentos de sincronización de una hoja (None si nunca se sincronizó)"""
+        with self._lock:
+            row = self._conexion().execute(
+                "SELECT version, headers, sincronizado, completa FROM meta WHERE hoja = ?", (hoja,)
+            ).fetchone()
+        if row is None:
+            return None
+        version, headers, sincronizado, completa = row
+        return {
+            'version': version,
+            'headers': json.loads(headers) if headers else [],
+            'sincronizado': datetime.fromisoformat(sincronizado) if sincronizado else None,
+            'completa': datetime.fromisoformat(completa) if completa else None,
+        }
+
+    def registros(self, hoja: str) -> List[Dict]:
+        """Filas de una hoja en el orden del Sheet"""
+        with self._lock:
+            rows = self._conexion().execute(
+                "SELECT datos FROM filas WHERE hoja = ? ORDER BY fila", (hoja,)
+            ).fetchall()
+        return [json.loads(datos) for (datos,) in rows]
+
+    def reemplazar(self, hoja: str, headers: List[str], records: List[Dict], version: Optional[str]) -> None:
+        """Reemplaza todas las filas de una hoja (descarga completa)"""
+        ahora = datetime.now().isoformat()
+        filas = [
+            (hoja, fila, json.dumps(record, ensure_ascii=False))
+            for fila, record in enumerate(records, start=2)
+        ]
+        with self._lock:
+            conn = self._conexion()
+            with conn:
+                conn.execute("DELETE FROM filas WHERE hoja = ?", (hoja,))
+                conn.executemany("INSERT INTO filas VALUES (?, ?, ?)", filas)
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (hoja, version, headers, sincronizado, completa) VALUES (?, ?, ?, ?, ?)",
+                    (hoja, version, json.dumps(headers, ensure_ascii=False), ahora, ahora),
+                )
+
+    def guardar_filas(self, hoja: str, filas: Dict[int, Dict], version: Optional[str] = None) -> None:
+        """
+        Inserta o actualiza filas sueltas (altas y ediciones hechas por la app, filas nuevas de
+        una sincronización incremental). Con `version` también marca la hoja como sincronizada.
+        """
+        datos = [
+            (hoja, fila, json.dumps(record, ensure_ascii=False))
+            for fila, record in filas.items()
+        ]
+        with self._lock:
+            conn = self._conexion()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO filas VALUES (?, ?, ?)", datos)
+                if version is not None:
+                    conn.execute(
+                        "UPDATE meta SET version = ?, sincronizado = ? WHERE hoja = ?",
+                        (version, datetime.now().isoformat(), hoja),
+                    )
+
+    def actualizar(self, hoja: str, fila: int, campos: Dict) -> None:
+        """Edita columnas de una fila ya replicada (ediciones de celdas hechas por la app)"""
+        with self._lock:
+            conn = self._conexion()
+            with conn:
+                row = conn.execute("SELECT datos FROM filas WHERE hoja = ? AND fila = ?", (hoja, fila)).fetchone()
+                if row is None:
+                    return
+                record = {**json.loads(row[0]), **campos}
+                conn.execute(
+                    "INSERT OR REPLACE INTO filas VALUES (?, ?, ?)",
+                    (hoja, fila, json.dumps(record, ensure_ascii=False)),
+                )
+
+    def quitar_fila(self, hoja: str, fila: int) -> None:
+        """Elimina una fila y corre hacia arriba las siguientes, como delete_rows en el Sheet"""
+        with self._lock:
+            conn = self._conexion()
+            with conn:
+                conn.execute("DELETE FROM filas WHERE hoja = ? AND fila = ?", (hoja, fila))
+                # En dos pasos (por negativos) para no chocar con la clave primaria mientras se renumera
+                conn.execute("UPDATE filas SET fila = -(fila - 1) WHERE hoja = ? AND fila > ?", (hoja, fila))
+                conn.execute("UPDATE filas SET fila = -fila WHERE hoja = ? AND fila < 0", (hoja,))
+
+    def descartar(self, hoja: str) -> None:
+        """Quita la versión sincronizada de una hoja: la próxima lectura vuelve a Google Sheets"""
+        with self._lock:
+            conn = self._conexion()
+            with conn:
+                conn.execute("DELETE FROM meta WHERE hoja = ?", (hoja,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,262 @@
+"""
+Esquema de columnas de las hojas de Google Sheets
+Resuelve cada campo lógico (codigo, dni, pdf_url, estado, mención...) a un índice
+de columna una sola vez por versión de headers
+"""
+from typing import Dict, List, Optional
+
+
+def _normalizar_header(header) -> str:
+    return str(header).upper().strip() if header is not None else ""
+
+
+# Columnas de CERTIFICADOS QR al crear un certificado: campo -> headers aceptados
+# (el orden importa: un header se asigna al primer campo que lo declare)
+ALIAS_ALTA_CERTIFICADOS_QR = {
+    'codigo': ['CODIGO', 'CÓDIGO', 'CODIGO CERTIFICADO'],
+    'dni': ['DNI', 'DNI DEL CLIENTE', 'DNI CLIENTE'],
+    'nombre_completo': ['NOMBRE COMPLETO', 'NOMBRE COMPLETO DEL CLIENTE', 'NOMBRE', 'CLIENTE', 'NOMBRES', 'APELLIDOS'],
+    'celular': ['CELULAR DEL CLIENTE', 'CELULAR', 'TELEFONO', 'TELÉFONO', 'PHONE'],
+    'correo': ['CORREO DEL CLIENTE', 'CORREO', 'EMAIL', 'E-MAIL'],
+    'curso': ['CURSO', 'NOMBRE DEL CURSO'],
+    'fecha_emision': ['FECHA EMISION', 'FECHA DE EMISIÓN', 'FECHA EMISIÓN', 'FECHA'],
+    'horas': ['HORAS', 'HORAS TOTALES', 'TOTAL HORAS'],
+    'estado': ['ESTADO', 'ESTADO CERTIFICADO'],
+    'pdf_url': ['PDF_URL', 'PDF URL', 'URL PDF', 'URL'],
+    'nro': ['NRO', 'NRO MENCION', 'NUMERO MENCION', 'MENCIÓN NRO'],
+    'especialidad': ['ESPECIALIDAD', 'ESPECIALIDAD MENCION'],
+    'p_certificado': ['P. CERTIFICADO', 'P CERTIFICADO', 'PROGRAMA CERTIFICADO', 'PROGRAMA'],
+    'mencion': ['MENCIÓN', 'MENCION', 'TEXTO MENCION'],
+    'f_inicio': ['F. INICIO', 'FECHA INICIO', 'FECHA DE INICIO', 'F INICIO'],
+    'f_termino': ['F. TÉRMINO', 'F. TERMINO', 'FECHA TERMINO', 'FECHA DE TERMINO', 'F TERMINO'],
+}
+
+# Columnas que se actualizan sobre un certificado existente: campo -> headers aceptados
+ALIAS_ACTUALIZACION_CERTIFICADOS_QR = {
+    'CODIGO CERTIFICADO': ['CODIGO CERTIFICADO', 'CODIGO_CERTIFICADO', 'CÓDIGO CERTIFICADO'],
+    'FECHA_GENERACION': ['FECHA GENERACION', 'FECHA_GENERACION', 'FECHA DE GENERACION', 'FECHA GENERACIÓN'],
+    'PDF_URL': ['PDF_URL', 'PDF URL', 'URL PDF', 'URL'],
+}
+
+# Columnas que identifican la fila de un certificado
+COLUMNAS_CODIGO_QR = ['CODIGO', 'CÓDIGO', 'codigo']
+COLUMNAS_CODIGO_PRINCIPAL = ['codigo']
+
+# Headers con los que se crea CERTIFICADOS QR cuando la hoja está vacía: campo -> header
+HEADERS_BASICOS_CERTIFICADOS_QR = {
+    'codigo': 'CODIGO',
+    'dni': 'DNI DEL CLIENTE',
+    'nombre_completo': 'NOMBRE COMPLETO DEL CLIENTE',
+    'celular': 'CELULAR DEL CLIENTE',
+    'correo': 'CORREO DEL CLIENTE',
+    'curso': 'CURSO',
+    'fecha_emision': 'FECHA EMISION',
+    'horas': 'HORAS',
+    'estado': 'ESTADO',
+    'pdf_url': 'PDF_URL',
+    'nro': 'NRO',
+    'especialidad': 'ESPECIALIDAD',
+    'p_certificado': 'P. CERTIFICADO',
+    'mencion': 'MENCIÓN',
+    'f_inicio': 'F. INICIO',
+    'f_termino': 'F. TÉRMINO',
+}
+
+# header normalizado -> campo (compilado una vez)
+CAMPO_ALTA_POR_HEADER: Dict[str, str] = {}
+for _campo, _aliases in ALIAS_ALTA_CERTIFICADOS_QR.items():
+    for _alias in _aliases:
+        CAMPO_ALTA_POR_HEADER.setdefault(_normalizar_header(_alias), _campo)
+
+
+def valores_alta_certificado(data: Dict, mencion_data: Optional[Dict] = None) -> Dict[str, str]:
+    """
+    Valor de cada campo lógico de un certificado nuevo (los de ALIAS_ALTA_CERTIFICADOS_QR),
+    a partir de los datos del formulario y de la mención
+    """
+    # Obtener nombre completo: primero intentar desde 'nombre_completo' o 'NOMBRE COMPLETO DEL CLIENTE'
+    # Si no está, combinar nombres + apellidos del formulario
+    nombre_completo = (
+        data.get('nombre_completo', '') or 
+        data.get('NOMBRE COMPLETO DEL CLIENTE', '') or
+        data.get('nombreCompleto', '')
+    )
+
+    # Si no hay nombre completo directo, combinar nombres + apellidos
+    if not nombre_completo:
+        nombres = data.get('nombres', '') or data.get('NOMBRES', '')
+        apellidos = data.get('apellidos', '') or data.get('APELLIDOS', '')
+        nombre_completo = f"{nombres} {apellidos}".strip()
+
+    return {
+        'codigo': data.get('codigo', '') or data.get('CODIGO', ''),
+        # Solo guardar DNI si está disponible
+        'dni': data.get('dni', '') or data.get('DNI', '') or '',
+        # Para cualquier campo de nombre, usar nombre completo (un solo campo)
+        'nombre_completo': nombre_completo,
+        'celular': (
+            data.get('CELULAR DEL CLIENTE', '')
+            or data.get('telefono', '')
+            or data.get('TELEFONO', '')
+            or data.get('CELULAR', '')
+        ),
+        'correo': (
+            data.get('CORREO DEL CLIENTE', '')
+            or data.get('email', '')
+            or data.get('EMAIL', '')
+            or data.get('CORREO', '')
+        ),
+        'curso': data.get('curso', '') or data.get('CURSO', ''),
+        'fecha_emision': data.get('fecha_emision', '') or data.get('FECHA_EMISION', '') or data.get('FECHA EMISION', ''),
+        # Priorizar horas de la mención si está disponible
+        'horas': data.get('mencion_horas', '') or data.get('horas', '') or data.get('HORAS', '') or (mencion_data.get('HORAS', '') if mencion_data else ''),
+        'estado': data.get('estado', 'VALIDO') or data.get('ESTADO', 'VALIDO'),
+        'pdf_url': data.get('pdf_url', '') or data.get('PDF_URL', ''),
+        # Número, especialidad y programa/certificado de la mención
+        'nro': data.get('mencion_nro', '') or (mencion_data.get('NRO', '') if mencion_data else ''),
+        'especialidad': data.get('mencion_especialidad', '') or (mencion_data.get('ESPECIALIDAD', '') if mencion_data else ''),
+        'p_certificado': data.get('mencion_p_certificado', '') or (mencion_data.get('P. CERTIFICADO', '') if mencion_data else ''),
+        # Texto completo de la mención
+        'mencion': data.get('mencion_texto', '') or (mencion_data.get('MENCIÓN', '') if mencion_data else ''),
+        # Fechas de inicio y término
+        'f_inicio': data.get('fecha_inicio', '') or (mencion_data.get('F. INICIO', '') if mencion_data else ''),
+        'f_termino': data.get('fecha_termino', '') or (mencion_data.get('F. TÉRMINO', '') if mencion_data else ''),
+        # Nota: Se eliminó el campo "F. EMISIÓN" de la mención en CERTIFICADOS QR para evitar duplicidad con "FECHA EMISION".
+    }
+
+
+def mapear_certificado_qr(record: Dict) -> Dict:
+    """Mapea un registro de CERTIFICADOS QR al formato esperado (incluyendo los campos de la mención)"""
+    codigo_record = next((record.get(c) for c in COLUMNAS_CODIGO_QR if record.get(c)), '')
+    codigo_clean = str(codigo_record).strip() if codigo_record else ""
+
+    # Separar nombre completo en nombres y apellidos
+    nombre_completo = record.get('NOMBRE COMPLETO DEL CLIENTE', '') or record.get('NOMBRE COMPLETO', '') or ''
+    nombres = ''
+    apellidos = ''
+    if nombre_completo:
+        partes = nombre_completo.split(' ', 1)
+        if len(partes) >= 2:
+            nombres = partes[0]
+            apellidos = ' '.join(partes[1:])
+        else:
+            nombres = nombre_completo
+
+    # Asegurar que horas sea string o None
+    horas_value = record.get('HORAS', '') or record.get('horas', '')
+    if horas_value:
+        horas_value = str(horas_value) if not isinstance(horas_value, str) else horas_value
+    else:
+        horas_value = None
+
+    return {
+        'codigo': codigo_clean or '',
+        'nombres': nombres or '',
+        'apellidos': apellidos or '',
+        'nombre_completo': nombre_completo or '',
+        'dni': record.get('DNI DEL CLIENTE', '') or record.get('DNI', '') or record.get('dni', '') or '',
+        'curso': record.get('CURSO', '') or record.get('P. CERTIFICADO', '') or record.get('curso', '') or '',
+        'fecha_emision': record.get('FECHA EMISION', '') or record.get('FECHA EMISIÓN', '') or record.get('F. EMISIÓN', '') or record.get('fecha_emision', '') or '',
+        'horas': horas_value,
+        'estado': record.get('ESTADO', 'VALIDO') or record.get('estado', 'VALIDO') or 'VALIDO',
+        'pdf_url': record.get('PDF_URL', '') or record.get('PDF URL', '') or record.get('pdf_url', '') or None,
+        # Campos adicionales para el PDF con plantilla
+        'mencion': record.get('MENCIÓN', '') or record.get('mencion', '') or '',
+        'f_inicio': record.get('F. INICIO', '') or record.get('f_inicio', '') or '',
+        'f_termino': record.get('F. TÉRMINO', '') or record.get('F. TERMINO', '') or record.get('f_termino', '') or '',
+        'p_certificado': record.get('P. CERTIFICADO', '') or record.get('p_certificado', '') or '',
+    }
+
+
+def mapear_listado_qr(record: Dict) -> Dict:
+    """Mapea un registro de CERTIFICADOS QR al formato del listado (con los datos de contacto del cliente)"""
+    # Separar nombre completo en nombres y apellidos
+    nombre_completo = record.get('NOMBRE COMPLETO DEL CLIENTE', '') or record.get('NOMBRE COMPLETO', '') or ''
+    nombres = ''
+    apellidos = ''
+    if nombre_completo:
+        partes = nombre_completo.split(' ', 1)
+        if len(partes) >= 2:
+            nombres = partes[0]
+            apellidos = ' '.join(partes[1:])
+        else:
+            nombres = nombre_completo
+
+    return {
+        'codigo': record.get('CODIGO', '') or record.get('codigo', ''),
+        'nombres': nombres,
+        'apellidos': apellidos,
+        'dni': record.get('DNI DEL CLIENTE', '') or record.get('DNI', '') or record.get('dni', ''),
+        'curso': record.get('CURSO', '') or record.get('curso', ''),
+        'fecha_emision': record.get('FECHA EMISION', '') or record.get('FECHA EMISIÓN', '') or record.get('fecha_emision', ''),
+        'horas': record.get('HORAS', '') or record.get('horas', ''),
+        'estado': record.get('ESTADO', 'VALIDO') or record.get('estado', 'VALIDO'),
+        'pdf_url': record.get('PDF_URL', '') or record.get('pdf_url', ''),
+        # Campos adicionales de CERTIFICADOS QR
+        'nombre_completo': nombre_completo,
+        'celular': record.get('CELULAR DEL CLIENTE', '') or record.get('celular', ''),
+        'correo': record.get('CORREO DEL CLIENTE', '') or record.get('correo', ''),
+        'nro': record.get('NRO', '') or record.get('nro', ''),
+        'especialidad': record.get('ESPECIALIDAD', '') or record.get('especialidad', ''),
+        'p_certificado': record.get('P. CERTIFICADO', '') or record.get('p_certificado', ''),
+        'mencion': record.get('MENCIÓN', '') or record.get('mencion', ''),
+        'f_inicio': record.get('F. INICIO', '') or record.get('f_inicio', ''),
+        'f_termino': record.get('F. TÉRMINO', '') or record.get('f_termino', ''),
+    }
+
+
+class SheetSchema:
+    """Headers de una hoja con las búsquedas de columnas memorizadas"""
+
+    def __init__(self, headers: List[str]):
+        self.headers = list(headers)
+        self._upper = [_normalizar_header(h) for h in self.headers]
+        # Primer índice (base 1) de cada header exacto y normalizado
+        self._exacto: Dict[str, int] = {}
+        self._normalizado: Dict[str, int] = {}
+        for idx, header in enumerate(self.headers, start=1):
+            self._exacto.setdefault(header, idx)
+            self._normalizado.setdefault(self._upper[idx - 1], idx)
+        self._campos: Dict[tuple, Optional[int]] = {}
+
+    def __bool__(self) -> bool:
+        return any(h.strip() for h in self.headers if h)
+
+    def matches(self, headers: List[str]) -> bool:
+        """Indica si los headers observados coinciden con los del esquema"""
+        return list(headers) == self.headers
+
+    def col(self, header: str) -> Optional[int]:
+        """Índice (base 1) de un header exacto, como headers.index(header) + 1"""
+        return self._exacto.get(header)
+
+    def col_alias(self, aliases: List[str]) -> Optional[int]:
+        """Índice de la primera columna cuyo header coincide con algún alias (sin distinguir mayúsculas)"""
+        clave = ('alias', tuple(aliases))
+        if clave not in self._campos:
+            self._campos[clave] = next(
+                (self._normalizado[_normalizar_header(a)] for a in aliases if _normalizar_header(a) in self._normalizado),
+                None,
+            )
+        return self._campos[clave]
+
+    def col_campo(self, campo: str, aliases: Optional[List[str]] = None) -> Optional[int]:
+        """
+        Columna de un campo: primero por alias exacto y luego por similitud
+        (el nombre del campo contenido en el header o viceversa)
+        """
+        clave = ('campo', campo, tuple(aliases or [campo]))
+        if clave not in self._campos:
+            col_idx = self.col_alias(aliases or [campo])
+            if not col_idx:
+                campo_upper = _normalizar_header(campo)
+                col_idx = next(
+                    (idx for idx, h in enumerate(self._upper, start=1) if campo_upper in h or h in campo_upper),
+                    None,
+                )
+            self._campos[clave] = col_idx
+        return self._campos[clave]
+
+    def with_header(self, header: str) -> 'SheetSchema':
+        """Nuevo esquema con una columna agregada al final"""
+        return SheetSchema(self.headers + [header])
@@ -0,0 +1,71 @@
+"""
+Calentamiento de Google Sheets al arrancar el worker
+La conexión, los spreadsheets y las cachés se cargan en una tarea en segundo plano: uvicorn
+responde /health desde el primer momento y /ready indica cuándo el worker puede atender sin
+esperar a Google. Si Google no responde se reintenta; los requests que lleguen antes
+conectan por su cuenta (la conexión es perezosa).
+"""
+import asyncio
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.sheets_async import AsyncSheetsService, async_sheets
+from app.core import repositories
+
+log = get_logger(__name__)
+
+
+class SheetsWarmup:
+    """Conecta y carga las cachés de Google Sheets en segundo plano, reintentando ante errores"""
+
+    def __init__(self, sheets: AsyncSheetsService, reintento: float):
+        self._sheets = sheets
+        self.reintento = reintento
+        self._tarea: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def hojas() -> List[str]:
+        """Cachés que usan los requests (con la base de datos como origen, solo menciones)"""
+        if repositories.backend == 'sql':
+            return ['menciones']
+        return ['certificados_qr', 'menciones', 'clientes']
+
+    async def _ciclo(self) -> None:
+        hojas = self.hojas()
+        while True:
+            try:
+                await self._sheets.run(self._sheets.service.calentar, hojas)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Calentamiento de Google Sheets incompleto (%s); reintento en %.0fs", e, self.reintento)
+            await asyncio.sleep(self.reintento)
+
+    def start(self) -> None:
+        if self._tarea or self.reintento <= 0:
+            return
+        self._tarea = asyncio.create_task(self._ciclo(), name='calentamiento-sheets')
+
+    async def stop(self) -> None:
+        tarea, self._tarea = self._tarea, None
+        if tarea:
+            tarea.cancel()
+            await asyncio.gather(tarea, return_exceptions=True)
+
+    def listo(self) -> bool:
+        """
+        El worker puede atender sin esperar a Google Sheets. Sin calentamiento siempre lo está
+        (conecta en el primer request); con la base de datos como origen, Sheets no bloquea las consultas
+        """
+        if self.reintento <= 0 or repositories.backend == 'sql':
+            return True
+        return self._sheets.service.estado_calentamiento()['listo']
+
+    def estado(self) -> Dict:
+        return {'activo': self.reintento > 0, 'hojas': self.hojas(), **self._sheets.service.estado_calentamiento()}
+
+
+# Instancia global del calentamiento
+sheets_warmup = SheetsWarmup(async_sheets, settings.SHEETS_WARMUP_RETRY_SECONDS)
@@ -0,0 +1,146 @@
+"""
+Buffer de escritura para Google Sheets
+Acumula ediciones de celdas y rangos y las envía en un solo batch_update por hoja
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Any
+
+from gspread.utils import rowcol_to_a1
+
+from app.core.log import get_logger
+
+log = get_logger(__name__)
+
+
+class WriteBuffer:
+    """
+    Acumula ediciones pendientes por worksheet.
+
+    - Por defecto se envían al terminar la operación lógica más externa
+      (un batch_update por hoja en lugar de un update_cell por celda).
+    - Las ediciones de una operación son propias del hilo que la ejecuta: recién al
+      terminar sin errores pasan a la cola compartida; si la operación falla se descartan.
+    - Con `flush_interval > 0` las ediciones se mantienen entre requests y se
+      envían cuando pasa ese tiempo o cuando se acumulan `max_pending` celdas.
+    """
+
+    def __init__(self, flush_interval: float = 0, max_pending: int = 100):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple, Tuple[Any, Dict[str, List[List[str]]]]] = {}
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._timer = None
+
+    @property
+    def pending(self) -> int:
+        """Número de rangos pendientes de enviar"""
+        with self._lock:
+            return sum(len(ediciones) for _, ediciones in self._pending.values())
+
+    def add_cell(self, worksheet, row: int, col: int, value) -> None:
+        """Encola la edición de una celda (índices base 1, como gspread)"""
+        self.add_range(worksheet, rowcol_to_a1(row, col), [[value]])
+
+    def add_range(self, worksheet, a1_range: str, values: List[List[Any]]) -> None:
+        """Encola la edición de un rango A1; una edición posterior del mismo rango reemplaza a la anterior"""
+        valores = [[str(v) if v is not None else "" for v in fila] for fila in values]
+        operaciones = self._operaciones()
+        if operaciones:
+            # Dentro de una operación: queda en el hilo hasta que la operación termine bien
+            _, ediciones = operaciones[-1].setdefault(self._clave(worksheet), (worksheet, {}))
+            ediciones[a1_range] = valores
+            return
+        # Edición fuera de una operación: se comporta como escritura directa
+        self._after_operation(self._encolar({self._clave(worksheet): (worksheet, {a1_range: valores})}))
+
+    def _operaciones(self) -> List[Dict]:
+        """Pila de operaciones abiertas en este hilo (una dict de ediciones por nivel)"""
+        if not hasattr(self._local, 'operaciones'):
+            self._local.operaciones = []
+        return self._local.operaciones
+
+    def _encolar(self, pendientes: Dict) -> int:
+        """Pasa ediciones a la cola compartida; retorna el total pendiente"""
+        with self._lock:
+            for clave, (worksheet, ediciones) in pendientes.items():
+                _, actuales = self._pending.setdefault(clave, (worksheet, {}))
+                actuales.update(ediciones)
+            return self.pending
+
+    @staticmethod
+    def _clave(worksheet) -> Tuple:
+        # gspread crea un objeto Worksheet nuevo en cada spreadsheet.worksheet(), agrupar por ids
+        spreadsheet_id = getattr(worksheet, 'spreadsheet_id', None) or getattr(getattr(worksheet, 'spreadsheet', None), 'id', None)
+        return (spreadsheet_id, getattr(worksheet, 'id', None) or id(worksheet))
+
+    @contextmanager
+    def operation(self):
+        """
+        Agrupa las ediciones de una operación lógica; se envían al salir de la más externa.
+        Si la operación lanza una excepción sus ediciones se descartan (no se envían a medias)
+        """
+        operaciones = self._operaciones()
+        operaciones.append({})
+        try:
+            yield self
+        except BaseException:
+            operaciones.pop()
+            raise
+        propias = operaciones.pop()
+        if operaciones:
+            # Operación anidada: sus ediciones pasan a la que la contiene
+            for clave, (worksheet, ediciones) in propias.items():
+                _, actuales = operaciones[-1].setdefault(clave, (worksheet, {}))
+                actuales.update(ediciones)
+            return
+        if propias:
+            self._after_operation(self._encolar(propias))
+
+    def _after_operation(self, total: int) -> None:
+        if total == 0:
+            return
+        if self.flush_interval <= 0 or total >= self.max_pending:
+            self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            log.exception("Error enviando escrituras pendientes a Google Sheets: %s", e)
+
+    def flush(self) -> int:
+        """Envía todas las ediciones pendientes (un batch_update por hoja). Retorna el número de llamadas"""
+        with self._lock:
+            pendientes, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        llamadas = 0
+        for indice, (worksheet, ediciones) in enumerate(pendientes.values()):
+            data = [{'range': a1, 'values': values} for a1, values in ediciones.items()]
+            try:
+                worksheet.batch_update(data, value_input_option='USER_ENTERED')
+                llamadas += 1
+            except Exception:
+                if self.flush_interval > 0:
+                    # En modo diferido, reencolar lo que no se pudo enviar para no perder ediciones
+                    with self._lock:
+                        for ws, eds in list(pendientes.values())[indice:]:
+                            _, actuales = self._pending.setdefault(self._clave(ws), (ws, {}))
+                            for a1, values in eds.items():
+                                actuales.setdefault(a1, values)
+                raise
+        return llamadas
@@ -0,0 +1,56 @@
+"""
+Coalescencia de llamadas concurrentes ("single flight")
+Si varias llamadas piden la misma clave a la vez, solo la primera ejecuta la
+función; las demás esperan y reciben el mismo resultado (o la misma excepción)
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Vuelo:
+    __slots__ = ('evento', 'resultado', 'error')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class SingleFlight:
+    """Ejecuta como máximo una llamada en curso por clave"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vuelos: Dict[Hashable, _Vuelo] = {}
+        self.coalescidas = 0  # Llamadas que reutilizaron el resultado de otra
+
+    def do(self, clave: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            vuelo.evento.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+
+        try:
+            vuelo.resultado = func()
+            return vuelo.resultado
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                self._vuelos.pop(clave, None)
+            vuelo.evento.set()
+
+    def en_curso(self) -> int:
+        """Número de claves con una llamada en curso"""
+        with self._lock:
+            return len(self._vuelos)
@@ -3,22 +3,32 @@ Sistema de almacenamiento de archivos (PDFs)
 Soporta: Local (Hostinger), S3 (opcional)
 """
 import os
+import re
+import threading
 from pathlib import Path
 from typing import Optional, BinaryIO
 from datetime import datetime
 from app.core.config import settings
+from app.core.log import get_logger
+from app.core.metrics import storage_latencia
 import json
 
-# Importar boto3 solo si se necesita S3 (opcional)
-try:
-    import boto3
-    from botocore.exceptions import ClientError
-    BOTO3_AVAILABLE = True
-except ImportError:
-    BOTO3_AVAILABLE = False
-    # Crear una clase dummy para ClientError si no está disponible
-    class ClientError(Exception):
-        pass
+log = get_logger(__name__)
+
+
+class ClientError(Exception):
+    """Reemplazada por botocore.exceptions.ClientError cuando se configura S3"""
+
+
+def _cargar_boto3():
+    """Importa boto3 solo si se usa S3 (opcional, y pesado: no se carga en el arranque del worker)"""
+    global ClientError
+    try:
+        import boto3
+        from botocore.exceptions import ClientError
+    except ImportError:
+        raise Exception("boto3 no está instalado. Para usar S3, instala: pip install boto3")
+    return boto3
 
 
 class StorageService:
@@ -31,8 +41,7 @@ class StorageService:
     def _init_storage(self):
         """Inicializa el servicio de almacenamiento según la configuración"""
         if self.storage_type == 's3':
-            if not BOTO3_AVAILABLE:
-                raise Exception("boto3 no está instalado. Para usar S3, instala: pip install boto3")
+            boto3 = _cargar_boto3()
             try:
                 self.s3_client = boto3.client(
                     's3',
@@ -55,15 +64,19 @@ class StorageService:
             
             # Asegurar que la carpeta exista
             self.storage_path.mkdir(parents=True, exist_ok=True)
-            print(f"DEBUG StorageService: Ruta de almacenamiento configurada: {self.storage_path}")
-            print(f"DEBUG StorageService: Ruta absoluta: {self.storage_path.resolve()}")
+            log.debug("Ruta de almacenamiento configurada: %s", self.storage_path)
             
             self.base_url = os.getenv('BASE_STORAGE_URL', f"{settings.BASE_URL}/uploads/certificados")
     
-    def save_pdf(self, file_content: bytes, filename: str, codigo: str) -> dict:
+    def save_pdf(self, file_content: bytes, filename: str, codigo: str, huella: Optional[str] = None) -> dict:
         """
         Guarda un PDF y retorna la información de almacenamiento
         
+        Args:
+            huella: Huella de los datos del PDF (pdf_datos.huella_pdf). Si se indica, el archivo
+                se guarda con ese nombre en lugar de codigo_timestamp: volver a generarlo
+                reemplaza el mismo archivo y find_pdf_by_huella lo encuentra sin generarlo
+        
         Returns:
             dict con 'path' y 'url'
         """
@@ -72,12 +85,80 @@ class StorageService:
         year = now.strftime('%Y')
         month = now.strftime('%m')
         
+        with storage_latencia.time(operacion='save', backend=self.storage_type):
+            if huella:
+                return self._save_by_huella(file_content, huella)
+            if self.storage_type == 's3':
+                return self._save_to_s3(file_content, filename, codigo, year, month)
+            elif self.storage_type == 'local':
+                return self._save_to_local(file_content, filename, codigo, year, month)
+            else:
+                raise ValueError(f"Tipo de almacenamiento no soportado: {self.storage_type}")
+    
+    def find_local_pdf(self, url: str) -> Optional[Path]:
+        """Ruta del PDF guardado localmente al que apunta `url` (None si no existe o no es local)"""
+        if self.storage_type != 'local' or '/uploads/certificados/' not in (url or ''):
+            return None
+        with storage_latencia.time(operacion='read', backend=self.storage_type):
+            relative_path = url.split('/uploads/certificados/')[-1]
+            file_path = self.storage_path / relative_path
+            return file_path if file_path.is_file() else None
+    
+    @staticmethod
+    def es_url_por_huella(url: str) -> bool:
+        """`url` apunta a un PDF guardado por huella (generado con los datos de ese momento)"""
+        return bool(re.search(r'/h/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$', url or ''))
+    
+    @staticmethod
+    def _relative_path_huella(huella: str) -> str:
+        # Subcarpeta por los dos primeros caracteres para no acumular miles de archivos en una
+        return f"h/{huella[:2]}/{huella}.pdf"
+    
+    def find_pdf_by_huella(self, huella: str) -> Optional[dict]:
+        """PDF ya guardado con esta huella ('path', 'url', 'relative_path'), o None"""
+        relative_path = self._relative_path_huella(huella)
+        with storage_latencia.time(operacion='lookup', backend=self.storage_type):
+            if self.storage_type == 'local':
+                file_path = self.storage_path / relative_path
+                if not file_path.is_file():
+                    return None
+                return {'path': str(file_path.resolve()), 'url': f"{self.base_url}/{relative_path}", 'relative_path': relative_path}
+            if self.storage_type == 's3':
+                s3_key = f"certificados/{relative_path}"
+                try:
+                    self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+                except ClientError:
+                    return None
+                return {'path': s3_key, 'url': f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}", 'relative_path': s3_key}
+            return None
+    
+    def _save_by_huella(self, file_content: bytes, huella: str) -> dict:
+        """Guarda un PDF con nombre por huella (reemplaza de forma atómica si ya existía)"""
+        relative_path = self._relative_path_huella(huella)
         if self.storage_type == 's3':
-            return self._save_to_s3(file_content, filename, codigo, year, month)
-        elif self.storage_type == 'local':
-            return self._save_to_local(file_content, filename, codigo, year, month)
-        else:
+            s3_key = f"certificados/{relative_path}"
+            try:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Body=file_content,
+                    ContentType='application/pdf',
+                    ACL='public-read'
+                )
+            except ClientError as e:
+                raise Exception(f"Error subiendo archivo a S3: {str(e)}")
+            return {'path': s3_key, 'url': f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}", 'relative_path': s3_key}
+        if self.storage_type != 'local':
             raise ValueError(f"Tipo de almacenamiento no soportado: {self.storage_type}")
+        file_path = self.storage_path / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        # Escribir a un temporal y renombrar: quien lo lea en paralelo nunca ve un PDF a medias
+        temporal = file_path.with_name(f"{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporal, 'wb') as f:
+            f.write(file_content)
+        os.replace(temporal, file_path)
+        log.debug("PDF guardado por huella en: %s (%d bytes)", file_path, len(file_content))
+        return {'path': str(file_path.resolve()), 'url': f"{self.base_url}/{relative_path}", 'relative_path': relative_path}
     
     def _save_to_local(self, file_content: bytes, filename: str, codigo: str, year: str, month: str) -> dict:
         """Guarda PDF en almacenamiento local"""
@@ -90,11 +171,11 @@ class StorageService:
         file_path = folder / safe_filename
         
         # Guardar archivo
-        print(f"DEBUG StorageService: Guardando PDF en: {file_path.resolve()}")
+        log.debug("Guardando PDF en: %s", file_path)
         with open(file_path, 'wb') as f:
             f.write(file_content)
         
-        print(f"DEBUG StorageService: PDF guardado exitosamente en: {file_path.resolve()}")
+        log.debug("PDF guardado en: %s (%d bytes)", file_path, len(file_content))
         
         # Generar URL pública
         relative_path = f"{year}/{month}/{safe_filename}"
@@ -135,6 +216,10 @@ class StorageService:
     
     def delete_pdf(self, path_or_url: str) -> bool:
         """Elimina un PDF"""
+        with storage_latencia.time(operacion='delete', backend=self.storage_type):
+            return self._delete_pdf(path_or_url)
+    
+    def _delete_pdf(self, path_or_url: str) -> bool:
         if self.storage_type == 's3':
             # Extraer key de la URL o usar path directamente
             if path_or_url.startswith('http'):
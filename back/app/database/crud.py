@@ -0,0 +1,156 @@
+"""
+Operaciones CRUD sobre la base de datos
+Cada función recibe la sesión; el commit lo hace quien la llama (ver session_scope),
+salvo create_usuario, que usan directamente los scripts de database/
+"""
+import hashlib
+import hmac
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database.models import Certificado, Cliente, ExportacionSheets, Usuario
+
+
+# ---- Usuarios ----
+
+def hash_password(password: str) -> str:
+    """Hash PBKDF2-SHA256 con sal aleatoria: 'pbkdf2_sha256$iteraciones$sal$hash'"""
+    iteraciones = 260000
+    sal = os.urandom(16).hex()
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), sal.encode('utf-8'), iteraciones)
+    return f"pbkdf2_sha256${iteraciones}${sal}${digest.hex()}"
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    try:
+        _, iteraciones, sal, esperado = password_hash.split('$')
+    except ValueError:
+        return False
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), sal.encode('utf-8'), int(iteraciones))
+    return hmac.compare_digest(digest.hex(), esperado)
+
+
+def get_usuario_by_email(db: Session, email: str) -> Optional[Usuario]:
+    return db.scalar(select(Usuario).where(Usuario.email == email))
+
+
+def create_usuario(db: Session, email: str, password: str, role: str = 'operador') -> Usuario:
+    usuario = Usuario(email=email, password_hash=hash_password(password), role=role, active=True)
+    db.add(usuario)
+    db.commit()
+    db.refresh(usuario)
+    return usuario
+
+
+# ---- Certificados ----
+
+def get_certificado_by_codigo(db: Session, codigo: str) -> Optional[Certificado]:
+    codigo = str(codigo).strip() if codigo else ''
+    if not codigo:
+        return None
+    # Coincidencia exacta por el índice (con collation *_ci / NOCASE ya ignora mayúsculas); si no,
+    # sin distinguir mayúsculas en cualquier collation, como la búsqueda en Google Sheets
+    certificado = db.scalar(select(Certificado).where(Certificado.codigo == codigo))
+    if certificado is None:
+        certificado = db.scalar(select(Certificado).where(func.lower(Certificado.codigo) == codigo.lower()))
+    return certificado
+
+
+def list_certificados(db: Session) -> List[Certificado]:
+    return list(db.scalars(select(Certificado).order_by(Certificado.id)))
+
+
+def create_certificado(db: Session, valores: Dict, extra: Optional[Dict] = None) -> Certificado:
+    """Crea un certificado a partir de los campos lógicos de CERTIFICADOS QR (ver valores_alta_certificado)"""
+    campos = {
+        campo: (str(valor) if valor not in (None, '') else None)
+        for campo, valor in valores.items()
+        if hasattr(Certificado, campo)
+    }
+    campos['codigo'] = str(valores['codigo']).strip()
+    certificado = Certificado(**campos, extra=extra or None)
+    if certificado.dni:
+        certificado.cliente = get_cliente_by_dni(db, certificado.dni)
+    db.add(certificado)
+    db.flush()
+    return certificado
+
+
+def set_certificado_extra(certificado: Certificado, campo: str, valor) -> None:
+    """Guarda un campo sin columna propia (JSON: se reasigna para que SQLAlchemy detecte el cambio)"""
+    certificado.extra = {**(certificado.extra or {}), campo: valor}
+
+
+# ---- Clientes ----
+
+def normalizar_dni(dni) -> str:
+    """DNI sin guiones, puntos ni espacios (como se compara en la hoja CLIENTES)"""
+    return str(dni).replace('-', '').replace('.', '').replace(' ', '').strip() if dni else ''
+
+
+def get_cliente_by_dni(db: Session, dni: str) -> Optional[Cliente]:
+    dni = normalizar_dni(dni)
+    if not dni:
+        return None
+    return db.scalar(select(Cliente).where(Cliente.dni == dni))
+
+
+def list_clientes(db: Session) -> List[Cliente]:
+    return list(db.scalars(select(Cliente).order_by(Cliente.id)))
+
+
+def create_cliente(db: Session, dni: Optional[str], nombre_completo: str, email: Optional[str] = None,
+                   telefono: Optional[str] = None, extra: Optional[Dict] = None) -> Cliente:
+    partes = (nombre_completo or '').strip().split(' ', 1)
+    cliente = Cliente(
+        dni=normalizar_dni(dni) or None,
+        nombre_completo=(nombre_completo or '').strip(),
+        nombres=partes[0],
+        apellidos=partes[1] if len(partes) > 1 else '',
+        email=email or None,
+        telefono=telefono or None,
+        extra=extra or None,
+    )
+    db.add(cliente)
+    db.flush()
+    return cliente
+
+
+def delete_cliente(db: Session, cliente: Cliente) -> None:
+    db.delete(cliente)
+    db.flush()
+
+
+# ---- Exportación a Google Sheets ----
+
+def encolar_exportacion(db: Session, entidad: str, clave: str, operacion: str, datos: Optional[Dict] = None) -> None:
+    """Registra un cambio para copiarlo a Google Sheets (en la transacción de quien llama)"""
+    db.add(ExportacionSheets(entidad=entidad, clave=str(clave), operacion=operacion, datos=datos))
+
+
+def exportaciones_pendientes(db: Session, limite: int = 50) -> List[ExportacionSheets]:
+    return list(db.scalars(select(ExportacionSheets).order_by(ExportacionSheets.id).limit(limite)))
+
+
+def contar_exportaciones_pendientes(db: Session) -> int:
+    return db.query(ExportacionSheets).count()
+
+
+def reclamar_exportacion(db: Session, exportacion_id: int, vencimiento: timedelta) -> bool:
+    """
+    Marca una exportación como tomada por este worker. False si otro worker la tiene
+    (un reclamo más antiguo que `vencimiento` se considera abandonado)
+    """
+    ahora = datetime.now()
+    resultado = db.execute(
+        update(ExportacionSheets)
+        .where(ExportacionSheets.id == exportacion_id)
+        .where(or_(ExportacionSheets.reclamada_en.is_(None), ExportacionSheets.reclamada_en < ahora - vencimiento))
+        .values(reclamada_en=ahora)
+    )
+    db.commit()
+    return resultado.rowcount == 1
@@ -0,0 +1,50 @@
+"""
+Conexión a la base de datos con SQLAlchemy
+SQLite en local (cenprod_local.db) y MySQL en producción (Hostinger), según DATABASE_URL
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.core.config import settings, ROOT
+
+
+# Sin DATABASE_URL se usa la base local de desarrollo (la misma que crea database/setup_local.py)
+DATABASE_URL = settings.DATABASE_URL or f"sqlite:///{ROOT / 'cenprod_local.db'}"
+
+
+def _opciones_engine(url: str) -> dict:
+    if url.startswith('sqlite'):
+        # Las sesiones se usan desde el pool de hilos de los routers async
+        return {'connect_args': {'check_same_thread': False}}
+    # MySQL cierra las conexiones inactivas: verificar antes de usar y reciclar antes del wait_timeout
+    return {'pool_pre_ping': True, 'pool_recycle': 280, 'pool_size': 5, 'max_overflow': 10}
+
+
+engine = create_engine(DATABASE_URL, echo=False, **_opciones_engine(DATABASE_URL))
+SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+Base = declarative_base()
+
+
+def get_db():
+    """Sesión por request (para usar con Depends)"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def session_scope():
+    """Sesión con commit al terminar el bloque (o rollback si hubo un error)"""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,131 @@
+"""
+Modelos SQLAlchemy (ver database/schema.sql para crear las tablas a mano en MySQL)
+Los certificados y clientes guardan los mismos campos que CERTIFICADOS QR y CLIENTES;
+las columnas del Sheet que no tienen columna propia van en `extra`
+"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, JSON, String, Text, func
+from sqlalchemy.orm import relationship
+
+from app.database.database import Base
+from app.core.sheets_schema import HEADERS_BASICOS_CERTIFICADOS_QR
+
+
+def _texto_ci(longitud: int):
+    """String comparado sin distinguir mayúsculas (en MySQL ya lo hace la collation *_ci)"""
+    return String(longitud).with_variant(String(longitud, collation='NOCASE'), 'sqlite')
+
+
+# Headers de la hoja CLIENTES: columna del modelo -> header
+HEADERS_CLIENTES = {
+    'dni': 'DNI DEL CLIENTE',
+    'nombre_completo': 'NOMBRE COMPLETO DEL CLIENTE',
+    'telefono': 'CELULAR DEL CLIENTE',
+    'email': 'CORREO DEL CLIENTE',
+}
+
+
+class Cliente(Base):
+    __tablename__ = 'clientes'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nombres = Column(String(255), nullable=False, default='')
+    apellidos = Column(String(255), nullable=False, default='')
+    nombre_completo = Column(String(255), nullable=False, default='')
+    dni = Column(_texto_ci(20), unique=True, index=True)
+    email = Column(String(255))
+    telefono = Column(String(20))
+    extra = Column(JSON)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    certificados = relationship('Certificado', back_populates='cliente')
+
+    def registro(self) -> dict:
+        """Cliente con los headers de la hoja CLIENTES (el formato que devuelve Google Sheets)"""
+        registro = {header: getattr(self, columna) or '' for columna, header in HEADERS_CLIENTES.items()}
+        registro.update(self.extra or {})
+        return registro
+
+
+class Certificado(Base):
+    __tablename__ = 'certificados'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    codigo = Column(_texto_ci(100), unique=True, nullable=False, index=True)
+    cliente_id = Column(Integer, ForeignKey('clientes.id', ondelete='SET NULL'), index=True)
+    dni = Column(_texto_ci(20), index=True)
+    nombre_completo = Column(String(255))
+    celular = Column(String(20))
+    correo = Column(String(255))
+    curso = Column(String(255))
+    # Texto tal como se escribe en el Sheet (no siempre es una fecha ISO)
+    fecha_emision = Column(String(50))
+    horas = Column(String(20))
+    estado = Column(String(20), default='VALIDO', index=True)
+    motivo_anulacion = Column(Text)
+    pdf_path = Column(String(500))
+    pdf_url = Column(String(500))
+    firma_url = Column(String(500))
+    logo_url = Column(String(500))
+    # Mención
+    nro = Column(String(20))
+    especialidad = Column(String(255))
+    p_certificado = Column(String(255))
+    mencion = Column(Text)
+    f_inicio = Column(String(50))
+    f_termino = Column(String(50))
+    extra = Column(JSON)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    cliente = relationship('Cliente', back_populates='certificados')
+    menciones = relationship('Mencion', back_populates='certificado', cascade='all, delete-orphan')
+
+    def registro(self) -> dict:
+        """Certificado con los headers de CERTIFICADOS QR (el formato de una fila del Sheet)"""
+        registro = {header: getattr(self, campo) or '' for campo, header in HEADERS_BASICOS_CERTIFICADOS_QR.items()}
+        registro.update(self.extra or {})
+        return registro
+
+
+class Mencion(Base):
+    __tablename__ = 'menciones'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    certificado_id = Column(Integer, ForeignKey('certificados.id', ondelete='CASCADE'), nullable=False, index=True)
+    mencion = Column(String(255), nullable=False)
+    descripcion = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+
+    certificado = relationship('Certificado', back_populates='menciones')
+
+
+class Usuario(Base):
+    __tablename__ = 'usuarios'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    email = Column(String(255), unique=True, nullable=False, index=True)
+    password_hash = Column(String(255), nullable=False)
+    role = Column(String(20), default='operador')
+    active = Column(Boolean, default=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class ExportacionSheets(Base):
+    """
+    Cambio pendiente de copiar a Google Sheets (outbox). Se inserta en la misma
+    transacción que el cambio y el exportador lo aplica en orden de id
+    """
+    __tablename__ = 'exportaciones_sheets'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entidad = Column(String(20), nullable=False)  # 'certificado' o 'cliente'
+    clave = Column(String(100), nullable=False)  # código o DNI
+    operacion = Column(String(30), nullable=False)
+    datos = Column(JSON)
+    intentos = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    # Momento en que un worker la tomó (evita que dos workers la exporten a la vez)
+    reclamada_en = Column(DateTime)
+    created_at = Column(DateTime, server_default=func.now())
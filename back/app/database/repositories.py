@@ -0,0 +1,194 @@
+"""
+Repositorios SQLAlchemy de certificados y clientes
+Leen y escriben solo en la base de datos; cada escritura registra en la misma transacción
+el cambio que el exportador copiará después a Google Sheets
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.log import get_logger
+from app.core.repositories import CertificateRepository, ClienteRepository
+from app.core.sheets_schema import CAMPO_ALTA_POR_HEADER, mapear_certificado_qr, mapear_listado_qr, valores_alta_certificado
+from app.database import crud
+from app.database.database import Base, engine, session_scope
+from app.database.models import Certificado, Cliente
+
+log = get_logger(__name__)
+
+
+# Columnas de un certificado que se pueden editar (el resto de los campos va a `extra`)
+COLUMNAS_EDITABLES_CERTIFICADO = {
+    'dni', 'nombre_completo', 'celular', 'correo', 'curso', 'fecha_emision', 'horas', 'estado',
+    'motivo_anulacion', 'pdf_url', 'firma_url', 'logo_url', 'nro', 'especialidad', 'p_certificado',
+    'mencion', 'f_inicio', 'f_termino',
+}
+
+
+def _texto(valor) -> Optional[str]:
+    return str(valor).strip() if valor not in (None, '') else None
+
+
+def _asignar_certificado(certificado: Certificado, campo: str, valor) -> None:
+    """Asigna un campo a su columna o, si no tiene, a `extra`"""
+    if campo in COLUMNAS_EDITABLES_CERTIFICADO:
+        setattr(certificado, campo, _texto(valor))
+    else:
+        crud.set_certificado_extra(certificado, campo, str(valor) if valor is not None else '')
+
+
+class SQLCertificateRepository(CertificateRepository):
+    """Certificados en la tabla `certificados`"""
+
+    def __init__(self):
+        # Crea las tablas que falten (no modifica las existentes)
+        Base.metadata.create_all(bind=engine)
+
+    def get_by_code(self, codigo: str) -> Optional[Dict]:
+        with session_scope() as db:
+            certificado = crud.get_certificado_by_codigo(db, codigo)
+            return mapear_certificado_qr(certificado.registro()) if certificado else None
+
+    def list_all(self) -> List[Dict]:
+        with session_scope() as db:
+            return [mapear_listado_qr(c.registro()) for c in crud.list_certificados(db)]
+
+    def create(self, data: Dict, mencion_data: Optional[Dict] = None) -> Dict:
+        valores = valores_alta_certificado(data, mencion_data)
+        codigo = str(valores['codigo']).strip() if valores['codigo'] else ''
+        if not codigo:
+            raise ValueError("El código del certificado es requerido")
+        try:
+            with session_scope() as db:
+                if crud.get_certificado_by_codigo(db, codigo):
+                    raise ValueError(f"El código {codigo} ya existe")
+                certificado = crud.create_certificado(db, valores)
+                crud.encolar_exportacion(db, 'certificado', codigo, 'crear', {'data': data, 'mencion_data': mencion_data})
+                registro = certificado.registro()
+        except IntegrityError:
+            # Alta simultánea del mismo código
+            raise ValueError(f"El código {codigo} ya existe")
+        return mapear_certificado_qr(registro)
+
+    def update(self, codigo: str, data: Dict) -> Dict:
+        with session_scope() as db:
+            certificado = crud.get_certificado_by_codigo(db, codigo)
+            if not certificado:
+                raise ValueError(f"Certificado con código {codigo} no encontrado")
+
+            # nombres/apellidos se guardan juntos en nombre_completo
+            if 'nombres' in data or 'apellidos' in data:
+                partes = (certificado.nombre_completo or '').split(' ', 1)
+                nombres = data.get('nombres', partes[0])
+                apellidos = data.get('apellidos', partes[1] if len(partes) > 1 else '')
+                certificado.nombre_completo = f"{nombres or ''} {apellidos or ''}".strip()
+            for campo, valor in data.items():
+                if campo not in ('nombres', 'apellidos', 'updated_at'):
+                    _asignar_certificado(certificado, campo, valor)
+
+            crud.encolar_exportacion(db, 'certificado', certificado.codigo, 'actualizar', {'data': data})
+            registro = certificado.registro()
+        return mapear_certificado_qr(registro)
+
+    def update_pdf_url(self, codigo: str, pdf_url: str) -> bool:
+        with session_scope() as db:
+            certificado = crud.get_certificado_by_codigo(db, codigo)
+            if not certificado:
+                log.warning("Certificado con codigo=%s no encontrado en la base de datos", codigo)
+                return False
+            certificado.pdf_url = pdf_url
+            crud.encolar_exportacion(db, 'certificado', certificado.codigo, 'pdf_url', {'pdf_url': pdf_url})
+        return True
+
+    def update_fields(self, codigo: str, fields: Dict) -> bool:
+        with session_scope() as db:
+            certificado = crud.get_certificado_by_codigo(db, codigo)
+            if not certificado:
+                log.warning("Certificado con codigo=%s no encontrado en la base de datos", codigo)
+                return False
+            for campo, valor in fields.items():
+                # Headers del Sheet (PDF_URL, ESTADO...) a su campo; los demás quedan con su nombre
+                _asignar_certificado(certificado, CAMPO_ALTA_POR_HEADER.get(str(campo).upper().strip(), campo), valor)
+            crud.encolar_exportacion(db, 'certificado', certificado.codigo, 'campos', {'fields': fields})
+        return True
+
+
+# Headers de CLIENTES con columna propia y los nombres alternativos que aceptan los routers
+_CAMPOS_CLIENTE = {
+    'nombre_completo': ['NOMBRE COMPLETO DEL CLIENTE', 'nombreCompleto', 'NOMBRE_COMPLETO'],
+    'telefono': ['CELULAR DEL CLIENTE', 'telefono', 'TELEFONO', 'CELULAR'],
+    'email': ['CORREO DEL CLIENTE', 'email', 'EMAIL', 'CORREO'],
+}
+_CLAVES_DNI = ['DNI DEL CLIENTE', 'DNI', 'dni']
+_CLAVES_CONOCIDAS = {clave for claves in _CAMPOS_CLIENTE.values() for clave in claves} | set(_CLAVES_DNI) | {
+    'nombres', 'NOMBRES', 'apellidos', 'APELLIDOS',
+}
+
+
+def _valor(data: Dict, claves: List[str]):
+    return next((data[c] for c in claves if data.get(c)), None)
+
+
+class SQLClienteRepository(ClienteRepository):
+    """Clientes en la tabla `clientes`"""
+
+    def list_all(self) -> List[Dict]:
+        with session_scope() as db:
+            return [c.registro() for c in crud.list_clientes(db)]
+
+    def get_by_dni(self, dni: str) -> Optional[Dict]:
+        with session_scope() as db:
+            cliente = crud.get_cliente_by_dni(db, dni)
+            return cliente.registro() if cliente else None
+
+    def create(self, data: Dict) -> Dict:
+        dni = _valor(data, _CLAVES_DNI)
+        nombre_completo = _valor(data, _CAMPOS_CLIENTE['nombre_completo'])
+        if not nombre_completo:
+            nombres = data.get('nombres', '') or data.get('NOMBRES', '')
+            apellidos = data.get('apellidos', '') or data.get('APELLIDOS', '')
+            nombre_completo = f"{nombres} {apellidos}".strip()
+        extra = {k: str(v) for k, v in data.items() if k not in _CLAVES_CONOCIDAS and v not in (None, '')}
+        try:
+            with session_scope() as db:
+                if dni and crud.get_cliente_by_dni(db, str(dni)):
+                    raise ValueError(f"El cliente con DNI {dni} ya existe")
+                cliente = crud.create_cliente(
+                    db,
+                    dni=str(dni) if dni else None,
+                    nombre_completo=str(nombre_completo),
+                    email=_texto(_valor(data, _CAMPOS_CLIENTE['email'])),
+                    telefono=_texto(_valor(data, _CAMPOS_CLIENTE['telefono'])),
+                    extra=extra,
+                )
+                crud.encolar_exportacion(db, 'cliente', cliente.dni or '', 'crear', {'data': data})
+                return cliente.registro()
+        except IntegrityError:
+            raise ValueError(f"El cliente con DNI {dni} ya existe")
+
+    def update(self, dni: str, data: Dict) -> Dict:
+        with session_scope() as db:
+            cliente = crud.get_cliente_by_dni(db, dni)
+            if not cliente:
+                raise ValueError(f"Cliente con DNI {dni} no encontrado")
+            for columna, claves in _CAMPOS_CLIENTE.items():
+                valor = _texto(_valor(data, claves))
+                if valor:
+                    setattr(cliente, columna, valor)
+            if _texto(_valor(data, _CAMPOS_CLIENTE['nombre_completo'])):
+                partes = cliente.nombre_completo.split(' ', 1)
+                cliente.nombres, cliente.apellidos = partes[0], partes[1] if len(partes) > 1 else ''
+            otros = {k: str(v).strip() for k, v in data.items() if k not in _CLAVES_CONOCIDAS and v}
+            if otros:
+                cliente.extra = {**(cliente.extra or {}), **otros}
+            crud.encolar_exportacion(db, 'cliente', cliente.dni, 'actualizar', {'data': data})
+            return cliente.registro()
+
+    def delete(self, dni: str) -> bool:
+        with session_scope() as db:
+            cliente = crud.get_cliente_by_dni(db, dni)
+            if not cliente:
+                return False
+            crud.encolar_exportacion(db, 'cliente', cliente.dni, 'eliminar')
+            crud.delete_cliente(db, cliente)
+        return True
@@ -1,16 +1,29 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
+import logging
 import os
+import secrets
+import time
 
-from app.routers import public, admin, auth
+from app.core.arranque import arranque
 from app.core.config import settings
+from app.core.log import get_logger, log_evento
+from app.core.metrics import http_latencia, metrics
+
+# Routers (cada importación se mide en el reporte de arranque; el stack de PDFs se carga al primer uso)
+auth = arranque.importar('app.routers.auth')
+public = arranque.importar('app.routers.public')
+admin = arranque.importar('app.routers.admin')
+compras = arranque.importar('app.routers.compras')
+clientes = arranque.importar('app.routers.clientes')
 
 limiter = Limiter(key_func=get_remote_address)
+log = get_logger('app.requests')
 
 # Validar SECRET_KEY en producción
 if os.getenv('ENVIRONMENT', 'development') == 'production':
@@ -57,10 +70,59 @@ app.add_middleware(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+def _plantilla_ruta(scope) -> str:
+    """Plantilla de la ruta (/api/public/certificados/{codigo}), no la URL: etiquetas de métricas acotadas"""
+    route = scope.get('route')
+    if route is None:
+        return 'sin_ruta'
+    # La ruta de un router incluido no lleva el prefijo: se toma de la URL
+    path = scope.get('path', '')
+    try:
+        sufijo = route.path_format.format(**scope.get('path_params', {}))
+    except (AttributeError, KeyError, IndexError, ValueError):
+        return getattr(route, 'path', 'sin_ruta')
+    prefijo = path[:-len(sufijo)] if sufijo and path.endswith(sufijo) else ''
+    return prefijo + route.path
+
+
+def _server_timing(evento) -> str:
+    """Header Server-Timing con los tramos del request (sheets, pdf, qr, storage, get_by_code...)"""
+    partes = [
+        f"{campo[:-3]};dur={valor}"
+        for campo, valor in evento.items()
+        if campo.endswith('_ms') and campo != 'duracion_ms'
+    ]
+    partes.append(f"total;dur={evento['duracion_ms']}")
+    return ", ".join(partes)
+
+
 # Middleware para agregar headers de seguridad
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
+    # Evento estructurado del request: el código de app/core y app/routers le suma contadores
+    inicio = time.perf_counter()
+    token = log_evento.iniciar(metodo=request.method, ruta=request.url.path)
+    status_code = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        segundos = time.perf_counter() - inicio
+        ruta = _plantilla_ruta(request.scope)
+        http_latencia.observe(segundos, metodo=request.method, ruta=ruta, status=status_code)
+        evento = log_evento.terminar(token)
+        evento['status'] = status_code
+        evento['duracion_ms'] = round(segundos * 1000, 1)
+        for campo, valor in evento.items():
+            if isinstance(valor, float):
+                evento[campo] = round(valor, 1)
+        if settings.SLOW_REQUEST_MS > 0 and evento['duracion_ms'] >= settings.SLOW_REQUEST_MS:
+            log_evento.emitir(log, 'request_lento', evento, logging.WARNING)
+        else:
+            log_evento.emitir(log, 'request', evento)
+        if response is not None:
+            response.headers["Server-Timing"] = _server_timing(evento)
     # Headers de seguridad
     response.headers["X-Content-Type-Options"] = "nosniff"
 
@@ -104,16 +166,39 @@ async def global_exception_handler(request: Request, exc: Exception):
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(public.router, prefix="/api/public", tags=["public"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
-
-# Importar router de compras
-from app.routers import compras
 app.include_router(compras.router, prefix="/api/admin", tags=["compras"])
-
-# Importar router de clientes
-from app.routers import clientes
 app.include_router(clientes.router, prefix="/api/admin", tags=["clientes"])
 
 
+@app.on_event("startup")
+async def start_sheets_refresher():
+    """Inicia el calentamiento y el refresco en segundo plano de Google Sheets y la exportación de la base de datos"""
+    from app.core.sheets_refresher import sheets_refresher
+    from app.core.sheets_exporter import sheets_exporter
+    from app.core.sheets_warmup import sheets_warmup
+    arranque.terminar()
+    sheets_warmup.start()
+    sheets_refresher.start()
+    sheets_exporter.start()
+
+
+@app.on_event("shutdown")
+async def flush_sheets_writes():
+    """Envía a Google Sheets las escrituras que sigan pendientes al apagar el worker"""
+    from app.core.google_sheets import sheets_service
+    from app.core.sheets_async import async_sheets
+    from app.core.sheets_refresher import sheets_refresher
+    from app.core.sheets_exporter import sheets_exporter
+    from app.core.sheets_warmup import sheets_warmup
+    from app.core.pdf_engine import pdf_engine
+    await sheets_warmup.stop()
+    await sheets_refresher.stop()
+    await sheets_exporter.stop()
+    async_sheets.shutdown()
+    pdf_engine.shutdown()
+    sheets_service.flush_writes()
+
+
 @app.get("/")
 def root():
     return {"message": "Sistema de Certificados API", "version": "1.0.0"}
@@ -121,4 +206,29 @@ def root():
 
 @app.get("/health")
 def health():
+    """Liveness: el proceso responde (no depende de Google Sheets)"""
     return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """Readiness: conexión, spreadsheets y cachés de Google Sheets cargados (503 mientras calienta)"""
+    from app.core.sheets_warmup import sheets_warmup
+    estado = sheets_warmup.estado()
+    if not sheets_warmup.listo():
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "warming_up", **estado})
+    return {"status": "ready", **estado, "arranque": arranque.estado()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """
+    Métricas en formato Prometheus (si METRICS_TOKEN está configurado, requiere Authorization: Bearer).
+    En producción sin METRICS_TOKEN el endpoint no existe (404): no se exponen métricas sin autenticación
+    """
+    if not settings.METRICS_TOKEN:
+        if os.getenv('ENVIRONMENT', 'development') == 'production':
+            return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Not Found"})
+    elif not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "No autorizado"})
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
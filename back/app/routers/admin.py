@@ -6,14 +6,17 @@ from app.models.schemas import (
     CertificateCreate, CertificateUpdate, CertificateResponse,
     CertificateAnular, UserResponse
 )
-from app.core.google_sheets import sheets_service
+from app.core.sheets_async import async_sheets
+from app.core.repositories import async_certificados, async_clientes
 from app.core.security import get_operator_or_admin, get_admin_user, get_current_user
 from app.core.config import settings
-from app.core.qr_generator import generate_qr_code
+from app.core.log import get_logger
+from app.core.pdf_engine import pdf_engine
 from app.core.users import get_user, update_user_status
 from datetime import datetime
 
 router = APIRouter()
+log = get_logger(__name__)
 
 
 @router.post("/certificados", response_model=CertificateResponse)
@@ -35,7 +38,7 @@ async def create_certificate(
         mencion_text = ""
         
         if mencion_nro:
-            mencion_data = sheets_service.get_mencion_by_nro(mencion_nro)
+            mencion_data = await async_sheets.get_mencion_by_nro(mencion_nro)
             if mencion_data:
                 mencion_text = mencion_data.get('MENCIÓN', '')
                 # Si no se proporcionaron horas o curso, usar los de la mención
@@ -76,7 +79,7 @@ async def create_certificate(
         try:
             dni_value = certificado_dict.get("dni") or certificado_dict.get("DNI")
             if dni_value:
-                cliente = sheets_service.get_cliente_by_dni(str(dni_value))
+                cliente = await async_clientes.get_by_dni(str(dni_value))
                 if cliente:
                     # Nombre completo del cliente
                     nombre_cliente = (
@@ -107,27 +110,24 @@ async def create_certificate(
                         certificado_dict["email"] = str(correo_cliente).strip()
         except Exception as e:
             # No bloquear la creación si falla el enriquecimiento
-            print(f"ADVERTENCIA: No se pudo enriquecer datos del cliente desde CLIENTES: {str(e)}")
+            log.warning("No se pudo enriquecer datos del cliente desde CLIENTES: %s", e)
         
         try:
-            nuevo_certificado = sheets_service.create_certificate(certificado_dict, mencion_data=mencion_data)
+            nuevo_certificado = await async_certificados.create(certificado_dict, mencion_data=mencion_data)
         except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
             # Limpiar caracteres Unicode problemáticos del mensaje de error
             error_msg = str(e).encode('ascii', 'ignore').decode('ascii')
-            print(f"ERROR en create_certificate: {error_msg}")
-            print(f"Traceback: {error_trace.encode('ascii', 'ignore').decode('ascii')}")
+            log.exception("Error en create_certificate: %s", error_msg)
             raise HTTPException(status_code=500, detail=f"Error creando certificado en Google Sheets: {error_msg}")
         
         verify_url = f"{settings.BASE_URL}/consulta/{nuevo_certificado.get('codigo')}"
         
         # Actualizar PDF_URL en Google Sheets con la URL de verificación (la misma que usa el QR)
         try:
-            sheets_service.update_certificate_pdf_url(nuevo_certificado.get('codigo'), verify_url)
-            print(f"DEBUG: PDF_URL actualizado con URL de verificación: {verify_url}")
+            await async_certificados.update_pdf_url(nuevo_certificado.get('codigo'), verify_url)
+            log.debug("PDF_URL actualizado con URL de verificación: %s", verify_url)
         except Exception as e_update:
-            print(f"ADVERTENCIA: No se pudo actualizar PDF_URL en Sheets: {str(e_update)}")
+            log.warning("No se pudo actualizar PDF_URL en Sheets: %s", e_update)
         
         # Asegurar que nombres y apellidos tengan valores válidos
         nombres = nuevo_certificado.get("nombres") or ""
@@ -144,8 +144,6 @@ async def create_certificate(
                 else:
                     nombres = nombre_completo
         
-        print(f"DEBUG create_certificate response: codigo={nuevo_certificado.get('codigo')}, nombres={nombres}, apellidos={apellidos}")
-        
         # Convertir horas a string si es número
         horas_value = nuevo_certificado.get("horas")
         if horas_value is not None:
@@ -164,7 +162,6 @@ async def create_certificate(
                 pdf_url=nuevo_certificado.get("pdf_url") or None,
                 verify_url=verify_url
             )
-            print(f"DEBUG: CertificateResponse creado exitosamente")
             return response
         except Exception as e_response:
             # No exponer detalles del error al usuario
@@ -187,14 +184,13 @@ async def download_qr(
     current_user: dict = Depends(get_operator_or_admin)
 ):
     """Descarga el código QR de un certificado (Operador/Admin)"""
-    print(f"DEBUG: download_qr llamado con codigo={codigo}")
     try:
-        certificado = sheets_service.get_certificate_by_code(codigo)
+        certificado = await async_certificados.get_by_code(codigo)
         if not certificado:
-            print(f"DEBUG: Certificado no encontrado para codigo={codigo}")
             raise HTTPException(status_code=404, detail="Certificado no encontrado")
         
-        print(f"DEBUG: Generando QR para codigo={codigo}")
+        # qrcode y PIL se cargan recién al primer QR
+        from app.core.qr_generator import generate_qr_code
         qr_buffer = generate_qr_code(codigo, size=512)
         
         return StreamingResponse(
@@ -205,7 +201,7 @@ async def download_qr(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"DEBUG: Error generando QR: {str(e)}")
+        log.error("Error generando QR de %s: %s", codigo, e)
         raise HTTPException(status_code=500, detail=f"Error generando QR: {str(e)}")
 
 
@@ -217,7 +213,7 @@ async def anular_certificate(
 ):
     """Anula un certificado (Operador/Admin)"""
     try:
-        certificado_anulado = sheets_service.anular_certificate(codigo, data.motivo)
+        certificado_anulado = await async_certificados.anular(codigo, data.motivo)
         
         verify_url = f"{settings.BASE_URL}/consulta/{codigo}"
         
@@ -268,14 +264,12 @@ async def unir_pdfs(
         pdf_file.file.seek(0)
         
         # Obtener certificado
-        certificado = sheets_service.get_certificate_by_code(codigo)
+        certificado = await async_certificados.get_by_code(codigo)
         if not certificado:
             raise HTTPException(status_code=404, detail="Certificado no encontrado")
         
         # Generar PDF del certificado si no existe
-        from app.core.pdf_generator import generate_certificate_pdf
-        pdf_certificado_buffer = generate_certificate_pdf(certificado)
-        pdf_certificado_buffer.seek(0)
+        pdf_certificado_buffer = BytesIO(await pdf_engine.render(certificado))
         
         # Leer PDF subido (ya validado arriba)
         pdf_subido_content = file_content
@@ -337,13 +331,13 @@ async def unir_pdfs(
                 'CODIGO CERTIFICADO': nombre_pdf_subido,
                 'FECHA_GENERACION': timestamp_generacion
             }
-            sheets_service.update_certificate_fields(codigo, fields_to_update)
-            print(f"DEBUG: PDF unido guardado y campos actualizados en Sheets: PDF_URL={storage_info['url']}, CODIGO CERTIFICADO: {nombre_pdf_subido}, Fecha: {timestamp_generacion}")
+            await async_certificados.update_fields(codigo, fields_to_update)
+            log.debug("PDF unido guardado y campos actualizados en Sheets: PDF_URL=%s, CODIGO CERTIFICADO=%s", storage_info['url'], nombre_pdf_subido)
         except Exception as e_update:
-            print(f"ADVERTENCIA: No se pudo actualizar campos en Sheets: {str(e_update)}")
+            log.warning("No se pudo actualizar campos en Sheets: %s", e_update)
             # Intentar actualizar solo la URL como fallback
             try:
-                sheets_service.update_certificate_pdf_url(codigo, storage_info['url'])
+                await async_certificados.update_pdf_url(codigo, storage_info['url'])
             except:
                 pass
         
@@ -357,8 +351,7 @@ async def unir_pdfs(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("Error uniendo PDFs de %s: %s", codigo, e)
         raise HTTPException(status_code=500, detail=f"Error uniendo PDFs: {str(e)}")
 
 
@@ -369,7 +362,7 @@ async def list_certificates(
     """Lista todos los certificados desde CERTIFICADOS QR (Operador/Admin)"""
     try:
         # Usar CERTIFICADOS QR (hoja donde se guardan todos los certificados con datos completos)
-        certificados = sheets_service.get_all_certificates_qr()
+        certificados = await async_certificados.list_all()
         return certificados
     except Exception as e:
         clean_error_msg = str(e).encode('ascii', 'ignore').decode('ascii')
@@ -387,7 +380,7 @@ async def update_certificate(
         update_data = certificado.model_dump(exclude_unset=True)
         update_data["updated_at"] = datetime.now().isoformat()
         
-        certificado_actualizado = sheets_service.update_certificate(codigo, update_data)
+        certificado_actualizado = await async_certificados.update(codigo, update_data)
         
         verify_url = f"{settings.BASE_URL}/consulta/{codigo}"
         
@@ -409,6 +402,20 @@ async def update_certificate(
         raise HTTPException(status_code=500, detail=f"Error actualizando certificado: {str(e)}")
 
 
+@router.get("/sheets/estado")
+async def sheets_estado(current_user: dict = Depends(get_admin_user)):
+    """Consumo de cuota de Google Sheets, reintentos, escrituras pendientes, refresco de cachés, exportación y motor de PDFs (solo Admin)"""
+    from app.core.sheets_refresher import sheets_refresher
+    from app.core.sheets_exporter import sheets_exporter
+    from app.core.repositories import backend
+    estado = await async_sheets.estado()
+    estado['refresco'] = sheets_refresher.estado()
+    estado['backend'] = backend
+    estado['exportacion'] = await async_sheets.run(sheets_exporter.estado)
+    estado['pdf'] = pdf_engine.estado()
+    return estado
+
+
 @router.get("/users", response_model=List[UserResponse])
 async def list_users(current_user: dict = Depends(get_admin_user)):
     """Lista todos los usuarios (solo Admin)"""
@@ -3,11 +3,13 @@ Endpoints para gestionar clientes desde Google Sheets
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Dict, Optional
-from app.core.google_sheets import sheets_service
+from app.core.repositories import async_clientes
 from app.core.security import get_operator_or_admin
+from app.core.log import get_logger
 from pydantic import BaseModel, field_validator
 
 router = APIRouter()
+log = get_logger(__name__)
 
 
 class ClienteCreate(BaseModel):
@@ -40,7 +42,7 @@ async def get_clientes(
 ):
     """Obtiene todos los clientes o busca por criterio"""
     try:
-        clientes = sheets_service.get_all_clientes()
+        clientes = await async_clientes.list_all()
         
         if search:
             search_lower = search.lower().strip()
@@ -56,7 +58,7 @@ async def get_clientes(
         }
     except Exception as e:
         error_msg = str(e)
-        print(f"Error en get_clientes: {error_msg}")  # Debug
+        log.error("Error en get_clientes: %s", error_msg)
         raise HTTPException(
             status_code=500, 
             detail=f"Error obteniendo clientes: {error_msg}. Verifica que la hoja 'CLIENTES' exista en el libro 'QUERYS'."
@@ -70,7 +72,7 @@ async def get_cliente_by_dni(
 ):
     """Obtiene un cliente por DNI"""
     try:
-        cliente = sheets_service.get_cliente_by_dni(dni)
+        cliente = await async_clientes.get_by_dni(dni)
         if not cliente:
             raise HTTPException(status_code=404, detail=f"Cliente con DNI {dni} no encontrado")
         return cliente
@@ -100,7 +102,7 @@ async def create_cliente(
         if cliente.telefono:
             cliente_dict['CELULAR DEL CLIENTE'] = str(cliente.telefono).strip()
         
-        nuevo_cliente = sheets_service.create_cliente(cliente_dict)
+        nuevo_cliente = await async_clientes.create(cliente_dict)
         return {
             "success": True,
             "cliente": nuevo_cliente,
@@ -120,13 +122,9 @@ async def update_cliente(
 ):
     """Actualiza un cliente existente"""
     try:
-        # Debug: imprimir lo que se recibe
-        print(f"DEBUG: Actualizando cliente DNI: {dni}")
-        print(f"DEBUG: Datos recibidos: {cliente.model_dump()}")
-        
         # Convertir modelo a dict y mapear al formato del Sheet
         update_dict = cliente.model_dump(exclude_unset=True)
-        print(f"DEBUG: update_dict (exclude_unset=True): {update_dict}")
+        log.debug("Actualizando cliente DNI %s: %s", dni, update_dict)
         
         # Mapear campos al formato del Sheet
         mapped_dict = {}
@@ -137,9 +135,7 @@ async def update_cliente(
         if 'telefono' in update_dict and update_dict['telefono']:
             mapped_dict['CELULAR DEL CLIENTE'] = str(update_dict['telefono']).strip()
         
-        print(f"DEBUG: mapped_dict a enviar a google_sheets: {mapped_dict}")  # Debug
-        
-        cliente_actualizado = sheets_service.update_cliente(dni, mapped_dict)
+        cliente_actualizado = await async_clientes.update(dni, mapped_dict)
         return {
             "success": True,
             "cliente": cliente_actualizado,
@@ -158,7 +154,7 @@ async def delete_cliente(
 ):
     """Elimina un cliente"""
     try:
-        deleted = sheets_service.delete_cliente(dni)
+        deleted = await async_clientes.delete(dni)
         if not deleted:
             raise HTTPException(status_code=404, detail=f"Cliente con DNI {dni} no encontrado")
         return {
@@ -3,11 +3,11 @@ Endpoints para procesar compras desde Google Sheets y generar certificados
 """
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Dict, Optional
-from app.core.google_sheets import sheets_service
+from app.core.sheets_async import async_sheets
+from app.core.repositories import async_certificados
 from app.core.code_generator import generate_certificate_code
-from app.core.storage import storage_service
-from app.core.pdf_generator import generate_certificate_pdf
 from app.core.security import get_operator_or_admin
+from app.core.pdf_engine import pdf_engine
 from datetime import datetime
 import os
 
@@ -20,7 +20,7 @@ async def get_compras_pendientes(
 ):
     """Obtiene compras pendientes de procesar desde Google Sheets"""
     try:
-        compras = sheets_service.get_compras_pendientes()
+        compras = await async_sheets.get_compras_pendientes()
         return {
             "total": len(compras),
             "compras": compras
@@ -44,7 +44,7 @@ async def procesar_compra(
     """
     try:
         # Obtener compras pendientes
-        compras = sheets_service.get_compras_pendientes()
+        compras = await async_sheets.get_compras_pendientes()
         
         if row_index >= len(compras):
             raise HTTPException(status_code=404, detail="Compra no encontrada")
@@ -73,7 +73,7 @@ async def procesar_compra(
             raise HTTPException(status_code=400, detail="Debe proporcionar mencion_nro")
         
         # Buscar en Google Sheets por NRO
-        mencion_data = sheets_service.get_mencion_by_nro(mencion_nro)
+        mencion_data = await async_sheets.get_mencion_by_nro(mencion_nro)
         if not mencion_data:
             raise HTTPException(status_code=404, detail=f"Mención con NRO {mencion_nro} no encontrada")
         mencion_text = mencion_data.get('MENCIÓN', '')
@@ -82,7 +82,7 @@ async def procesar_compra(
         codigo = generate_certificate_code(dni=dni)
         
         # Verificar que el código no exista en Sheets
-        cert_sheets = sheets_service.get_certificate_by_code(codigo)
+        cert_sheets = await async_certificados.get_by_code(codigo)
         if cert_sheets:
             codigo = generate_certificate_code(dni=dni)
         
@@ -102,8 +102,9 @@ async def procesar_compra(
             'mencion': mencion_text
         }
         
-        pdf_buffer = generate_certificate_pdf(certificado_data)
-        pdf_content = pdf_buffer.read()
+        # El almacenamiento se carga recién al primer PDF
+        from app.core.storage import storage_service
+        pdf_content = await pdf_engine.render(certificado_data)
         
         # Guardar PDF
         from io import BytesIO
@@ -133,14 +134,13 @@ async def procesar_compra(
         }
         
         try:
-            sheets_service.create_certificate(certificado_dict, mencion_data=mencion_data)
+            await async_certificados.create(certificado_dict, mencion_data=mencion_data)
         except Exception as e_sheets:
             raise HTTPException(status_code=500, detail=f"Error guardando certificado en Google Sheets: {str(e_sheets)}")
         
         # Actualizar Google Sheets con el código generado
         try:
-            worksheet = sheets_service.get_worksheet('compras')
-            all_records = worksheet.get_all_records()
+            all_records = await async_sheets.get_all_compras()
             
             # Buscar la fila que coincide con esta compra
             real_row_index = None
@@ -152,7 +152,7 @@ async def procesar_compra(
                     break
             
             if real_row_index:
-                sheets_service.update_compra_codigo(
+                await async_sheets.update_compra_codigo(
                     real_row_index,
                     codigo,
                     estado='PROCESADO',
@@ -198,7 +198,7 @@ async def get_menciones(
         raise HTTPException(status_code=400, detail="Solo se admite source='sheets'")
     
     try:
-        menciones = sheets_service.get_menciones()
+        menciones = await async_sheets.get_menciones()
         return {
             "total": len(menciones),
             "source": "google_sheets",
@@ -231,7 +231,7 @@ async def get_mencion_by_nro(
     Útil para cargar datos en el formulario de crear certificado
     """
     try:
-        mencion = sheets_service.get_mencion_by_nro(nro)
+        mencion = await async_sheets.get_mencion_by_nro(nro)
         if not mencion:
             raise HTTPException(status_code=404, detail=f"Mención con NRO {nro} no encontrada")
         
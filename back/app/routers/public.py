@@ -1,11 +1,16 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+from io import BytesIO
 from app.models.schemas import CertificateResponse, CertificateSearch
-from app.core.google_sheets import sheets_service
+from app.core.repositories import async_certificados
 from app.core.config import settings
-from app.core.pdf_generator import generate_certificate_pdf
+from app.core.log import get_logger, log_evento
+from app.core.metrics import registrar_cache
+from app.core.pdf_datos import huella_pdf
+from app.core.pdf_engine import pdf_engine
 
 router = APIRouter()
+log = get_logger(__name__)
 
 
 @router.get("/certificados/{codigo}", response_model=CertificateResponse)
@@ -13,22 +18,16 @@ async def get_certificate(codigo: str, request: Request):
     """Obtiene un certificado por código (público)"""
     try:
         # Obtener desde Google Sheets
-        print(f"DEBUG public.get_certificate: Buscando certificado con codigo={codigo}")
         try:
-            certificado = sheets_service.get_certificate_by_code(codigo)
+            certificado = await async_certificados.get_by_code(codigo)
         except Exception as e_sheets:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"ERROR en get_certificate_by_code: {str(e_sheets)}")
-            print(f"Traceback: {error_trace}")
+            log.exception("Error en get_certificate_by_code(%s): %s", codigo, e_sheets)
             raise HTTPException(status_code=500, detail=f"Error buscando certificado en Google Sheets: {str(e_sheets)}")
         
+        log_evento.anotar(encontrado=bool(certificado))
         if not certificado:
-            print(f"DEBUG public.get_certificate: Certificado no encontrado para codigo={codigo}")
             return CertificateResponse(found=False)
         
-        print(f"DEBUG public.get_certificate: Certificado encontrado: codigo={certificado.get('codigo')}, nombres={certificado.get('nombres')}")
-        
         # Asegurar que todos los campos tengan valores válidos
         codigo_value = certificado.get("codigo") or ""
         nombres_value = certificado.get("nombres") or ""
@@ -56,7 +55,6 @@ async def get_certificate(codigo: str, request: Request):
                 pdf_url=pdf_url_value,
                 verify_url=verify_url
             )
-            print(f"DEBUG public.get_certificate: Respuesta creada exitosamente")
             return response
         except Exception as e_response:
             # No exponer detalles del error al usuario
@@ -72,7 +70,7 @@ async def get_certificate(codigo: str, request: Request):
 async def search_certificate(search: CertificateSearch, request: Request):
     """Busca un certificado por código (público)"""
     try:
-        certificado = sheets_service.get_certificate_by_code(search.codigo)
+        certificado = await async_certificados.get_by_code(search.codigo)
         
         if not certificado:
             return CertificateResponse(found=False)
@@ -95,6 +93,20 @@ async def search_certificate(search: CertificateSearch, request: Request):
         raise HTTPException(status_code=500, detail=f"Error buscando certificado: {str(e)}")
 
 
+def _archivo_pdf(file_path, certificado: dict, disposition_type: str) -> FileResponse:
+    """Respuesta con un PDF ya guardado en disco"""
+    nombre_completo = f"{certificado.get('nombres', '')}_{certificado.get('apellidos', '')}"
+    filename = f"certificado_{nombre_completo.replace(' ', '_')}.pdf"
+    return FileResponse(
+        str(file_path),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"{disposition_type}; filename={filename}",
+            "X-Content-Type-Options": "nosniff"
+        }
+    )
+
+
 @router.get("/certificados/{codigo}/pdf")
 async def download_certificate_pdf(
     codigo: str, 
@@ -104,7 +116,7 @@ async def download_certificate_pdf(
 ):
     """Descarga el PDF del certificado (público). Si no existe, lo genera y guarda."""
     try:
-        certificado = sheets_service.get_certificate_by_code(codigo)
+        certificado = await async_certificados.get_by_code(codigo)
         
         if not certificado:
             raise HTTPException(status_code=404, detail="Certificado no encontrado")
@@ -112,68 +124,66 @@ async def download_certificate_pdf(
         # Determinar disposición (ver o descargar)
         disposition_type = "attachment" if download else "inline"
         
-        # Si hay pdf_url y el archivo existe, y no se fuerza regeneración, redirigir a ese
+        from app.core.storage import StorageService
+        storage_service = StorageService()
+        
+        # pdf_url apuntando a un archivo armado a mano (p.ej. el PDF unido desde el admin): se sirve
+        # tal cual, regenerarlo perdería la unión. Un pdf_url a un PDF guardado por huella no se usa:
+        # puede ser de datos anteriores; el vigente se busca abajo con la huella actual
         pdf_url = certificado.get("pdf_url")
-        if pdf_url and not force_regenerate:
-            # Verificar si el archivo existe localmente
+        if pdf_url and not force_regenerate and not storage_service.es_url_por_huella(pdf_url):
             try:
-                from app.core.storage import StorageService
-                storage_service = StorageService()
-                if storage_service.storage_type == 'local':
-                    # Verificar si el archivo existe
-                    import os
-                    from pathlib import Path
-                    from app.core.config import ROOT
-                    # Extraer ruta relativa de la URL
-                    if '/uploads/certificados/' in pdf_url:
-                        relative_path = pdf_url.split('/uploads/certificados/')[-1]
-                        file_path = ROOT / 'uploads' / 'certificados' / relative_path
-                        if file_path.exists():
-                            from fastapi.responses import FileResponse
-                            nombre_completo = f"{certificado.get('nombres', '')}_{certificado.get('apellidos', '')}"
-                            filename = f"certificado_{nombre_completo.replace(' ', '_')}.pdf"
-                            return FileResponse(
-                                str(file_path),
-                                media_type="application/pdf",
-                                headers={
-                                    "Content-Disposition": f"{disposition_type}; filename={filename}",
-                                    "X-Content-Type-Options": "nosniff"
-                                }
-                            )
+                file_path = storage_service.find_local_pdf(pdf_url)
+                if file_path:
+                    return _archivo_pdf(file_path, certificado, disposition_type)
             except Exception as e:
-                print(f"ADVERTENCIA: No se pudo verificar archivo existente: {str(e)}")
+                log.warning("No se pudo verificar archivo existente: %s", e)
                 # Continuar para generar nuevo PDF
         
+        # PDF ya generado con los mismos datos, plantilla y diseño (guardado por huella)
+        huella = huella_pdf(certificado)
+        if not force_regenerate:
+            try:
+                guardado = storage_service.find_pdf_by_huella(huella)
+            except Exception as e:
+                log.warning("No se pudo buscar el PDF por huella: %s", e)
+                guardado = None
+            if guardado:
+                registrar_cache('pdf', 'hit')
+                if storage_service.storage_type == 'local':
+                    return _archivo_pdf(guardado['path'], certificado, disposition_type)
+                return RedirectResponse(guardado['url'])
+            registrar_cache('pdf', 'miss')
+        
         # Generar PDF dinámico
-        print(f"DEBUG: Generando PDF para certificado {codigo}")
-        pdf_buffer = generate_certificate_pdf(certificado)
-        pdf_content = pdf_buffer.read()
+        log.debug("Generando PDF para certificado %s", codigo)
+        # En el pool de procesos del motor (no bloquea el event loop; 503 si está saturado)
+        pdf_content = await pdf_engine.render(certificado)
         
         # Guardar PDF en el backend
         try:
-            from app.core.storage import StorageService
-            storage_service = StorageService()
-            
-            nombre_completo = certificado.get('nombre_completo') or f"{certificado.get('nombres', '')} {certificado.get('apellidos', '')}"
             filename = f"certificado_{codigo}.pdf"
             
-            # Guardar PDF
+            # Guardar PDF (con nombre por huella: regenerarlo reemplaza el mismo archivo)
             storage_info = storage_service.save_pdf(
                 file_content=pdf_content,
                 filename=filename,
-                codigo=codigo
+                codigo=codigo,
+                huella=huella
             )
             
             # Generar URL de verificación (la misma que usa el QR)
             verify_url = f"{settings.BASE_URL}/consulta/{codigo}"
             
-            # Actualizar certificado en Google Sheets con la URL de verificación
-            try:
-                sheets_service.update_certificate_pdf_url(codigo, verify_url)
-                print(f"DEBUG: PDF guardado y URL de verificación actualizada en Sheets: {verify_url}")
-            except Exception as e_update:
-                print(f"ADVERTENCIA: No se pudo actualizar URL en Sheets: {str(e_update)}")
-                # Continuar aunque no se actualice la URL
+            # Actualizar certificado en Google Sheets con la URL de verificación (si no la tiene ya).
+            # Es estable: la URL del archivo cambia con la huella y quedaría desactualizada
+            if certificado.get("pdf_url") != verify_url:
+                try:
+                    await async_certificados.update_pdf_url(codigo, verify_url)
+                    log.debug("PDF guardado y URL de verificación actualizada en Sheets: %s", verify_url)
+                except Exception as e_update:
+                    log.warning("No se pudo actualizar URL en Sheets: %s", e_update)
+                    # Continuar aunque no se actualice la URL
             
             # Devolver el PDF guardado (no el buffer en memoria)
             # Esto asegura que siempre se devuelva el mismo PDF que se guardó
@@ -181,24 +191,14 @@ async def download_certificate_pdf(
                 relative_path = storage_info['relative_path']
                 file_path = storage_service.storage_path / relative_path
                 if file_path.exists():
-                    from fastapi.responses import FileResponse
-                    nombre_completo = f"{certificado.get('nombres', '')}_{certificado.get('apellidos', '')}"
-                    filename = f"certificado_{nombre_completo.replace(' ', '_')}.pdf"
-                    return FileResponse(
-                        str(file_path),
-                        media_type="application/pdf",
-                        headers={
-                            "Content-Disposition": f"{disposition_type}; filename={filename}",
-                            "X-Content-Type-Options": "nosniff"
-                        }
-                    )
+                    return _archivo_pdf(file_path, certificado, disposition_type)
             
         except Exception as e_storage:
-            print(f"ADVERTENCIA: No se pudo guardar PDF en almacenamiento: {str(e_storage)}")
+            log.warning("No se pudo guardar PDF en almacenamiento: %s", e_storage)
             # Continuar para devolver el PDF aunque no se guarde
         
-        # Fallback: devolver el PDF generado desde el buffer
-        pdf_buffer.seek(0)  # Resetear buffer para lectura
+        # Fallback: devolver el PDF generado desde memoria
+        pdf_buffer = BytesIO(pdf_content)
         nombre_completo = f"{certificado.get('nombres', '')}_{certificado.get('apellidos', '')}"
         filename = f"certificado_{nombre_completo.replace(' ', '_')}.pdf"
         
@@ -214,6 +214,5 @@ async def download_certificate_pdf(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("Error generando PDF de %s: %s", codigo, e)
         raise HTTPException(status_code=500, detail=f"Error generando PDF: {str(e)}")
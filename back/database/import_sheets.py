@@ -0,0 +1,74 @@
+"""
+Script para copiar certificados y clientes de Google Sheets a la base de datos
+(necesario una vez antes de usar DATA_BACKEND=sql; se puede repetir: no duplica)
+Ejecutar: python database/import_sheets.py
+"""
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Agregar el directorio back al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Cargar variables de entorno desde .env
+load_dotenv()
+
+
+def import_sheets():
+    """Agrega a la base de datos los certificados de CERTIFICADOS QR y los clientes de CLIENTES que falten"""
+    from app.core.google_sheets import sheets_service
+    from app.core.sheets_schema import CAMPO_ALTA_POR_HEADER
+    from app.database import crud
+    from app.database.database import Base, engine, session_scope
+    from app.database.models import HEADERS_CLIENTES
+
+    Base.metadata.create_all(bind=engine)
+
+    print("Leyendo CLIENTES...")
+    clientes = sheets_service.get_all_clientes(force_refresh=True)
+    nuevos = 0
+    with session_scope() as db:
+        for record in clientes:
+            dni = record.get('DNI DEL CLIENTE') or record.get('DNI') or record.get('dni')
+            if dni and crud.get_cliente_by_dni(db, str(dni)):
+                continue
+            crud.create_cliente(
+                db,
+                dni=str(dni) if dni else None,
+                nombre_completo=str(record.get('NOMBRE COMPLETO DEL CLIENTE', '') or ''),
+                email=str(record.get('CORREO DEL CLIENTE', '') or '') or None,
+                telefono=str(record.get('CELULAR DEL CLIENTE', '') or '') or None,
+                extra={k: str(v) for k, v in record.items() if k not in HEADERS_CLIENTES.values() and k not in ('DNI', 'dni') and v != ''},
+            )
+            nuevos += 1
+    print(f"[OK] Clientes: {len(clientes)} en Sheets, {nuevos} importados")
+
+    print("\nLeyendo CERTIFICADOS QR...")
+    records = sheets_service.get_worksheet('CERTIFICADOS QR').get_all_records()
+    nuevos = 0
+    with session_scope() as db:
+        for record in records:
+            valores, extra = {}, {}
+            for header, valor in record.items():
+                campo = CAMPO_ALTA_POR_HEADER.get(str(header).upper().strip())
+                if campo and campo not in valores:
+                    valores[campo] = valor
+                elif valor != '':
+                    extra[header] = str(valor)
+            codigo = str(valores.get('codigo') or '').strip()
+            if not codigo or crud.get_certificado_by_codigo(db, codigo):
+                continue
+            crud.create_certificado(db, valores, extra=extra)
+            nuevos += 1
+    print(f"[OK] Certificados: {len(records)} en Sheets, {nuevos} importados")
+    return True
+
+
+if __name__ == "__main__":
+    try:
+        success = import_sheets()
+    except Exception as e:
+        print(f"\n[ERROR] {str(e)}")
+        success = False
+    if not success:
+        sys.exit(1)
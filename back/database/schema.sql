@@ -1,38 +1,52 @@
 -- Base de datos para Sistema de Certificados
 -- Compatible con MySQL (Hostinger)
 
--- Tabla de Clientes
+-- Tabla de Clientes (mismos campos que la hoja CLIENTES; otras columnas del Sheet en `extra`)
 CREATE TABLE IF NOT EXISTS clientes (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    nombres VARCHAR(255) NOT NULL,
-    apellidos VARCHAR(255) NOT NULL,
+    nombres VARCHAR(255) NOT NULL DEFAULT '',
+    apellidos VARCHAR(255) NOT NULL DEFAULT '',
+    nombre_completo VARCHAR(255) NOT NULL DEFAULT '',
     dni VARCHAR(20) UNIQUE,
     email VARCHAR(255),
     telefono VARCHAR(20),
+    extra JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_dni (dni)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
--- Tabla de Certificados
+-- Tabla de Certificados (mismos campos que CERTIFICADOS QR; otras columnas del Sheet en `extra`)
 CREATE TABLE IF NOT EXISTS certificados (
     id INT AUTO_INCREMENT PRIMARY KEY,
     codigo VARCHAR(100) UNIQUE NOT NULL,
     cliente_id INT,
-    curso VARCHAR(255) NOT NULL,
-    fecha_emision DATE NOT NULL,
-    horas INT,
+    dni VARCHAR(20),
+    nombre_completo VARCHAR(255),
+    celular VARCHAR(20),
+    correo VARCHAR(255),
+    curso VARCHAR(255),
+    fecha_emision VARCHAR(50),
+    horas VARCHAR(20),
     estado VARCHAR(20) DEFAULT 'VALIDO' CHECK (estado IN ('VALIDO', 'ANULADO')),
     motivo_anulacion TEXT,
     pdf_path VARCHAR(500),
     pdf_url VARCHAR(500),
     firma_url VARCHAR(500),
     logo_url VARCHAR(500),
+    nro VARCHAR(20),
+    especialidad VARCHAR(255),
+    p_certificado VARCHAR(255),
+    mencion TEXT,
+    f_inicio VARCHAR(50),
+    f_termino VARCHAR(50),
+    extra JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (cliente_id) REFERENCES clientes(id) ON DELETE SET NULL,
     INDEX idx_codigo (codigo),
     INDEX idx_cliente (cliente_id),
+    INDEX idx_dni (dni),
     INDEX idx_estado (estado)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -58,3 +72,16 @@ CREATE TABLE IF NOT EXISTS usuarios (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_email (email)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Cambios pendientes de copiar a Google Sheets (los exporta la app en segundo plano)
+CREATE TABLE IF NOT EXISTS exportaciones_sheets (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    entidad VARCHAR(20) NOT NULL,
+    clave VARCHAR(100) NOT NULL,
+    operacion VARCHAR(30) NOT NULL,
+    datos JSON,
+    intentos INT NOT NULL DEFAULT 0,
+    error TEXT,
+    reclamada_en DATETIME,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Genera por adelantado los PDFs de una cohorte de certificados
+Los alumnos escanean el QR apenas se emite la cohorte: si el PDF ya está guardado con la
+huella de sus datos actuales, el endpoint público lo sirve sin generarlo ni escribir en Google Sheets.
+
+Selecciona certificados de CERTIFICADOS QR (o de la base de datos si DATA_BACKEND=sql) por
+NRO de mención, fecha de emisión y estado; genera en paralelo (pool de procesos del motor de
+PDFs) los que no tienen un PDF guardado con su huella, los guarda con StorageService y deja
+en PDF_URL la URL de verificación (la misma que escribe el endpoint) en escrituras agrupadas.
+
+Si se interrumpe, volver a ejecutar el mismo comando: los PDFs ya guardados se encuentran por
+su huella y no se vuelven a generar; las URLs sin escribir quedan en --progreso.
+Después de cambiar datos, la plantilla o el diseño, el mismo comando regenera lo que cambió.
+
+Uso (desde back/):
+    python pregenerate_pdfs.py --mencion 1050
+    python pregenerate_pdfs.py --desde 2025-03-01 --hasta 2025-03-31 --workers 4
+    python pregenerate_pdfs.py --mencion 1050 --forzar --dry-run
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S')
+
+
+def parse_fecha(texto) -> Optional[date]:
+    """Fecha de emisión en cualquiera de los formatos usados en las hojas (None si no se reconoce)"""
+    texto = str(texto or '').strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def seleccionar(certificados: List[Dict], args) -> List[Dict]:
+    """Certificados que cumplen los filtros de mención, estado y fecha de emisión"""
+    menciones = {str(m).strip() for m in args.mencion or []}
+    estado = args.estado.strip().upper() if args.estado else ''
+    seleccion, sin_fecha = [], 0
+    for certificado in certificados:
+        if not certificado.get('codigo'):
+            continue
+        if menciones and str(certificado.get('nro', '')).strip() not in menciones:
+            continue
+        if estado and str(certificado.get('estado', '')).strip().upper() != estado:
+            continue
+        if args.desde or args.hasta:
+            fecha = parse_fecha(certificado.get('fecha_emision'))
+            if fecha is None:
+                sin_fecha += 1
+                continue
+            if (args.desde and fecha < args.desde) or (args.hasta and fecha > args.hasta):
+                continue
+        seleccion.append(certificado)
+    if sin_fecha:
+        print(f"AVISO: {sin_fecha} certificados sin fecha de emisión reconocible quedaron fuera del filtro de fechas")
+    return seleccion
+
+
+def separar_generados(certificados: List[Dict], args, storage):
+    """
+    Separa los certificados que hay que generar de los que ya tienen un PDF guardado con la
+    huella de sus datos actuales (de estos solo falta PDF_URL si no tiene la URL de verificación)
+    """
+    from app.core.pdf_datos import huella_pdf
+
+    por_generar, urls = [], {}
+    for certificado in certificados:
+        if not args.forzar and storage.find_pdf_by_huella(huella_pdf(certificado)):
+            if certificado.get('pdf_url') != url_verificacion(certificado['codigo']):
+                urls[certificado['codigo']] = url_verificacion(certificado['codigo'])
+            continue
+        por_generar.append(certificado)
+    return por_generar, urls
+
+
+def url_verificacion(codigo: str) -> str:
+    """URL de verificación del certificado (la del QR): no cambia al regenerar el PDF"""
+    from app.core.config import settings
+    return f"{settings.BASE_URL}/consulta/{codigo}"
+
+
+class Progreso:
+    """Archivo JSON con los PDFs guardados y las URLs ya escritas (para retomar)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.guardados: Dict[str, str] = {}  # código -> URL a escribir en PDF_URL
+        self.escritos: set = set()  # códigos con PDF_URL actualizado
+        if path.exists():
+            datos = json.loads(path.read_text(encoding='utf-8'))
+            self.guardados = datos.get('guardados', {})
+            self.escritos = set(datos.get('escritos', []))
+
+    def pendientes_de_escribir(self) -> Dict[str, str]:
+        return {c: u for c, u in self.guardados.items() if c not in self.escritos}
+
+    def guardar(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.path.with_suffix('.tmp')
+        temporal.write_text(json.dumps({'guardados': self.guardados, 'escritos': sorted(self.escritos)}), encoding='utf-8')
+        temporal.replace(self.path)
+
+
+def escribir_urls(urls: Dict[str, str], progreso: Progreso) -> None:
+    """Actualiza PDF_URL de un lote de certificados (un batch_update por hoja en Google Sheets)"""
+    from app.core.google_sheets import sheets_service
+    from app.core.repositories import certificados_repo
+
+    if not urls:
+        return
+    fallidos = []
+    with sheets_service.batched_writes():
+        for codigo, url in urls.items():
+            try:
+                if not certificados_repo.update_pdf_url(codigo, url):
+                    fallidos.append(codigo)
+                    print(f"  ERROR actualizando PDF_URL de {codigo}: certificado no encontrado")
+            except Exception as e:
+                fallidos.append(codigo)
+                print(f"  ERROR actualizando PDF_URL de {codigo}: {e}")
+    sheets_service.flush_writes()
+    progreso.escritos.update(c for c in urls if c not in fallidos)
+    progreso.guardar()
+
+
+async def generar(certificados: List[Dict], args, storage, progreso: Progreso) -> int:
+    """Genera y guarda los PDFs en paralelo; escribe PDF_URL cada --lote certificados"""
+    from app.core.pdf_datos import huella_pdf
+    from app.core.pdf_engine import PdfEngine
+
+    motor = PdfEngine(max_workers=args.workers, max_pendientes=max(1, args.workers) * 2)
+    limite = asyncio.Semaphore(motor.max_pendientes)
+    total, hechos, errores = len(certificados), 0, 0
+    lote: Dict[str, str] = {}
+    inicio = time.perf_counter()
+
+    async def uno(certificado: Dict):
+        codigo = certificado['codigo']
+        async with limite:
+            pdf = await motor.render(certificado)
+        await asyncio.to_thread(
+            storage.save_pdf, file_content=pdf, filename=f"certificado_{codigo}.pdf", codigo=codigo,
+            huella=huella_pdf(certificado))
+        return certificado
+
+    try:
+        tareas = [asyncio.ensure_future(uno(c)) for c in certificados]
+        for tarea in asyncio.as_completed(tareas):
+            try:
+                certificado = await tarea
+            except Exception as e:
+                errores += 1
+                print(f"  ERROR generando PDF: {e}")
+                continue
+            hechos += 1
+            codigo = certificado['codigo']
+            if certificado.get('pdf_url') != url_verificacion(codigo):
+                progreso.guardados[codigo] = lote[codigo] = url_verificacion(codigo)
+            if len(lote) >= args.lote:
+                progreso.guardar()
+                await asyncio.to_thread(escribir_urls, lote, progreso)
+                lote = {}
+            transcurrido = time.perf_counter() - inicio
+            print(f"[{hechos + errores}/{total}] {codigo}  ({hechos / transcurrido:.1f} PDF/s)", flush=True)
+        progreso.guardar()
+        await asyncio.to_thread(escribir_urls, lote, progreso)
+    finally:
+        motor.shutdown()
+    return errores
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Genera por adelantado los PDFs de certificados")
+    parser.add_argument('--mencion', action='append', help="NRO de la mención (se puede repetir)")
+    parser.add_argument('--desde', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(), help="Fecha de emisión desde (AAAA-MM-DD)")
+    parser.add_argument('--hasta', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(), help="Fecha de emisión hasta (AAAA-MM-DD)")
+    parser.add_argument('--estado', default='VALIDO', help="Estado del certificado (vacío = todos). Por defecto VALIDO")
+    parser.add_argument('--forzar', action='store_true', help="Regenerar aunque ya tengan un PDF guardado")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos de generación (por defecto PDF_WORKERS)")
+    parser.add_argument('--lote', type=int, default=50, help="Certificados por escritura agrupada de PDF_URL")
+    parser.add_argument('--progreso', type=Path, default=Path('data/pregenerate_pdfs.json'), help="Archivo para retomar")
+    parser.add_argument('--dry-run', action='store_true', help="Solo listar los certificados seleccionados")
+    args = parser.parse_args()
+    if not (args.mencion or args.desde or args.hasta):
+        parser.error("Indique al menos --mencion, --desde o --hasta")
+
+    from app.core.config import settings
+    from app.core.repositories import certificados_repo
+    from app.core.storage import StorageService
+
+    if args.workers is None:
+        args.workers = settings.PDF_WORKERS
+    storage = StorageService()
+    progreso = Progreso(args.progreso)
+
+    # PDFs guardados en una ejecución interrumpida antes de escribir su PDF_URL
+    pendientes = progreso.pendientes_de_escribir()
+    if pendientes and not args.dry_run:
+        print(f"Retomando: {len(pendientes)} PDFs guardados sin PDF_URL")
+        escribir_urls(pendientes, progreso)
+
+    print("Leyendo certificados...")
+    seleccion, urls = separar_generados(seleccionar(certificados_repo.list_all(), args), args, storage)
+    print(f"{len(seleccion)} certificados por generar ({args.workers} procesos)")
+    if args.dry_run:
+        for certificado in seleccion:
+            print(f"  {certificado['codigo']}  {certificado.get('nro', '')}  {certificado.get('fecha_emision', '')}")
+        return 0
+    if urls:
+        # PDFs ya guardados (p.ej. por el endpoint público) cuyo PDF_URL no es la URL de verificación
+        print(f"{len(urls)} PDFs ya guardados: solo se actualiza PDF_URL")
+        progreso.guardados.update(urls)
+        escribir_urls(urls, progreso)
+    errores = 0
+    if seleccion:
+        errores = asyncio.run(generar(seleccion, args, storage, progreso))
+        print(f"OK: {len(seleccion) - errores} PDFs generados, {errores} errores")
+    sin_escribir = progreso.pendientes_de_escribir()
+    if sin_escribir:
+        print(f"AVISO: {len(sin_escribir)} certificados sin PDF_URL actualizado (se reintenta al volver a ejecutar)")
+    elif not errores:
+        # Cohorte completa: el próximo comando empieza de cero
+        args.progreso.unlink(missing_ok=True)
+    return 1 if errores or sin_escribir else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Dobles de gspread para probar GoogleSheetsService sin credenciales ni red
+"""
+from datetime import timedelta
+
+import gspread
+import pytest
+
+from app.core.google_sheets import GoogleSheetsService
+from app.core.sheets_replica import SheetsReplica
+
+
+class FakeWorksheet:
+    """Worksheet en memoria con las llamadas de gspread que usa el servicio"""
+
+    def __init__(self, title, rows):
+        self.title = title
+        self.rows = [list(r) for r in rows]
+        self.llamadas = []
+
+    def get_all_records(self, **kwargs):
+        self.llamadas.append('get_all_records')
+        headers = self.rows[0]
+        return [
+            dict(zip(headers, gspread.utils.numericise_all(r + [''] * (len(headers) - len(r)))))
+            for r in self.rows[1:]
+        ]
+
+    def row_values(self, fila, **kwargs):
+        self.llamadas.append('row_values')
+        return list(self.rows[fila - 1]) if fila <= len(self.rows) else []
+
+    def cell(self, fila, col, **kwargs):
+        self.llamadas.append('cell')
+        return gspread.cell.Cell(fila, col, self.rows[fila - 1][col - 1])
+
+    def batch_get(self, rangos, **kwargs):
+        self.llamadas.append('batch_get')
+        resultado = []
+        for rango in rangos:
+            inicio = rango.split(':')[0]
+            if inicio.isdigit():
+                resultado.append([list(self.rows[int(inicio) - 1])])
+            else:
+                fila = int(''.join(c for c in inicio if c.isdigit()))
+                resultado.append([list(r) for r in self.rows[fila - 1:]])
+        return resultado
+
+    def append_row(self, valores, **kwargs):
+        self.llamadas.append('append_row')
+        self.rows.append(list(valores))
+        n = len(self.rows)
+        return {'updates': {'updatedRange': f"'{self.title}'!A{n}:Z{n}"}}
+
+    def batch_update(self, data, **kwargs):
+        self.llamadas.append('batch_update')
+        for edicion in data:
+            fila, col = gspread.utils.a1_to_rowcol(edicion['range'].split(':')[0])
+            for i, valores in enumerate(edicion['values']):
+                for j, valor in enumerate(valores):
+                    celdas = self.rows[fila + i - 1]
+                    celdas.extend([''] * (col + j - len(celdas)))
+                    celdas[col + j - 1] = valor
+        return {}
+
+    def delete_rows(self, fila, *args, **kwargs):
+        self.llamadas.append('delete_rows')
+        del self.rows[fila - 1]
+
+
+class FakeSpreadsheet:
+    """Spreadsheet en memoria; `version` hace de modifiedTime de Drive"""
+
+    def __init__(self, worksheets):
+        self._worksheets = {w.title: w for w in worksheets}
+        self.sheet1 = worksheets[0]
+        self.version = 'v1'
+        self.sondeos = 0
+
+    def get_lastUpdateTime(self):
+        self.sondeos += 1
+        return self.version
+
+    def worksheet(self, titulo):
+        if titulo not in self._worksheets:
+            raise gspread.exceptions.WorksheetNotFound(titulo)
+        return self._worksheets[titulo]
+
+    def worksheets(self):
+        return list(self._worksheets.values())
+
+
+HEADERS_QR = ['CODIGO', 'DNI DEL CLIENTE', 'NOMBRE COMPLETO DEL CLIENTE', 'CURSO', 'ESTADO', 'PDF_URL']
+
+
+@pytest.fixture
+def hojas():
+    """Hojas del spreadsheet de certificados (incluye compras y CLIENTES, como en producción)"""
+    principal = FakeWorksheet('certificados', [['codigo', 'nombres', 'apellidos', 'estado']])
+    qr = FakeWorksheet('CERTIFICADOS QR', [HEADERS_QR] + [
+        [f'C{i}', str(1000 + i), f'Alumno {i}', 'curso', 'VALIDO', ''] for i in range(5)
+    ])
+    compras = FakeWorksheet('compras', [
+        ['nombres', 'apellidos', 'dni', 'curso', 'codigo', 'estado'],
+        ['Ana', 'Paz', '111', 'curso', '', ''],
+    ])
+    clientes = FakeWorksheet('CLIENTES', [
+        ['DNI DEL CLIENTE', 'NOMBRE COMPLETO DEL CLIENTE', 'CELULAR DEL CLIENTE', 'CORREO DEL CLIENTE'],
+        ['111', 'Ana Paz', '999', 'ana@example.com'],
+        ['222', 'Luis Rey', '888', 'luis@example.com'],
+    ])
+    spreadsheet = FakeSpreadsheet([principal, qr, compras, clientes])
+    return {'spreadsheet': spreadsheet, 'qr': qr, 'compras': compras, 'clientes': clientes}
+
+
+def crear_servicio(hojas, replica_path) -> GoogleSheetsService:
+    """Servicio conectado a las hojas falsas, con réplica en `replica_path` y sondeo cada 15 s"""
+    servicio = GoogleSheetsService()
+    servicio.client = object()
+    servicio.spreadsheets = {'certificados': hojas['spreadsheet']}
+    servicio.sheet = hojas['spreadsheet'].sheet1
+    servicio._replica = SheetsReplica(str(replica_path))
+    servicio._sondeo_intervalo = timedelta(seconds=15)
+    return servicio
+
+
+@pytest.fixture
+def servicio(hojas, tmp_path):
+    servicio = crear_servicio(hojas, tmp_path / 'replica.sqlite3')
+    yield servicio
+    servicio._replica.close()
@@ -0,0 +1,71 @@
+"""
+Escrituras de la app y réplica local: lo escrito se ve en la lectura siguiente aunque
+Drive todavía no informe el cambio de versión
+"""
+from conftest import crear_servicio
+
+
+def test_cliente_creado_se_encuentra_por_dni(servicio, hojas, tmp_path):
+    assert servicio.get_cliente_by_dni('333') is None
+
+    servicio.create_cliente({'dni': '333', 'nombres': 'Eva', 'apellidos': 'Sol', 'email': 'eva@example.com'})
+
+    assert servicio.get_cliente_by_dni('333')['NOMBRE COMPLETO DEL CLIENTE'] == 'Eva Sol'
+    # Otro worker que arranca con la réplica compartida también lo ve
+    otro = crear_servicio(hojas, tmp_path / 'replica.sqlite3')
+    assert otro.get_cliente_by_dni('333') is not None
+    assert hojas['clientes'].llamadas.count('get_all_records') == 1
+
+
+def test_cliente_eliminado_no_se_encuentra(servicio, hojas):
+    assert servicio.get_cliente_by_dni('111') is not None
+
+    assert servicio.delete_cliente('111') is True
+
+    assert servicio.get_cliente_by_dni('111') is None
+    # Las filas siguientes se corren como en el Sheet
+    assert servicio._replica.registros('clientes') == hojas['clientes'].get_all_records()
+
+
+def test_compra_procesada_deja_de_estar_pendiente(servicio, hojas):
+    assert len(servicio.get_compras_pendientes()) == 1
+
+    servicio.update_compra_codigo(2, 'ABC123', estado='PROCESADO')
+
+    assert servicio.get_compras_pendientes() == []
+    assert hojas['compras'].rows[1][4:6] == ['ABC123', 'PROCESADO']
+
+
+def test_escritura_vuelve_a_consultar_la_version(servicio, hojas):
+    servicio.get_all_clientes()
+    sondeos = hojas['spreadsheet'].sondeos
+
+    # Drive informa el modifiedTime del alta apenas termina la escritura
+    hojas['spreadsheet'].version = 'v2'
+    servicio.create_cliente({'dni': '444', 'nombres': 'Rai', 'apellidos': 'Gil'})
+
+    assert hojas['spreadsheet'].sondeos > sondeos
+    assert servicio._cache_clientes_version == 'v2'
+
+
+def test_edicion_externa_de_certificado_fuerza_descarga_completa(servicio, hojas):
+    assert servicio.get_certificate_by_code('C3')
+    hojas['qr'].rows[4][4] = 'ANULADO'
+    hojas['spreadsheet'].version = 'v2'
+    servicio._versiones.clear()
+
+    certificado = servicio.get_certificate_by_code('C3')
+
+    assert 'ANULADO' in certificado.values()
+    assert hojas['qr'].llamadas.count('get_all_records') == 2
+
+
+def test_escritura_propia_de_certificado_no_fuerza_descarga_completa(servicio, hojas):
+    assert servicio.get_certificate_by_code('C3')
+
+    assert servicio.update_certificate_pdf_url('C3', 'https://example.com/c3.pdf')
+    hojas['spreadsheet'].version = 'v2'
+
+    assert servicio.get_certificate_by_code('C3')
+    assert hojas['qr'].llamadas.count('get_all_records') == 1
+    assert servicio._replica.meta('certificados_qr')['version'] == 'v2'